@@ -0,0 +1,429 @@
+"""Benchmarks offline da ingestão e da consulta, sem conta AWS.
+
+Etapas: leitura dos PDFs, chunking, embeddings determinísticos, construção do Chroma
+(tempo e tamanho em disco), latência da busca em vários tamanhos de base (Chroma e o
+índice compacto em mmap, com recall@k contra a busca exata) e /query ponta a ponta sob
+carga concorrente, com o Bedrock substituído por um stub local.
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/run_benchmarks.py --output benchmark.json
+    python benchmarks/run_benchmarks.py --baseline benchmark.json --max-regression 0.2
+    python benchmarks/run_benchmarks.py --load-workers 1 --output serial.json  # leitura sem o pool
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+from pathlib import Path
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "rag_juridico"))
+
+from langchain_core.documents import Document
+from langchain_community.vectorstores import Chroma
+from ingest import Config, DocumentProcessor, FileChunker, PipelineStats
+from manifest import file_sha256
+from bm25_index import BM25Index, build_bm25_index
+from vector_index import VectorIndex, build_vector_index
+from stubs import HashingEmbeddings, StubBedrockRuntime
+
+COLLECTION_NAME = "juridico_chatbot"
+
+
+# ======UTILITÁRIOS======
+def percentiles(samples_ms):
+    if not samples_ms:
+        return {}
+    values = np.asarray(samples_ms)
+    return {
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "mean_ms": round(float(values.mean()), 3),
+    }
+
+
+def dir_size_bytes(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def sample_questions(chunks, count: int, seed: int = 42):
+    """Perguntas reprodutíveis montadas a partir de trechos do próprio corpus."""
+    rng = np.random.default_rng(seed)
+    questions = []
+    for index in rng.choice(len(chunks), size=count, replace=count > len(chunks)):
+        words = chunks[index].page_content.split()
+        start = int(rng.integers(0, max(1, len(words) - 8)))
+        questions.append("O que o documento diz sobre " + " ".join(words[start:start + 8]) + "?")
+    return questions
+
+
+def write_collection(persist_dir: Path, ids, texts, metadatas, vectors, batch_size: int = 512):
+    store = Chroma(collection_name=COLLECTION_NAME, persist_directory=str(persist_dir), embedding_function=None)
+    for start in range(0, len(ids), batch_size):
+        end = start + batch_size
+        store._collection.upsert(
+            ids=ids[start:end], embeddings=vectors[start:end],
+            metadatas=metadatas[start:end], documents=texts[start:end]
+        )
+    return store
+
+
+# ======ETAPAS DA INGESTÃO======
+def bench_parse(dataset_dir: Path, config: Config):
+    """Leitura pelo mesmo caminho da ingestão (pool de ``config.LOAD_WORKERS`` processos)."""
+    processor = DocumentProcessor(config)
+    pdfs = sorted(dataset_dir.rglob("*.pdf"))
+    started = time.perf_counter()
+    pages, failed = [], 0
+    for _, loaded, error in processor._iter_loaded([str(pdf) for pdf in pdfs], str(dataset_dir)):
+        if error:
+            failed += 1
+        else:
+            pages.extend(loaded)
+    seconds = time.perf_counter() - started
+    size_mb = sum(pdf.stat().st_size for pdf in pdfs) / 1e6
+    return {
+        "files": len(pdfs), "failed": failed, "pages": len(pages), "input_mb": round(size_mb, 2),
+        "workers": min(config.LOAD_WORKERS, len(pdfs)), "seconds_s": round(seconds, 3),
+        "pages_per_s": round(len(pages) / seconds, 1) if seconds else 0.0,
+        "mb_per_s": round(size_mb / seconds, 2) if seconds else 0.0,
+    }, pages
+
+
+def bench_chunk(pages, config: Config):
+    """Chunks pelo mesmo caminho da ingestão (FileChunker), comparados à divisão genérica."""
+    chunker = FileChunker(config)
+    baseline = chunker.splitter.split_documents(pages)
+    by_source = {}
+    for page in pages:
+        copy = Document(page_content=page.page_content, metadata=dict(page.metadata))
+        by_source.setdefault(page.metadata["source"], []).append(copy)
+    stats = PipelineStats()
+    chunks = []
+    started = time.perf_counter()
+    for source, file_pages in by_source.items():
+        rel_path = str(Path(file_pages[0].metadata["folder"]) / file_pages[0].metadata["file_name"])
+        chunks.extend(chunker.split(file_pages, rel_path, file_sha256(Path(source)), stats))
+    seconds = time.perf_counter() - started
+    baseline_chars = sum(len(c.page_content) for c in baseline)
+    chars = sum(len(c.page_content) for c in chunks)
+    return {
+        "chunks": len(chunks), "seconds_s": round(seconds, 3),
+        "chunks_per_s": round(len(chunks) / seconds, 1) if seconds else 0.0,
+        "mean_chunk_chars": round(float(np.mean([len(c.page_content) for c in chunks])), 1) if chunks else 0.0,
+        "baseline_chunks": len(baseline), "near_duplicates": stats.duplicates, "furniture_lines": stats.furniture_lines,
+        "chunk_reduction": round(1 - len(chunks) / len(baseline), 4) if baseline else 0.0,
+        "embedded_chars": chars, "baseline_embedded_chars": baseline_chars,
+        "embedded_chars_saved": round(1 - chars / baseline_chars, 4) if baseline_chars else 0.0,
+    }, chunks
+
+
+def bench_embed(chunks, embedder: HashingEmbeddings):
+    started = time.perf_counter()
+    vectors = embedder.embed_documents([chunk.page_content for chunk in chunks])
+    seconds = time.perf_counter() - started
+    return {
+        "vectors": len(vectors), "dimensions": embedder.size, "seconds_s": round(seconds, 3),
+        "vectors_per_s": round(len(vectors) / seconds, 1) if seconds else 0.0,
+    }, vectors
+
+
+def bench_chroma_build(chunks, vectors, persist_dir: Path):
+    ids = [chunk.metadata["chunk_id"] for chunk in chunks]
+    started = time.perf_counter()
+    store = write_collection(persist_dir, ids, [c.page_content for c in chunks], [c.metadata for c in chunks], vectors)
+    seconds = time.perf_counter() - started
+    return {
+        "vectors": store._collection.count(), "seconds_s": round(seconds, 3),
+        "vectors_per_s": round(len(ids) / seconds, 1) if seconds else 0.0,
+        "disk_bytes": dir_size_bytes(persist_dir),
+    }
+
+
+def bench_bm25_build(chunks, index_dir: Path):
+    started = time.perf_counter()
+    info = build_bm25_index(((c.metadata["chunk_id"], c.page_content) for c in chunks), str(index_dir))
+    seconds = time.perf_counter() - started
+    return {**info, "seconds_s": round(seconds, 3), "disk_bytes": dir_size_bytes(index_dir)}
+
+
+def recall_at_k(found_ids, exact_ids) -> float:
+    hits = [len(set(found) & set(exact)) / len(exact) for found, exact in zip(found_ids, exact_ids) if exact]
+    return round(float(np.mean(hits)), 4) if hits else 0.0
+
+
+def bench_vector_index(ids, texts, metadatas, matrix, query_vectors, exact_ids, index_dir: Path, dtype: str, k: int):
+    started = time.perf_counter()
+    info = build_vector_index(zip(ids, texts, metadatas, matrix), str(index_dir), dtype=dtype)
+    build_s = time.perf_counter() - started
+    started = time.perf_counter()
+    index = VectorIndex(str(index_dir))
+    open_ms = (time.perf_counter() - started) * 1000
+    latencies, found = [], []
+    for vector in query_vectors:
+        started = time.perf_counter()
+        result = index.query([vector], n_results=k, include=[])
+        latencies.append((time.perf_counter() - started) * 1000)
+        found.append(result["ids"][0])
+    disk_bytes = dir_size_bytes(index_dir)
+    # O índice é um link para a versão publicada: apaga a versão e depois o link
+    shutil.rmtree(index_dir.resolve(), ignore_errors=True)
+    index_dir.unlink(missing_ok=True)
+    return {
+        "nlist": info["nlist"], "build_s": round(build_s, 3), "open_ms": round(open_ms, 3), "disk_bytes": disk_bytes,
+        "query": percentiles(latencies), "recall_at_k": recall_at_k(found, exact_ids),
+    }
+
+
+# ======LATÊNCIA DA BUSCA POR TAMANHO DE BASE======
+def bench_search(chunks, vectors, embedder, sizes, questions, workdir: Path, k: int = 3,
+                 dtypes=("int8", "float16")):
+    """Replica o corpus (com pequeno ruído nos vetores) até cada tamanho e mede a busca."""
+    rng = np.random.default_rng(7)
+    base = np.asarray(vectors, dtype=np.float32)
+    results = {}
+    for size in sizes:
+        copies = -(-size // len(chunks))
+        ids, texts, metadatas, matrix = [], [], [], []
+        for copy in range(copies):
+            noisy = base + (rng.normal(0, 0.01, base.shape).astype(np.float32) if copy else 0)
+            noisy /= np.linalg.norm(noisy, axis=1, keepdims=True).clip(min=1e-9)
+            for chunk, vector in zip(chunks, noisy):
+                ids.append(f"{chunk.metadata['chunk_id']}-c{copy}")
+                texts.append(chunk.page_content)
+                metadatas.append(chunk.metadata)
+                matrix.append(vector.tolist())
+        ids, texts, metadatas, matrix = ids[:size], texts[:size], metadatas[:size], matrix[:size]
+
+        persist_dir = workdir / f"search_{size}"
+        write_collection(persist_dir, ids, texts, metadatas, matrix)
+        started = time.perf_counter()
+        store = Chroma(collection_name=COLLECTION_NAME, persist_directory=str(persist_dir), embedding_function=embedder)
+        store._collection.count()
+        chroma_open_ms = (time.perf_counter() - started) * 1000
+        index_dir = workdir / f"bm25_{size}"
+        build_bm25_index(zip(ids, texts), str(index_dir))
+        bm25 = BM25Index(str(index_dir))
+
+        store.similarity_search_with_score(questions[0], k=k)  # aquecimento do HNSW
+        vector_ms, bm25_ms, chroma_ms, chroma_ids = [], [], [], []
+        query_vectors = embedder.embed_documents(questions)
+        for question, query_vector in zip(questions, query_vectors):
+            started = time.perf_counter()
+            store.similarity_search_with_score(question, k=k)
+            vector_ms.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            bm25.search(question, 10)
+            bm25_ms.append((time.perf_counter() - started) * 1000)
+            # Só a busca vetorial (sem embedding), comparável ao índice compacto
+            started = time.perf_counter()
+            chroma_ids.append(store._collection.query(query_embeddings=[query_vector], n_results=k, include=[])["ids"][0])
+            chroma_ms.append((time.perf_counter() - started) * 1000)
+
+        # Referência: busca exata em float32 sobre a mesma matriz
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True).clip(min=1e-9)
+        exact = np.argsort(-(queries @ np.asarray(matrix, dtype=np.float32).T), axis=1)[:, :k]
+        exact_ids = [[ids[i] for i in row] for row in exact]
+
+        results[str(size)] = {
+            "vectors": store._collection.count(),
+            "similarity_search_with_score": percentiles(vector_ms),
+            "bm25_search": percentiles(bm25_ms),
+            "chroma": {
+                "open_ms": round(chroma_open_ms, 3), "disk_bytes": dir_size_bytes(persist_dir),
+                "query": percentiles(chroma_ms), "recall_at_k": recall_at_k(chroma_ids, exact_ids),
+            },
+        }
+        for dtype in dtypes:
+            results[str(size)][f"numpy_{dtype}"] = bench_vector_index(
+                ids, texts, metadatas, matrix, query_vectors, exact_ids, workdir / f"vectors_{size}_{dtype}", dtype, k
+            )
+        shutil.rmtree(persist_dir, ignore_errors=True)
+    return results
+
+
+# ======/query PONTA A PONTA======
+def bench_query(persist_dir: Path, bm25_dir: Path, embedder, questions, requests: int, concurrency: int,
+                embedding_latency: float, generation_latency: float, endpoint: str = "/query"):
+    # Caches desligados: cada requisição percorre embedding, busca, reranking e geração
+    os.environ.setdefault("ANSWER_CACHE_ENABLED", "false")
+    os.environ.setdefault("QUERY_CACHE_TTL", "0")
+    os.environ.setdefault("BEDROCK_MAX_CONCURRENCY", str(max(concurrency, 1)))
+    import httpx
+    from langchain_aws.embeddings import BedrockEmbeddings
+    from chat import chatbot
+    from chat.hybrid_search import LexicalIndex
+
+    stub = StubBedrockRuntime(embedder, embedding_latency, generation_latency)
+    chatbot.bedrock_client = stub
+    chatbot.embeddings = BedrockEmbeddings(client=stub, model_id=chatbot.EMBEDDING_MODEL_ID)
+    chatbot.collection = Chroma(collection_name=COLLECTION_NAME, persist_directory=str(persist_dir), embedding_function=embedder)._collection
+    chatbot.lexical_index = LexicalIndex(str(bm25_dir))
+    chatbot.startup_state["ready"] = True
+
+    latencies, statuses = [], {}
+
+    async def run():
+        queue = asyncio.Queue()
+        for i in range(requests):
+            queue.put_nowait(questions[i % len(questions)])
+        transport = httpx.ASGITransport(app=chatbot.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            async def worker():
+                while not queue.empty():
+                    question = queue.get_nowait()
+                    started = time.perf_counter()
+                    response = await client.post(endpoint, json={"question": question})
+                    await response.aread()
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    seconds = time.perf_counter() - started
+    return {
+        "endpoint": endpoint, "requests": requests, "concurrency": concurrency,
+        "embedding_latency_ms": embedding_latency * 1000, "generation_latency_ms": generation_latency * 1000,
+        "status_codes": {str(code): count for code, count in statuses.items()},
+        "llm_calls": stub.calls["generation"],
+        "seconds_s": round(seconds, 3),
+        "requests_per_s": round(requests / seconds, 2) if seconds else 0.0,
+        **percentiles(latencies),
+    }
+
+
+# ======COMPARAÇÃO COM UMA EXECUÇÃO ANTERIOR======
+def flatten(data, prefix=""):
+    items = {}
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            items.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            items[name] = value
+    return items
+
+
+def compare(current: dict, baseline: dict, max_regression: float):
+    """Variação das métricas de tempo (_ms, _s: menor é melhor) e vazão (_per_s: maior é melhor)."""
+    now, before = flatten(current["stages"]), flatten(baseline["stages"])
+    regressions = []
+    for name in sorted(set(now) & set(before)):
+        old, new = before[name], now[name]
+        if not old:
+            continue
+        if name.endswith("_per_s"):
+            change = (old - new) / old
+        elif name.endswith("_ms") or name.endswith("_s"):
+            change = (new - old) / old
+        else:
+            continue
+        flag = "⚠" if change > max_regression else " "
+        print(f"{flag} {name:<70} {old:>12.3f} → {new:>12.3f} ({change:+.1%} pior)" if change > 0
+              else f"{flag} {name:<70} {old:>12.3f} → {new:>12.3f} ({-change:.1%} melhor)")
+        if change > max_regression:
+            regressions.append(name)
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+# ======EXECUÇÃO======
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks offline do RAG jurídico (AWS substituída por stubs)")
+    parser.add_argument("--dataset", default=str(REPO_ROOT / "dataset"), help="Pasta com os PDFs")
+    parser.add_argument("--output", default="benchmark_results.json", help="Arquivo JSON com os resultados")
+    parser.add_argument("--load-workers", type=int, default=os.cpu_count() or 1,
+                        help="Processos que leem os PDFs (LOAD_WORKERS da ingestão)")
+    parser.add_argument("--sizes", default="1000,5000,20000", help="Tamanhos de base para a latência de busca")
+    parser.add_argument("--questions", type=int, default=50, help="Perguntas por medição de busca")
+    parser.add_argument("--vector-dtypes", default="int8,float16", help="Quantizações do índice compacto comparadas ao Chroma")
+    parser.add_argument("--requests", type=int, default=200, help="Requisições no teste de /query")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requisições simultâneas no teste de /query")
+    parser.add_argument("--embedding-latency-ms", type=float, default=20.0, help="Latência simulada do Titan")
+    parser.add_argument("--generation-latency-ms", type=float, default=300.0, help="Latência simulada do Nova Pro")
+    parser.add_argument("--dimensions", type=int, default=1024, help="Dimensão dos embeddings falsos")
+    parser.add_argument("--skip-query", action="store_true", help="Não executa o teste ponta a ponta de /query")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparação")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Piora relativa tolerada (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    embedder = HashingEmbeddings(size=args.dimensions)
+    workdir = Path(tempfile.mkdtemp(prefix="rag-bench-"))
+    config = Config()
+    config.LOAD_WORKERS = args.load_workers
+    # Sem Bedrock: o DocumentProcessor da leitura não gera embeddings, só precisa existir
+    config.EMBEDDING_MODE = "FAKE"
+    config.EMBEDDING_CACHE_PATH = str(workdir / "embedding_cache.sqlite3")
+    stages = {}
+    try:
+        print("📄 Lendo PDFs...")
+        stages["parse"], pages = bench_parse(Path(args.dataset), config)
+        print("✂ Dividindo em chunks...")
+        stages["chunk"], chunks = bench_chunk(pages, config)
+        if not chunks:
+            raise SystemExit("Nenhum chunk gerado: verifique --dataset")
+        print("🔢 Gerando embeddings determinísticos...")
+        stages["embed"], vectors = bench_embed(chunks, embedder)
+        print("🗄 Construindo o Chroma...")
+        stages["chroma_build"] = bench_chroma_build(chunks, vectors, workdir / "chroma")
+        stages["bm25_build"] = bench_bm25_build(chunks, workdir / "bm25")
+
+        questions = sample_questions(chunks, args.questions)
+        sizes = [int(size) for size in args.sizes.split(",") if size]
+        print(f"🔍 Latência da busca em {sizes}...")
+        dtypes = [dtype for dtype in args.vector_dtypes.split(",") if dtype]
+        stages["search"] = bench_search(chunks, vectors, embedder, sizes, questions, workdir, dtypes=dtypes)
+
+        if not args.skip_query:
+            print(f"🚀 /query com {args.requests} requisições, {args.concurrency} simultâneas...")
+            stages["query"] = bench_query(
+                workdir / "chroma", workdir / "bm25", embedder, questions, args.requests, args.concurrency,
+                args.embedding_latency_ms / 1000, args.generation_latency_ms / 1000
+            )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "stages": stages,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(json.dumps(stages, ensure_ascii=False, indent=2))
+    print(f"💾 Resultados salvos em {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print(f"🚨 {len(regressions)} métrica(s) pioraram mais de {args.max_regression:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
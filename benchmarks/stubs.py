@@ -0,0 +1,97 @@
+# Substitutos locais da AWS para os benchmarks: nada aqui acessa a rede
+import json
+import time
+import hashlib
+from typing import List
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from rag_juridico.bm25_index import tokenize
+
+
+class HashingEmbeddings(Embeddings):
+    """Embeddings determinísticos por hashing dos termos (bag-of-words normalizado).
+
+    Textos com termos em comum ficam próximos, então a busca e o reranking se comportam
+    como numa base real, sem depender de aleatoriedade entre execuções.
+    """
+
+    def __init__(self, size: int = 1024, latency: float = 0.0):
+        self.size = size
+        self.latency = latency
+
+    def embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.size, dtype=np.float32)
+        for token in tokenize(text):
+            digest = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[digest % self.size] += 1.0 if (digest >> 63) else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.latency:
+            time.sleep(self.latency)
+        return self.embed(text)
+
+
+class _Body:
+    def __init__(self, payload: dict):
+        self._data = json.dumps(payload).encode("utf-8")
+
+    def read(self):
+        return self._data
+
+
+STUB_ANSWER = (
+    "### Resposta Final: O agravo é cabível contra a decisão que inadmite o recurso extraordinário. "
+    "### Análise Jurídica: A decisão aplicou a jurisprudência do Supremo Tribunal Federal ao caso concreto, "
+    "considerando os fundamentos do acórdão recorrido e os requisitos de admissibilidade. "
+    "### Conclusão: Recomenda-se verificar os prazos e a demonstração da repercussão geral."
+)
+
+
+class StubBedrockRuntime:
+    """Imita o cliente ``bedrock-runtime``: Titan (inputText) e Nova Pro (messages), com latência configurável."""
+
+    def __init__(self, embeddings: HashingEmbeddings, embedding_latency: float = 0.02,
+                 generation_latency: float = 0.3, stream_chunks: int = 20):
+        self.embeddings = embeddings
+        self.embedding_latency = embedding_latency
+        self.generation_latency = generation_latency
+        self.stream_chunks = stream_chunks
+        self.calls = {"embedding": 0, "generation": 0}
+
+    def _usage(self, body: dict) -> dict:
+        prompt = "".join(part.get("text", "") for message in body.get("messages", []) for part in message.get("content", []))
+        return {"inputTokens": len(prompt) // 4, "outputTokens": len(STUB_ANSWER) // 4}
+
+    def invoke_model(self, modelId=None, body=None, **kwargs):
+        request = json.loads(body)
+        if "inputText" in request:
+            self.calls["embedding"] += 1
+            time.sleep(self.embedding_latency)
+            vector = self.embeddings.embed(request["inputText"])
+            return {"body": _Body({"embedding": vector, "inputTextTokenCount": len(request["inputText"]) // 4})}
+        self.calls["generation"] += 1
+        time.sleep(self.generation_latency)
+        return {"body": _Body({
+            "output": {"message": {"role": "assistant", "content": [{"text": STUB_ANSWER}]}},
+            "usage": self._usage(request)
+        })}
+
+    def invoke_model_with_response_stream(self, modelId=None, body=None, **kwargs):
+        request = json.loads(body)
+        self.calls["generation"] += 1
+        step = max(1, len(STUB_ANSWER) // self.stream_chunks)
+        delay = self.generation_latency / self.stream_chunks
+
+        def events():
+            for start in range(0, len(STUB_ANSWER), step):
+                time.sleep(delay)
+                delta = {"contentBlockDelta": {"delta": {"text": STUB_ANSWER[start:start + step]}}}
+                yield {"chunk": {"bytes": json.dumps(delta).encode("utf-8")}}
+            yield {"chunk": {"bytes": json.dumps({"metadata": {"usage": self._usage(request)}}).encode("utf-8")}}
+
+        return {"body": events()}
@@ -4,15 +4,21 @@ import os
 from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters
 from logger.cloudwatch_logger import log_to_cloudwatch
 from handlers.bot_handlers import start, responder
+from handlers.api_client import api_client
 
 # Carrega variáveis do .env
 dotenv_path = Path(__file__).resolve().parent / ".env"
 load_dotenv(dotenv_path=dotenv_path)
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 
+# Fecha as conexões mantidas com a API ao encerrar o bot
+async def encerrar(application):
+    await api_client.fechar()
+
 # Inicializa o bot
 if __name__ == "__main__":
-    app = ApplicationBuilder().token(TELEGRAM_TOKEN).build()
+    # concurrent_updates: cada mensagem é tratada numa tarefa própria, sem esperar as anteriores
+    app = ApplicationBuilder().token(TELEGRAM_TOKEN).concurrent_updates(True).post_shutdown(encerrar).build()
 
     app.add_handler(CommandHandler("start", start))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, responder))
@@ -1,10 +1,22 @@
-import os
-from dotenv import load_dotenv
-from pathlib import Path
-
-# Sobe um nível para buscar o .env ao lado do docker-compose.yml
-dotenv_path = Path(__file__).resolve().parents[2] / ".env"
-load_dotenv(dotenv_path=dotenv_path)
-
-TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-API_URL = os.getenv("API_URL", "http://fastapi-api:8000")
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+
+# Sobe um nível para buscar o .env ao lado do docker-compose.yml
+dotenv_path = Path(__file__).resolve().parents[2] / ".env"
+load_dotenv(dotenv_path=dotenv_path)
+
+TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+API_URL = os.getenv("API_URL", "http://fastapi-api:8000")
+
+# Cliente HTTP da API: timeouts em segundos, conexões mantidas abertas e chamadas simultâneas
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "5"))
+API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "120"))
+API_MAX_CONNECTIONS = int(os.getenv("API_MAX_CONNECTIONS", "20"))
+API_MAX_INFLIGHT = int(os.getenv("API_MAX_INFLIGHT", "10"))
+
+# Respostas em streaming (SSE) com edição progressiva da mensagem no Telegram
+STREAMING_ENABLED = os.getenv("STREAMING_ENABLED", "true").lower() == "true"
+API_STREAM_URL = os.getenv("API_STREAM_URL", API_URL.rstrip("/") + "/stream")
+# Intervalo mínimo entre edições da mesma mensagem (o Telegram limita ~1 edição/s por chat)
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.5"))
@@ -0,0 +1,153 @@
+# Cliente assíncrono da API FastAPI: conexões reaproveitadas, timeouts e perguntas repetidas agrupadas
+import re
+import json
+import asyncio
+import contextlib
+import httpx
+from telegram.constants import ChatAction
+from config import (
+    API_URL, API_STREAM_URL, API_CONNECT_TIMEOUT, API_READ_TIMEOUT,
+    API_MAX_CONNECTIONS, API_MAX_INFLIGHT
+)
+
+
+# Lê um stream Server-Sent Events e gera pares (evento, dados)
+async def ler_eventos_sse(response: httpx.Response):
+    evento, dados = "message", []
+    async for linha in response.aiter_lines():
+        if linha.startswith("event:"):
+            evento = linha[len("event:"):].strip()
+        elif linha.startswith("data:"):
+            dados.append(linha[len("data:"):].strip())
+        elif not linha and dados:
+            # Linha em branco encerra o evento
+            yield evento, json.loads("\n".join(dados))
+            evento, dados = "message", []
+
+
+# Chave usada para agrupar a mesma pergunta vinda de chats diferentes
+def chave_pergunta(pergunta: str) -> str:
+    return re.sub(r"\s+", " ", pergunta.strip().lower())
+
+
+# X-Request-ID liga os logs do bot aos da API (perguntas agrupadas levam o ID de quem chegou primeiro)
+def cabecalhos(request_id: str = None) -> dict:
+    return {"X-Request-ID": request_id} if request_id else {}
+
+
+# Eventos de um stream compartilhado: quem chega depois recebe tudo desde o início
+class TransmissaoCompartilhada:
+    def __init__(self):
+        self.eventos = []
+        self.encerrada = False
+        self.erro = None
+        self.condicao = asyncio.Condition()
+
+    async def publicar(self, evento):
+        async with self.condicao:
+            self.eventos.append(evento)
+            self.condicao.notify_all()
+
+    async def encerrar(self, erro: Exception = None):
+        async with self.condicao:
+            self.encerrada, self.erro = True, erro
+            self.condicao.notify_all()
+
+    async def assinar(self):
+        lidos = 0
+        while True:
+            async with self.condicao:
+                await self.condicao.wait_for(lambda: lidos < len(self.eventos) or self.encerrada)
+                novos = self.eventos[lidos:]
+                terminou = self.encerrada
+            for evento in novos:
+                yield evento
+            lidos += len(novos)
+            if terminou and lidos >= len(self.eventos):
+                if self.erro is not None:
+                    raise self.erro
+                return
+
+
+class ApiClient:
+    def __init__(self):
+        self._client = None
+        self._limite = asyncio.Semaphore(API_MAX_INFLIGHT)  # Chamadas simultâneas à API
+        self._consultas = {}  # Pergunta -> tarefa em andamento (/query)
+        self._transmissoes = {}  # Pergunta -> stream em andamento (/query/stream)
+
+    # Um único cliente com keep-alive para todas as conversas
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(API_READ_TIMEOUT, connect=API_CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=API_MAX_CONNECTIONS, max_keepalive_connections=API_MAX_CONNECTIONS)
+            )
+        return self._client
+
+    async def fechar(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _consultar(self, pergunta: str, request_id: str = None) -> dict:
+        async with self._limite:
+            response = await self.client.post(API_URL, json={"question": pergunta}, headers=cabecalhos(request_id))
+            response.raise_for_status()
+            return response.json()
+
+    # POST /query; chats fazendo a mesma pergunta ao mesmo tempo compartilham a chamada
+    async def consultar(self, pergunta: str, request_id: str = None) -> dict:
+        chave = chave_pergunta(pergunta)
+        tarefa = self._consultas.get(chave)
+        if tarefa is None:
+            tarefa = asyncio.ensure_future(self._consultar(pergunta, request_id))
+            self._consultas[chave] = tarefa
+            tarefa.add_done_callback(lambda _: self._consultas.pop(chave, None))
+        # shield: se um chat desistir, a chamada continua para os outros
+        return await asyncio.shield(tarefa)
+
+    async def _transmitir(self, chave: str, pergunta: str, transmissao: TransmissaoCompartilhada, request_id: str = None):
+        try:
+            async with self._limite:
+                async with self.client.stream(
+                    "POST", API_STREAM_URL, json={"question": pergunta}, headers=cabecalhos(request_id)
+                ) as response:
+                    response.raise_for_status()
+                    async for evento in ler_eventos_sse(response):
+                        await transmissao.publicar(evento)
+            await transmissao.encerrar()
+        except Exception as e:
+            await transmissao.encerrar(e)
+        finally:
+            self._transmissoes.pop(chave, None)
+
+    # POST /query/stream agrupado: gera (evento, dados) para cada chat interessado
+    def consultar_em_streaming(self, pergunta: str, request_id: str = None):
+        chave = chave_pergunta(pergunta)
+        transmissao = self._transmissoes.get(chave)
+        if transmissao is None:
+            transmissao = TransmissaoCompartilhada()
+            self._transmissoes[chave] = transmissao
+            asyncio.ensure_future(self._transmitir(chave, pergunta, transmissao, request_id))
+        return transmissao.assinar()
+
+
+api_client = ApiClient()
+
+
+# Mantém o "digitando…" visível enquanto a resposta não chega (o Telegram o apaga após ~5s)
+@contextlib.asynccontextmanager
+async def indicador_digitando(context, chat_id: int):
+    async def repetir():
+        while True:
+            with contextlib.suppress(Exception):
+                await context.bot.send_chat_action(chat_id=chat_id, action=ChatAction.TYPING)
+            await asyncio.sleep(4)
+
+    tarefa = asyncio.create_task(repetir())
+    try:
+        yield
+    finally:
+        tarefa.cancel()
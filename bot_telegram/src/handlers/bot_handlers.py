@@ -1,9 +1,11 @@
 # Importações principais da biblioteca python-telegram-bot
 from telegram import Update
 from telegram.ext import ContextTypes
-import requests
+import httpx
 from logger.cloudwatch_logger import log_to_cloudwatch
-from config import API_URL  # URL da API FastAPI para envio das perguntas
+from config import STREAMING_ENABLED
+from handlers.api_client import api_client, indicador_digitando  # Cliente da API FastAPI (pool de conexões)
+from handlers.streaming import MensagemProgressiva, responder_em_streaming
 
 # Função que responde ao comando /start
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -16,15 +18,18 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # Função principal para responder perguntas dos usuários
 async def responder(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_question = update.message.text  # Captura a pergunta feita pelo usuário
-    print(f"📩 Pergunta recebida: {user_question}")
-    log_to_cloudwatch(f"Pergunta recebida: {user_question}")  # Log da pergunta recebida
+    request_id = f"tg-{update.update_id}"  # Enviado à API no cabeçalho X-Request-ID
+    print(f"📩 [{request_id}] Pergunta recebida: {user_question}")
+    log_to_cloudwatch(f"[{request_id}] Pergunta recebida: {user_question}")  # Log da pergunta recebida
 
-    try:
-        # Envia a pergunta para a API FastAPI via POST
-        response = requests.post(API_URL, json={"question": user_question})
-        response.raise_for_status()  # Lança exceção se a resposta for erro HTTP
+    if STREAMING_ENABLED:
+        await responder_streaming(update, context)
+        return
 
-        result = response.json()  # Converte a resposta da API para JSON
+    try:
+        # Envia a pergunta para a API FastAPI sem bloquear os outros chats, com "digitando…" enquanto espera
+        async with indicador_digitando(context, update.effective_chat.id):
+            result = await api_client.consultar(user_question, request_id)
 
         print("📦 Resposta recebida da API.")
         log_to_cloudwatch(f"Resposta da API: {result}")  # Log da resposta
@@ -42,18 +47,41 @@ async def responder(update: Update, context: ContextTypes.DEFAULT_TYPE):
         print("✅ Resposta enviada com sucesso.")
         log_to_cloudwatch("Resposta enviada com sucesso.")  # Log de sucesso
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         # Caso ocorra erro de conexão ou timeout
         print(f"⚠️ Erro na requisição HTTP: {str(e)}")
-        log_to_cloudwatch(f"Erro na requisição HTTP: {str(e)}", level="ERROR")
+        log_to_cloudwatch(f"[tg-{update.update_id}] Erro na requisição HTTP: {str(e)}", level="ERROR")
         await update.message.reply_text("⚠️ Não foi possível obter uma resposta da API.")
 
     except Exception as e:
         # Captura qualquer outro erro inesperado
         print(f"🔥 Erro inesperado: {str(e)}")
-        log_to_cloudwatch(f"Erro inesperado: {str(e)}", level="ERROR")
+        log_to_cloudwatch(f"[tg-{update.update_id}] Erro inesperado: {str(e)}", level="ERROR")
         await update.message.reply_text("⚠️ Ocorreu um erro ao consultar a resposta.")
 
+# Versão em streaming: a resposta aparece no Telegram enquanto o modelo ainda gera o texto
+async def responder_streaming(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # O erro substitui o "⏳ Consultando..." em vez de deixá-lo parado na conversa
+    mensagem = MensagemProgressiva(update)
+    try:
+        async with indicador_digitando(context, update.effective_chat.id):
+            await responder_em_streaming(update, context, mensagem)
+
+        print("✅ Resposta enviada com sucesso.")
+        log_to_cloudwatch("Resposta enviada com sucesso.")  # Log de sucesso
+
+    except httpx.HTTPError as e:
+        # Caso ocorra erro de conexão ou timeout
+        print(f"⚠️ Erro na requisição HTTP: {str(e)}")
+        log_to_cloudwatch(f"[tg-{update.update_id}] Erro na requisição HTTP: {str(e)}", level="ERROR")
+        await mensagem.falhar("⚠️ Não foi possível obter uma resposta da API.")
+
+    except Exception as e:
+        # Captura qualquer outro erro inesperado
+        print(f"🔥 Erro inesperado: {str(e)}")
+        log_to_cloudwatch(f"[tg-{update.update_id}] Erro inesperado: {str(e)}", level="ERROR")
+        await mensagem.falhar("⚠️ Ocorreu um erro ao consultar a resposta.")
+
 # Função auxiliar para enviar respostas muito longas em partes
 async def enviar_resposta_em_partes(update: Update, resposta: str):
     # Divide o texto da resposta em blocos de até 4000 caracteres
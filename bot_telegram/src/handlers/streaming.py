@@ -0,0 +1,106 @@
+# Resposta em streaming: consome o SSE de /query/stream e edita a mensagem aos poucos
+import time
+import asyncio
+from telegram import Update
+from telegram.ext import ContextTypes
+from telegram.error import BadRequest, RetryAfter
+from logger.cloudwatch_logger import log_to_cloudwatch
+from config import STREAM_EDIT_INTERVAL
+from handlers.api_client import api_client
+
+# Limite prático de caracteres por mensagem (o Telegram aceita até 4096)
+LIMITE_MENSAGEM = 4000
+
+
+# Mensagem do Telegram editada conforme o texto chega, respeitando o limite de edições
+class MensagemProgressiva:
+    def __init__(self, update: Update, intervalo: float = STREAM_EDIT_INTERVAL):
+        self.update = update
+        self.intervalo = intervalo
+        self.mensagem = None  # Mensagem sendo editada no momento
+        self.texto = ""  # Texto da mensagem atual (ainda não dividido)
+        self.texto_enviado = ""
+        self.ultima_edicao = 0.0
+
+    # Envia o aviso inicial que será substituído pela resposta
+    async def iniciar(self, aviso: str = "⏳ Consultando os documentos..."):
+        self.mensagem = await self.update.message.reply_text(aviso)
+        self.texto_enviado = aviso
+        self.ultima_edicao = time.monotonic()
+
+    async def _enviar(self, texto: str, obrigatorio: bool = False):
+        if not texto.strip() or texto == self.texto_enviado:
+            return
+        try:
+            if self.mensagem is None:
+                self.mensagem = await self.update.message.reply_text(texto)
+            else:
+                await self.mensagem.edit_text(texto)
+            self.texto_enviado = texto
+            self.ultima_edicao = time.monotonic()
+        except RetryAfter as e:
+            # Edições intermediárias podem ser puladas; a final espera o Telegram liberar
+            if obrigatorio:
+                await asyncio.sleep(e.retry_after)
+                await self._enviar(texto, obrigatorio)
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                raise
+
+    # Acrescenta um trecho; ao passar do limite, fecha a mensagem e abre outra
+    async def adicionar(self, trecho: str):
+        self.texto += trecho
+        while len(self.texto) > LIMITE_MENSAGEM:
+            # Prefere quebrar numa linha ou num espaço para não cortar palavras
+            corte = self.texto.rfind("\n", 0, LIMITE_MENSAGEM)
+            if corte < LIMITE_MENSAGEM // 2:
+                corte = self.texto.rfind(" ", 0, LIMITE_MENSAGEM)
+            if corte < LIMITE_MENSAGEM // 2:
+                corte = LIMITE_MENSAGEM
+            await self._enviar(self.texto[:corte], obrigatorio=True)
+            self.texto = self.texto[corte:].lstrip()
+            self.mensagem, self.texto_enviado = None, ""
+        if time.monotonic() - self.ultima_edicao >= self.intervalo:
+            await self._enviar(self.texto)
+
+    async def finalizar(self):
+        await self._enviar(self.texto, obrigatorio=True)
+
+    # Stream interrompido: o aviso inicial vira a mensagem de erro (ou, se já chegou parte da
+    # resposta, ela fica na tela e o erro vai numa mensagem nova)
+    async def falhar(self, aviso: str):
+        try:
+            if self.texto.strip():
+                await self._enviar(self.texto, obrigatorio=True)
+            elif self.mensagem is not None:
+                await self.mensagem.edit_text(aviso)
+                self.texto_enviado = aviso
+                return
+        except Exception as e:
+            print(f"⚠️ Não foi possível editar a mensagem após o erro: {str(e)}")
+        await self.update.message.reply_text(aviso)
+
+
+# Responde à pergunta consumindo a API em streaming
+async def responder_em_streaming(update: Update, context: ContextTypes.DEFAULT_TYPE,
+                                 mensagem: MensagemProgressiva = None):
+    user_question = update.message.text
+    mensagem = mensagem or MensagemProgressiva(update)
+    await mensagem.iniciar()
+
+    inicio = time.monotonic()
+    primeiro_token = None
+    request_id = f"tg-{update.update_id}"
+    async for evento, dados in api_client.consultar_em_streaming(user_question, request_id):
+        if evento == "token":
+            if primeiro_token is None:
+                primeiro_token = time.monotonic() - inicio
+            await mensagem.adicionar(dados["text"])
+        elif evento == "error":
+            raise RuntimeError(dados.get("detail", "Erro no streaming da API"))
+        elif evento == "done":
+            log_to_cloudwatch(f"[{request_id}] Uso da consulta: {dados.get('usage', {})}")
+
+    await mensagem.finalizar()
+    if primeiro_token is not None:
+        print(f"⚡ Primeiro trecho em {primeiro_token:.2f}s, resposta completa em {time.monotonic() - inicio:.2f}s")
@@ -1,47 +1,163 @@
 import boto3
 import os
-from datetime import datetime
+import time
+import queue
+import logging
+import threading
 
-def log_to_cloudwatch(message, level="INFO", stream_name="telegram-bot"):
-    try:
-        logs_client = boto3.client(
-            "logs",
-            region_name="us-east-1",
-            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-            aws_session_token=os.getenv("AWS_SESSION_TOKEN"),
-        )
-
-        log_group = "chatbot-juridico"
-        timestamp = int(datetime.now().timestamp() * 1000)
-
-        # Cria grupo se não existir
+LOG_GROUP = "chatbot-juridico"
+# Arquivo local usado quando a fila enche ou o CloudWatch está indisponível
+FALLBACK_PATH = os.getenv("CLOUDWATCH_FALLBACK_PATH", "cloudwatch_fallback.log")
+
+# Limites do put_log_events: 10.000 eventos ou ~1 MB por lote, 256 KB por evento
+MAX_BATCH_EVENTS = 10000
+MAX_BATCH_BYTES = 1_000_000
+MAX_EVENT_BYTES = 256 * 1024 - 26
+EVENT_OVERHEAD = 26
+
+
+def _create_logs_client():
+    return boto3.client(
+        "logs",
+        region_name="us-east-1",
+        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+        aws_session_token=os.getenv("AWS_SESSION_TOKEN"),
+    )
+
+
+class CloudWatchHandler(logging.Handler):
+    """Handler de logging que enfileira os registros em memória e os envia ao CloudWatch
+    em lotes, numa thread em segundo plano, por tamanho do lote ou por tempo."""
+
+    def __init__(self, log_group=LOG_GROUP, stream_name="telegram-bot", client=None,
+                 batch_size=100, flush_interval=5.0, max_queue=10000, fallback_path=FALLBACK_PATH):
+        super().__init__()
+        self.log_group = log_group
+        self.stream_name = stream_name
+        self.batch_size = min(batch_size, MAX_BATCH_EVENTS)
+        self.flush_interval = flush_interval
+        self._client = client
+        self._stream_ready = False
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._fallback = logging.FileHandler(fallback_path, delay=True, encoding="utf-8")
+        self._fallback.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        self._flush_now = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"cloudwatch-{stream_name}", daemon=True)
+        self._thread.start()
+
+    # ======LADO DE QUEM LOGA: SÓ ENFILEIRA======
+    def emit(self, record):
         try:
-            logs_client.create_log_group(logGroupName=log_group)
-        except logs_client.exceptions.ResourceAlreadyExistsException:
-            pass
+            message = self.format(record).encode("utf-8")[:MAX_EVENT_BYTES].decode("utf-8", "ignore")
+            self._queue.put_nowait({"timestamp": int(record.created * 1000), "message": message})
+        except queue.Full:
+            # Fila cheia: o registro vai para o arquivo local em vez de travar quem loga
+            self._write_fallback(message, record.created)
+        except Exception:
+            self.handleError(record)
+
+    def _write_fallback(self, message, created):
+        # Chamado por quem loga (fila cheia) e pela thread de envio (falha no CloudWatch): o lock do
+        # handler (reentrante, já em posse de quem está no emit) serializa as escritas no arquivo
+        with self.lock:
+            self._fallback.emit(logging.makeLogRecord({"msg": message, "created": created}))
 
-        # Cria stream se não existir
+    # ======THREAD DE ENVIO======
+    def _ensure_stream(self):
+        if self._stream_ready:
+            return
+        if self._client is None:
+            self._client = _create_logs_client()
+        # Grupo e stream são criados uma única vez por processo
+        for create, kwargs in (
+            (self._client.create_log_group, {"logGroupName": self.log_group}),
+            (self._client.create_log_stream, {"logGroupName": self.log_group, "logStreamName": self.stream_name}),
+        ):
+            try:
+                create(**kwargs)
+            except self._client.exceptions.ResourceAlreadyExistsException:
+                pass
+        self._stream_ready = True
+
+    def _send(self, batch):
+        batch.sort(key=lambda event: event["timestamp"])  # O CloudWatch exige ordem cronológica
         try:
-            logs_client.create_log_stream(logGroupName=log_group, logStreamName=stream_name)
-            sequence_token = None
-        except logs_client.exceptions.ResourceAlreadyExistsException:
-            streams = logs_client.describe_log_streams(logGroupName=log_group, logStreamNamePrefix=stream_name)
-            sequence_token = streams['logStreams'][0].get('uploadSequenceToken')
-
-        log_event = {
-            'logGroupName': log_group,
-            'logStreamName': stream_name,
-            'logEvents': [{
-                'timestamp': timestamp,
-                'message': f"[{level}] {message}"
-            }]
-        }
-
-        if sequence_token:
-            log_event['sequenceToken'] = sequence_token
-
-        logs_client.put_log_events(**log_event)
-
-    except Exception as e:
-        print(f"🚨 Falha ao enviar log para CloudWatch: {str(e)}")
+            self._ensure_stream()
+            self._client.put_log_events(logGroupName=self.log_group, logStreamName=self.stream_name, logEvents=batch)
+        except Exception as e:
+            print(f"🚨 Falha ao enviar log para CloudWatch: {str(e)}")
+            for event in batch:
+                self._write_fallback(event["message"], event["timestamp"] / 1000)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _run(self):
+        batch, batch_bytes = [], 0
+        deadline = time.monotonic() + self.flush_interval
+
+        def add(event):
+            nonlocal batch, batch_bytes
+            size = len(event["message"].encode("utf-8")) + EVENT_OVERHEAD
+            if batch and batch_bytes + size > MAX_BATCH_BYTES:
+                self._send(batch)
+                batch, batch_bytes = [], 0
+            batch.append(event)
+            batch_bytes += size
+
+        while True:
+            try:
+                add(self._queue.get(timeout=max(0.0, min(deadline - time.monotonic(), 0.5))))
+            except queue.Empty:
+                pass
+
+            if len(batch) >= self.batch_size:
+                self._send(batch)
+                batch, batch_bytes = [], 0
+            elif time.monotonic() >= deadline or self._flush_now.is_set() or self._stop.is_set():
+                # Hora de enviar: esvazia a fila no lote atual antes de mandar
+                while len(batch) < self.batch_size:
+                    try:
+                        add(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if batch:
+                    self._send(batch)
+                    batch, batch_bytes = [], 0
+                if self._queue.empty():
+                    if self._stop.is_set():
+                        return
+                    self._flush_now.clear()
+                    deadline = time.monotonic() + self.flush_interval
+
+    # ======ENCERRAMENTO======
+    def flush(self, timeout=10.0):
+        """Envia imediatamente o que estiver na fila (espera até ``timeout`` segundos)."""
+        self._flush_now.set()
+        limit = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < limit and self._thread.is_alive():
+            time.sleep(0.01)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=10.0)
+        self._fallback.close()
+        super().close()
+
+
+def get_cloudwatch_logger(stream_name="telegram-bot"):
+    logger = logging.getLogger(f"cloudwatch.{stream_name}")
+    if not logger.handlers:
+        handler = CloudWatchHandler(stream_name=stream_name)
+        handler.setFormatter(logging.Formatter("[%(levelname)s] %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def log_to_cloudwatch(message, level="INFO", stream_name="telegram-bot"):
+    # Só enfileira: o envio acontece em lote na thread do CloudWatchHandler
+    get_cloudwatch_logger(stream_name).log(getattr(logging, level.upper(), logging.INFO), message)
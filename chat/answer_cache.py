@@ -0,0 +1,117 @@
+import math
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+from chat.query_cache import normalize_query
+
+
+def document_ids(docs) -> Tuple[str, ...]:
+    """IDs dos chunks recuperados; chunks antigos sem ``chunk_id`` usam um hash de origem e conteúdo."""
+    ids = []
+    for doc in docs:
+        chunk_id = doc.metadata.get("chunk_id")
+        if chunk_id is None:
+            raw = f"{doc.metadata.get('source')}|{doc.metadata.get('page')}|{doc.page_content}"
+            chunk_id = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+        ids.append(chunk_id)
+    return tuple(ids)
+
+
+def _unit(vector: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+# ======CACHE DE RESPOSTAS GERADAS======
+class AnswerCache:
+    """Reaproveita respostas do LLM (temperature 0) para a mesma pergunta e o mesmo contexto.
+
+    A chave exata é (pergunta normalizada, IDs dos chunks, versão do prompt, modelo). No modo
+    semântico, uma pergunta diferente reaproveita a resposta quando recupera os mesmos chunks
+    e o embedding dela está a no máximo ``threshold`` de similaridade de cosseno de uma já respondida.
+    """
+
+    def __init__(self, enabled: bool = True, max_size: int = 1024, ttl: float = 86400.0,
+                 semantic: bool = False, threshold: float = 0.97):
+        self.enabled = enabled
+        self.max_size = max_size
+        self.ttl = ttl
+        self.semantic = semantic
+        self.threshold = threshold
+        # (pergunta, contexto) -> (expira_em, vetor unitário, resposta)
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        # contexto -> perguntas com esse contexto, para a busca semântica não varrer o cache inteiro
+        self._by_context = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _drop(self, key: tuple):
+        self._entries.pop(key, None)
+        questions = self._by_context.get(key[1])
+        if questions is not None:
+            questions.discard(key[0])
+            if not questions:
+                del self._by_context[key[1]]
+
+    def get(self, question: str, vector: Optional[List[float]], chunk_ids: Tuple[str, ...],
+            prompt_version: str, model_id: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        context = (chunk_ids, prompt_version, model_id)
+        key = (normalize_query(question), context)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if self.semantic and vector is not None:
+                query = _unit(vector)
+                for other in list(self._by_context.get(context, ())):
+                    other_key = (other, context)
+                    expires_at, other_vector, answer = self._entries[other_key]
+                    if expires_at < now:
+                        self._drop(other_key)
+                        continue
+                    if other_vector is not None and sum(a * b for a, b in zip(query, other_vector)) >= self.threshold:
+                        self._entries.move_to_end(other_key)
+                        self.semantic_hits += 1
+                        return answer
+            self.misses += 1
+            return None
+
+    def put(self, question: str, vector: Optional[List[float]], chunk_ids: Tuple[str, ...],
+            prompt_version: str, model_id: str, answer: str):
+        if not self.enabled:
+            return
+        context = (chunk_ids, prompt_version, model_id)
+        key = (normalize_query(question), context)
+        unit = _unit(vector) if (self.semantic and vector is not None) else None
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, unit, answer)
+            self._by_context.setdefault(context, set()).add(key[0])
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_context.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.semantic_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "semantic": self.semantic,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.semantic_hits) / total, 4) if total else 0.0
+        }
@@ -1,198 +1,853 @@
-from fastapi import FastAPI, HTTPException
+import time
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from langchain_aws.embeddings import BedrockEmbeddings
-from langchain_community.vectorstores import Chroma
+from botocore.config import Config as BotoConfig
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import NamedTuple, Optional
+import asyncio
+import contextvars
+import threading
+import logging
 import boto3
 import os
 import json
 from dotenv import load_dotenv
+from chat.query_cache import QueryCache, normalize_query
+from chat.answer_cache import AnswerCache, document_ids
+from chat.context_builder import BuiltContext, build_context
+from chat.prompts import PROMPT_VERSION, build_prompt
+from chat.hybrid_search import LexicalIndex, fuse_candidates, hybrid_search, vector_candidates
+from chat.search_filters import SearchFilters, detect_filters
+from chat.reranker import rerank, select_relevant
+from chat.observability import (
+    ANSWER_CHARS, CACHE_EVENTS, CONTEXT_CHUNKS, HTTP_REQUEST_SECONDS, HTTP_REQUESTS, PROMPT_CHARS, REGISTRY,
+    REJECTIONS, TOKENS, new_request_id, request_timings, setup_logging, stage_timer, start_request
+)
 
 load_dotenv()
-app = FastAPI()
+
+# Máximo de consultas simultâneas ao Bedrock por worker (tamanho do pool de conexões e de threads)
+BEDROCK_MAX_CONCURRENCY = int(os.getenv("BEDROCK_MAX_CONCURRENCY", "16"))
+# Tempo máximo de uma consulta, incluindo a espera por uma vaga no limite de concorrência
+QUERY_TIMEOUT_SECONDS = float(os.getenv("QUERY_TIMEOUT_SECONDS", "60"))
+# Cache de embeddings das perguntas e dos resultados da busca (QUERY_CACHE_PATH opcional persiste os embeddings)
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "2048"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "3600"))
+QUERY_CACHE_PATH = os.getenv("QUERY_CACHE_PATH")
+INGEST_MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH", "/mnt/data/ingest_manifest.json")
+EMBEDDING_MODEL_ID = "amazon.titan-embed-text-v2:0"
+GENERATION_MODEL_ID = "amazon.nova-pro-v1:0"
+# Orçamento (estimado) de tokens do contexto enviado ao Nova Pro
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+# Cache de respostas do Nova Pro (ANSWER_CACHE_ENABLED=false desliga; modo semântico é opcional)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1024"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "86400"))
+ANSWER_CACHE_SEMANTIC = os.getenv("ANSWER_CACHE_SEMANTIC", "false").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.97"))
+# Busca híbrida: candidatos vetoriais e do índice BM25 da ingestão fundidos por RRF
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "10"))
+BM25_INDEX_DIR = os.getenv("BM25_INDEX_DIR", "/mnt/data/bm25_index")
+# Backend vetorial: "chroma" (padrão) ou "numpy" (índice compacto em mmap exportado pela ingestão)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "/mnt/data/vector_index")
+VECTOR_INDEX_NPROBE = int(os.getenv("VECTOR_INDEX_NPROBE", "16"))
+# Reranking local: busca RERANK_CANDIDATES chunks e envia ao LLM só os que passam no corte (até RERANK_MAX_K)
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "12"))
+RERANK_MAX_K = int(os.getenv("RERANK_MAX_K", "3"))
+RERANK_MIN_SCORE = float(os.getenv("RERANK_MIN_SCORE", "0.25"))
+RERANK_RELATIVE = float(os.getenv("RERANK_RELATIVE", "0.75"))
+RERANK_VECTOR_WEIGHT = float(os.getenv("RERANK_VECTOR_WEIGHT", "0.5"))
+# Lotes de /query/batch: itens por requisição e gerações simultâneas (o restante da vaga fica para /query)
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", str(max(1, BEDROCK_MAX_CONCURRENCY // 2))))
+# Inicialização em segundo plano: nova tentativa a cada STARTUP_RETRY_SECONDS até o serviço ficar pronto
+STARTUP_RETRY_SECONDS = float(os.getenv("STARTUP_RETRY_SECONDS", "5"))
+# Aquecimento: abre o índice BM25 e faz um embedding de teste (conexão com o Bedrock já estabelecida)
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+# LOG_LEVEL=DEBUG mostra scores, tamanhos dos chunks e do contexto de cada consulta
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+logger = setup_logging(LOG_LEVEL)
 
 
 class QueryRequest(BaseModel):
     question: str
+    # Filtros opcionais; sem eles, caso (ARE/RE) ou processo citados na pergunta restringem a busca
+    processo: Optional[str] = None
+    case_id: Optional[str] = None
+    doc_type: Optional[str] = None
+    file_name: Optional[str] = None
+
+    def filters(self) -> SearchFilters:
+        return SearchFilters(self.processo, self.case_id, self.doc_type, self.file_name)
 
 
 class QueryResponse(BaseModel):
     answer: str
     sources: list[dict]
+    usage: dict = {}
+
+
+class BatchQueryRequest(BaseModel):
+    items: list[QueryRequest]
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    question: str
+    answer: Optional[str] = None
+    sources: list[dict] = []
+    usage: dict = {}
+    timings: dict = {}
+    error: Optional[str] = None
+
+
+class BatchQueryResponse(BaseModel):
+    results: list[BatchItemResult]
+    unique_questions: int
+    timings: dict
+
+
+# Estado da inicialização exposto em /readyz
+startup_state = {"ready": False, "error": None, "documents": 0, "attempts": 0, "timings": {}}
+
+
+def _record_timing(name, started):
+    startup_state["timings"][name] = round((time.perf_counter() - started) * 1000, 1)
+    return time.perf_counter()
+
+
+def open_collection(embeddings):
+    """Coleção usada na busca: a do Chroma ou o índice compacto, ambos com a mesma API (query/get/count)."""
+    if VECTOR_BACKEND == "numpy":
+        from rag_juridico.vector_index import VectorIndex
+        return VectorIndex(VECTOR_INDEX_DIR, nprobe=VECTOR_INDEX_NPROBE), VECTOR_INDEX_DIR
+    if VECTOR_BACKEND != "chroma":
+        raise ValueError(f"VECTOR_BACKEND inválido: {VECTOR_BACKEND}")
+    from langchain_community.vectorstores import Chroma
+    persist_dir = "/mnt/data/chroma_db"
+    vectorstore = Chroma(
+        embedding_function=embeddings,
+        persist_directory=persist_dir,
+        collection_name="juridico_chatbot"
+    )
+    return vectorstore._collection, persist_dir
 
 
 def initialize_system():
     try:
+        started = time.perf_counter()
+        # Imports pesados só aqui: o processo sobe e responde /healthz sem esperar o langchain
+        from langchain_aws.embeddings import BedrockEmbeddings
+        started = _record_timing("imports_ms", started)
+
         bedrock_client = boto3.client(
             service_name="bedrock-runtime",
             region_name="us-east-1",
             aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
             aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-            aws_session_token=os.getenv("AWS_SESSION_TOKEN")
+            aws_session_token=os.getenv("AWS_SESSION_TOKEN"),
+            config=BotoConfig(
+                max_pool_connections=BEDROCK_MAX_CONCURRENCY,
+                connect_timeout=5,
+                read_timeout=QUERY_TIMEOUT_SECONDS,
+                retries={"max_attempts": 3, "mode": "adaptive"}
+            )
         )
 
         embeddings = BedrockEmbeddings(
             client=bedrock_client,
-            model_id="amazon.titan-embed-text-v2:0"
+            model_id=EMBEDDING_MODEL_ID
         )
+        started = _record_timing("bedrock_client_ms", started)
 
-        persist_dir = "/mnt/data/chroma_db"
-        collection_name = "juridico_chatbot"
+        collection, persist_dir = open_collection(embeddings)
+        started = _record_timing("vector_store_open_ms", started)
 
-        vectorstore = Chroma(
-            embedding_function=embeddings,
-            persist_directory=persist_dir,
-            collection_name=collection_name
-        )
-
-        indexed_docs = vectorstore._collection.count()
-        print(f"📂 Diretório de persistência: {persist_dir}")
-        print(f"✅ Total de documentos indexados: {indexed_docs}")
+        indexed_docs = collection.count()
+        _record_timing("vector_store_count_ms", started)
+        startup_state["documents"] = indexed_docs
+        logger.info(f"📂 Diretório de persistência ({VECTOR_BACKEND}): {persist_dir}")
+        logger.info(f"✅ Total de documentos indexados: {indexed_docs}")
 
-        return vectorstore, bedrock_client, embeddings 
+        return collection, bedrock_client, embeddings
     except Exception as e:
         raise RuntimeError(f"Erro ao inicializar o sistema: {str(e)}")
 
 
-vectorstore, bedrock_client, embeddings = initialize_system() 
-
-def process_query(user_query):
+# Preenchidos por initialize_system() no startup da aplicação (ver lifespan)
+collection, bedrock_client, embeddings = None, None, None
+
+def index_versions():
+    """Destino atual do link de cada índice publicado pela ingestão (BM25 e, no backend numpy, o vetorial)."""
+    return lexical_index.version(), collection.version() if VECTOR_BACKEND == "numpy" else None
+
+
+query_cache = QueryCache(
+    model_id=EMBEDDING_MODEL_ID,
+    count_fn=lambda: collection.count(),
+    max_size=QUERY_CACHE_SIZE,
+    ttl=QUERY_CACHE_TTL,
+    manifest_path=INGEST_MANIFEST_PATH,
+    disk_path=QUERY_CACHE_PATH,
+    index_versions_fn=index_versions
+)
+
+answer_cache = AnswerCache(
+    enabled=ANSWER_CACHE_ENABLED,
+    max_size=ANSWER_CACHE_SIZE,
+    ttl=ANSWER_CACHE_TTL,
+    semantic=ANSWER_CACHE_SEMANTIC,
+    threshold=ANSWER_CACHE_THRESHOLD
+)
+
+# Aberto só na primeira consulta híbrida
+lexical_index = LexicalIndex(BM25_INDEX_DIR)
+
+# As chamadas ao Chroma/Bedrock são bloqueantes: rodam neste pool, fora do event loop
+query_executor = ThreadPoolExecutor(max_workers=BEDROCK_MAX_CONCURRENCY, thread_name_prefix="rag-query")
+query_semaphore = asyncio.Semaphore(BEDROCK_MAX_CONCURRENCY)
+batch_semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+
+
+# ======INICIALIZAÇÃO, AQUECIMENTO E SONDAS======
+def warm_up():
+    started = time.perf_counter()
+    if startup_state["documents"] == 0:
+        startup_state["documents"] = collection.count()
+        if startup_state["documents"] == 0:
+            raise RuntimeError("Coleção vazia: execute a ingestão antes de liberar o tráfego")
+    lexical_index.get()
+    started = _record_timing("bm25_load_ms", started)
+    # Chamada real ao Bedrock: confirma credenciais/rede e deixa a conexão TLS aberta no pool
+    embeddings.embed_query("aquecimento")
+    _record_timing("bedrock_warmup_ms", started)
+
+
+def _initialize_and_warm_up():
+    global collection, bedrock_client, embeddings
+    if collection is None:
+        collection, bedrock_client, embeddings = initialize_system()
+    if WARMUP_ENABLED:
+        warm_up()
+
+
+async def _startup():
+    loop = asyncio.get_running_loop()
+    while True:
+        startup_state["attempts"] += 1
+        started = time.perf_counter()
+        try:
+            await loop.run_in_executor(query_executor, _initialize_and_warm_up)
+        except Exception as e:
+            # Falha de AWS/Chroma não derruba o processo: /readyz segue 503 e tentamos de novo
+            startup_state["error"] = str(e)
+            logger.warning(f"⚠️ Inicialização falhou (tentativa {startup_state['attempts']}): {e}")
+            await asyncio.sleep(STARTUP_RETRY_SECONDS)
+            continue
+        _record_timing("initialize_ms", started)
+        startup_state["timings"]["time_to_ready_ms"] = round((time.perf_counter() - _import_started) * 1000, 1)
+        startup_state.update(ready=True, error=None)
+        logger.info(f"🚀 Serviço pronto: {startup_state['timings']}")
+        return
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # O servidor aceita conexões imediatamente; as consultas aguardam /readyz
+    task = asyncio.create_task(_startup())
+    yield
+    task.cancel()
+    query_executor.shutdown(wait=False, cancel_futures=True)
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.middleware("http")
+async def observe_requests(request: Request, call_next):
+    # X-Request-ID do cliente (o bot envia um por mensagem) acompanha logs e métricas da consulta
+    request_id = new_request_id(request.headers.get("x-request-id"))
+    start_request(request_id)
+    started = time.perf_counter()
+    status = 500
     try:
-        
-        # Busca documentos com score de similaridade
-        docs_with_score = vectorstore.similarity_search_with_score(user_query, k=3)
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        path = getattr(request.scope.get("route"), "path", "desconhecida")
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, path=path, method=request.method, status=status)
+        HTTP_REQUESTS.inc(path=path, method=request.method, status=status)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
+def ensure_ready():
+    # Mesmo critério do /readyz: coleção vazia ou aquecimento com falha não atendem consultas
+    if collection is None or not startup_state["ready"]:
+        raise HTTPException(status_code=503, detail="Serviço inicializando, tente novamente em instantes.")
+
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok", "uptime_s": round(time.perf_counter() - _import_started, 1)}
+
+
+@app.get("/readyz")
+async def readyz():
+    status_code = 200 if startup_state["ready"] else 503
+    return JSONResponse(status_code=status_code, content=startup_state)
+
+
+@app.get("/metrics")
+async def metrics():
+    # Contadores dos caches são lidos na hora da coleta, sem custo no caminho da consulta
+    cache_stats = query_cache.stats()
+    for cache, stats in (("embedding", cache_stats["embeddings"]), ("results", cache_stats["results"]),
+                         ("answer", answer_cache.stats())):
+        CACHE_EVENTS.set_total(stats["hits"] + stats.get("semantic_hits", 0), cache=cache, result="hit")
+        CACHE_EVENTS.set_total(stats["misses"], cache=cache, result="miss")
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+def _release_slot(future):
+    query_semaphore.release()
+    # Resultado de quem já desistiu de esperar: só evita o aviso de exceção não lida
+    if not future.cancelled():
+        future.exception()
+
+
+async def submit_blocking(func, *args):
+    """Agenda ``func`` no pool ocupando uma vaga de query_semaphore até a thread terminar.
+
+    A vaga volta ao semáforo quando a thread acaba, e não quando quem espera desiste (504,
+    cliente desconectado): uma rajada de timeouts não aceita consultas novas com o pool ainda
+    ocupado pelas antigas.
+    """
+    loop = asyncio.get_running_loop()
+    # Leva o contexto (ID da requisição, tempos por etapa) para a thread do pool
+    context = contextvars.copy_context()
+    await query_semaphore.acquire()
+    try:
+        future = loop.run_in_executor(query_executor, context.run, func, *args)
+    except BaseException:
+        query_semaphore.release()
+        raise
+    future.add_done_callback(_release_slot)
+    return future
+
 
-        print("\n🔎 Documentos recuperados com score:")
-        for doc, score in docs_with_score:
-            print(f"📄 Score: {score:.2f} | Conteúdo: {doc.page_content[:200]}...\n")
+async def run_blocking(func, *args, timeout=None):
+    # O timeout (contado a partir da vaga) só encerra a espera: a chamada ao Bedrock não é interrompida
+    return await asyncio.wait_for(asyncio.shield(await submit_blocking(func, *args)), timeout)
 
-        # Define limiar de relevância, só considera documentos com score abaixo de 1.4
-        limiar_score = 1.4
 
-        # Retorno padronizado para casos sem documentos relevantes
-        tem_documento_relevante = any(score <= limiar_score for _, score in docs_with_score)
+async def process_query_async(user_query, filters=None):
+    # O semáforo segura o excedente na fila do event loop, onde o timeout consegue cancelá-lo
+    return await run_blocking(process_query, user_query, filters)
 
-        if not tem_documento_relevante:
-            return (
-                "⚠️ Desculpe, não consegui identificar uma pergunta jurídica válida. "
-                "Por favor, pergunte algo relacionado ao Direito ou aos documentos fornecidos.",
-                []
+
+def embed_query(user_query):
+    with stage_timer("embed"):
+        return query_cache.get_embedding(user_query, embeddings.embed_query)
+
+
+def search_documents(query_embedding, k=3, query_text=None, filters=None):
+    # O filtro vai no "where" do Chroma: só os vetores do caso/processo/arquivo são comparados
+    where = filters.where() if filters else None
+    if HYBRID_SEARCH and query_text:
+        def search():
+            return hybrid_search(
+                collection, lexical_index, query_text, query_embedding,
+                k=k, candidates=HYBRID_CANDIDATES, where=where
+            )
+        mode = "hybrid"
+    else:
+        def search():
+            return list(vector_candidates(collection, [query_embedding], k, where)[0].values())
+        mode = "vector"
+    # Perguntas repetidas reaproveitam o resultado da busca
+    with stage_timer("search"):
+        return query_cache.get_results(query_embedding, k, search, scope=(mode, tuple(filters) if filters else None))
+
+
+def search_documents_many(query_embeddings, query_texts, k=3, filters=None):
+    """Busca de várias perguntas com os mesmos filtros: uma única consulta vetorial ao Chroma para as que faltam no cache."""
+    where = filters.where() if filters else None
+
+    def search_many(positions):
+        vectors = [query_embeddings[i] for i in positions]
+        all_hits = vector_candidates(collection, vectors, max(k, HYBRID_CANDIDATES) if HYBRID_SEARCH else k, where)
+        if not HYBRID_SEARCH:
+            return [list(hits.values())[:k] for hits in all_hits]
+        return [
+            fuse_candidates(
+                collection, lexical_index, query_texts[i], query_embeddings[i], hits,
+                k=k, candidates=HYBRID_CANDIDATES, where=where
             )
+            for i, hits in zip(positions, all_hits)
+        ]
+
+    mode = "hybrid" if HYBRID_SEARCH else "vector"
+    with stage_timer("search"):
+        return query_cache.get_results_many(query_embeddings, k, search_many, scope=(mode, tuple(filters) if filters else None))
+
+
+def retrieve_documents(user_query, k=3, filters=None):
+    return search_documents(embed_query(user_query), k=k, query_text=user_query, filters=filters)
+
+
+def resolve_filters(user_query, filters=None):
+    """Junta os filtros pedidos na API aos detectados na pergunta; devolve (filtros, só_detectados)."""
+    explicit = filters or SearchFilters()
+    detected = detect_filters(user_query)
+    return explicit.merge(detected), not explicit and bool(detected)
+
+
+class QueryPlan(NamedTuple):
+    answer: Optional[str]  # preenchida quando não é preciso chamar o LLM (sem documentos ou cache)
+    docs: list
+    usage: dict
+    input_text: str = ""
+    context: Optional[BuiltContext] = None
+    query_embedding: Optional[list] = None
+    chunk_ids: tuple = ()
+    retrieval: dict = {}
+
+
+def prepare_query(user_query, filters=None):
+    """Recupera os documentos e monta o prompt; a geração fica a cargo de quem chama."""
+    # Busca documentos com score de similaridade
+    query_embedding = embed_query(user_query)
+    return plan_query(user_query, query_embedding, retrieve_candidates(user_query, query_embedding, filters))
+
+
+def retrieve_candidates(user_query, query_embedding, filters=None):
+    filters, auto_scoped = resolve_filters(user_query, filters)
+    if filters:
+        logger.info(f"🎯 Busca restrita a: {filters.where()}")
+    # Busca mais candidatos do que o necessário; o reranker escolhe quantos seguem para o LLM
+    docs_with_score = search_documents(query_embedding, k=RERANK_CANDIDATES, query_text=user_query, filters=filters)
+    if not docs_with_score and auto_scoped:
+        # Caso/processo citado na pergunta que não existe na base: volta para a coleção inteira
+        docs_with_score = search_documents(query_embedding, k=RERANK_CANDIDATES, query_text=user_query)
+    return docs_with_score
+
+
+def plan_query(user_query, query_embedding, docs_with_score):
+    """Reranking dos candidatos, cache de respostas e montagem do prompt."""
+    with stage_timer("rerank"):
+        started = time.perf_counter()
+        ranked = rerank(user_query, docs_with_score, lexical_index.idf(user_query), RERANK_VECTOR_WEIGHT)
+        selected = select_relevant(ranked, RERANK_MIN_SCORE, RERANK_RELATIVE, RERANK_MAX_K)
+        retrieval = {
+            "candidates": len(docs_with_score),
+            "selected": len(selected),
+            "rerank_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+    CONTEXT_CHUNKS.observe(len(selected))
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"🔎 Documentos recuperados com score (reranking em {retrieval['rerank_ms']:.1f} ms):")
+        for item in ranked:
+            logger.debug(f"📄 Score: {item.score:.2f} | Distância: {item.distance:.2f} | Conteúdo: {item.doc.page_content[:200]}...")
+
+    # Retorno padronizado para casos sem documentos relevantes (nenhum candidato passou no corte)
+    if not selected:
+        REJECTIONS.inc()
+        return QueryPlan(
+            "⚠️ Desculpe, não consegui identificar uma pergunta jurídica válida. "
+            "Por favor, pergunte algo relacionado ao Direito ou aos documentos fornecidos.",
+            [],
+            dict(retrieval),
+            retrieval=retrieval
+        )
+
+    # Só os chunks selecionados, do mais para o menos relevante
+    docs = [item.doc for item in selected]
 
-        # Extrai apenas os documentos considerados válidos (todos, pois passaram no filtro geral)
-        docs = [doc for doc, _ in docs_with_score]
+    # Mesma pergunta com o mesmo contexto: a resposta (temperature 0) já é conhecida
+    chunk_ids = document_ids(docs)
+    cached_answer = answer_cache.get(user_query, query_embedding, chunk_ids, PROMPT_VERSION, GENERATION_MODEL_ID)
+    if cached_answer is not None:
+        usage = {"cached": True, "prompt_chars": 0, "input_tokens": 0, "output_tokens": 0, **retrieval}
+        return QueryPlan(cached_answer, docs, usage, retrieval=retrieval)
 
-        context = "\n\n".join([doc.page_content for doc in docs if doc.page_content])
-        
-        # Verifica o conteúdo dos documentos antes de gerar o contexto
+    # Verifica o conteúdo dos documentos antes de gerar o contexto
+    if logger.isEnabledFor(logging.DEBUG):
         for idx, doc in enumerate(docs):
             if not doc.page_content:
-                print(f"⚠️ Documento {idx} está vazio ou None")
+                logger.debug(f"⚠️ Documento {idx} está vazio ou None")
             else:
-                print(f"📄 Documento {idx} tem {len(doc.page_content)} caracteres")
-
-        # Gera o contexto apenas com conteúdos válidos
-        context = "\n\n".join([doc.page_content for doc in docs if doc.page_content])
-
-        # Loga o tamanho final do contexto
-        print(f"📚 Contexto total gerado para a pergunta: {len(context)} caracteres")
+                logger.debug(f"📄 Documento {idx} tem {len(doc.page_content)} caracteres")
 
+    with stage_timer("context"):
+        # Une chunks sobrepostos do mesmo PDF, descarta repetições e respeita o orçamento de tokens
+        built = build_context(docs, CONTEXT_TOKEN_BUDGET)
         # Prompt estruturado com instruções para o modelo responder juridicamente
-        input_text = f"""
-        Você é um assistente jurídico altamente especializado, treinado para fornecer informações claras, precisas e fundamentadas sobre temas jurídicos. Seu objetivo é responder perguntas com base nos documentos fornecidos, sempre explicando seu raciocínio de forma detalhada e estruturada. Use o seguinte formato para suas respostas:
-        1. Contextualização: Identifique o tema ou a área do direito relacionada à pergunta.
-        2. Análise Jurídica: Explique, passo a passo, como você chegou à resposta, utilizando raciocínio jurídico claro.
-        3. Resposta Final: Apresente a resposta final de forma objetiva e sucinta.
-        
-        Instruções adicionais para você:
-            Sempre baseie suas respostas nos documentos carregados no sistema (RAG).
-            Explique apenas com base nas informações disponíveis, não invente ou extrapole além do fornecido.
-            Se a resposta não puder ser determinada com os dados disponíveis, informe o usuário educadamente.
-
-        Exemplos de Perguntas e Respostas
-        Exemplo 1:
-            Usuário: Quais são os requisitos para um contrato ser considerado válido?
-            Resposta do Chatbot:
-            Contextualização: Esta questão refere-se ao direito civil, mais especificamente à validade contratual.
-            Análise Jurídica: 
-                1. Com base no documento "Código Civil - Art. 104", um contrato válido exige: 
-                    Agente capaz. 
-                    Objeto lícito, possível e determinado.
-                    Forma prescrita ou não proibida por lei.
-
-                2. Estas informações são corroboradas por "Jurisprudência STJ - Contratos", que reforça que a ausência de qualquer requisito pode acarretar nulidade.
-                Resposta Final: Para um contrato ser válido, ele deve atender aos requisitos de capacidade do agente, objeto lícito e forma prescrita ou permitida pela lei.
-
-        Exemplo 2:
-
-            Usuário: É possível rescindir um contrato de trabalho sem aviso prévio?
-            Resposta do Chatbot:
-            Contextualização: Este tema envolve o direito trabalhista, relacionado à rescisão contratual.
-            Análise Jurídica:
-
-                1. Conforme indicado na "CLT - Art. 487", a rescisão sem aviso prévio é permitida em casos específicos, como justa causa.
-
-                2. O documento "Jurisprudência STJ - Direito do Trabalho" explica que a justa causa deve ser devidamente comprovada.
-                Resposta Final: Sim, é possível rescindir um contrato de trabalho sem aviso prévio, mas apenas nos casos previstos em lei, como justa causa.
-
-        Instrução Importante:
-        Sempre siga o formato dos exemplos acima ao responder perguntas. Se a pergunta for ambígua, solicite mais detalhes ao usuário antes de responder.
-
-        Pergunta: {user_query}
-        Contexto: {context}
-        """
-
-        body = {
-            "inferenceConfig": 
-            {
-                "max_new_tokens": 1000, 
-                "temperature": 0
-            },
-            "messages": [{
-                "role": "user",
-                "content": [{
-                    "text": input_text
-                    }]
-                }
-            ]
-        }
+        input_text = build_prompt(user_query, built.text)
+    logger.debug(f"📚 Contexto total gerado para a pergunta: {len(built.text)} caracteres (~{built.estimated_tokens} tokens)")
+    PROMPT_CHARS.observe(len(input_text))
+    return QueryPlan(None, docs, {}, input_text, built, query_embedding, chunk_ids, retrieval)
+
+
+def _generation_body(input_text):
+    return json.dumps({
+        "inferenceConfig":
+        {
+            "max_new_tokens": 1000,
+            "temperature": 0
+        },
+        "messages": [{
+            "role": "user",
+            "content": [{
+                "text": input_text
+                }]
+            }
+        ]
+    })
 
+
+def generate_answer(input_text):
+    with stage_timer("generate"):
         response = bedrock_client.invoke_model(
-            modelId="amazon.nova-pro-v1:0",
-            body=json.dumps(body),
+            modelId=GENERATION_MODEL_ID,
+            body=_generation_body(input_text),
             contentType="application/json",
             accept="application/json"
         )
-
         response_content = json.loads(response['body'].read().decode('utf-8'))
-        generated_text = response_content.get("output", {}).get("message", {}).get("content", [{}])[0].get("text", "Sem resposta.")
-        
-        # Ajustes de formatação para resposta via Telegram
-        generated_text = generated_text.replace("### Contextualização:", "📚 Contextualização ")
-        generated_text = generated_text.replace("### Análise Jurídica:", "🔍 Análise Jurídica ")
-        generated_text = generated_text.replace("### Resposta Final:", "✅ Conclusão ")
-        
-        # Remove marcações de markdown que o Telegram não entende
-        generated_text = generated_text.replace("**", "")  # remove negrito
-        generated_text = generated_text.replace("__", "")  # remove itálico
-
-
-        return generated_text, docs
+    generated_text = response_content.get("output", {}).get("message", {}).get("content", [{}])[0].get("text", "Sem resposta.")
+    return generated_text, response_content.get("usage", {})
+
+
+def stream_answer(input_text, cancelled=None):
+    """Gera ("text", trecho) conforme o Nova Pro produz tokens e, ao final, ("usage", contagem de tokens).
+
+    Com ``cancelled`` marcado (cliente desconectado, tempo esgotado) o stream do Bedrock é fechado
+    no próximo evento, liberando a conexão e parando o consumo de tokens.
+    """
+    with stage_timer("generate"):
+        response = bedrock_client.invoke_model_with_response_stream(
+            modelId=GENERATION_MODEL_ID,
+            body=_generation_body(input_text),
+            contentType="application/json",
+            accept="application/json"
+        )
+        for event in response["body"]:
+            if cancelled is not None and cancelled.is_set():
+                response["body"].close()
+                return
+            chunk = event.get("chunk")
+            if not chunk:
+                continue
+            payload = json.loads(chunk["bytes"])
+            delta = payload.get("contentBlockDelta", {}).get("delta", {}).get("text")
+            if delta:
+                yield "text", delta
+            if "metadata" in payload:
+                yield "usage", payload["metadata"].get("usage", {})
+
+
+def format_answer(generated_text):
+    # Ajustes de formatação para resposta via Telegram
+    generated_text = generated_text.replace("### Contextualização:", "📚 Contextualização ")
+    generated_text = generated_text.replace("### Análise Jurídica:", "🔍 Análise Jurídica ")
+    generated_text = generated_text.replace("### Resposta Final:", "✅ Conclusão ")
+
+    # Remove marcações de markdown que o Telegram não entende
+    generated_text = generated_text.replace("**", "")  # remove negrito
+    generated_text = generated_text.replace("__", "")  # remove itálico
+    return generated_text
+
+
+# Maior marcador substituído em format_answer: o streaming segura esse tanto de texto
+# até ter certeza de que nenhum marcador ficou dividido entre dois trechos
+FORMAT_HOLDBACK = len("### Análise Jurídica:")
+
+
+def finish_answer(user_query, plan, generated_text, token_usage):
+    with stage_timer("postprocess"):
+        return _finish_answer(user_query, plan, generated_text, token_usage)
+
+
+def _finish_answer(user_query, plan, generated_text, token_usage):
+    generated_text = format_answer(generated_text)
+    usage = {
+        "cached": False,
+        "context_chars": len(plan.context.text),
+        "context_chunks": plan.context.chunks,
+        "context_sections": plan.context.sections,
+        "context_truncated": plan.context.truncated,
+        "prompt_chars": len(plan.input_text),
+        "input_tokens": token_usage.get("inputTokens", 0),
+        "output_tokens": token_usage.get("outputTokens", 0),
+        **plan.retrieval
+    }
+    answer_cache.put(user_query, plan.query_embedding, plan.chunk_ids, PROMPT_VERSION, GENERATION_MODEL_ID, generated_text)
+    TOKENS.inc(usage["input_tokens"], direction="input")
+    TOKENS.inc(usage["output_tokens"], direction="output")
+    ANSWER_CHARS.observe(len(generated_text))
+    return generated_text, usage
+
+
+def answer_from_plan(user_query, plan):
+    if plan.answer is not None:
+        return plan.answer, plan.docs, plan.usage
+
+    generated_text, token_usage = generate_answer(plan.input_text)
+    generated_text, usage = finish_answer(user_query, plan, generated_text, token_usage)
+    return generated_text, plan.docs, usage
+
+
+def process_query(user_query, filters=None):
+    try:
+        return answer_from_plan(user_query, prepare_query(user_query, filters))
     except Exception as e:
-        print("🔴 ERRO COMPLETO DURANTE A CONSULTA:")
+        logger.exception("🔴 ERRO COMPLETO DURANTE A CONSULTA:")
         raise ValueError(f"Erro ao processar a consulta: {str(e)}")
 
+
+def format_sources(docs):
+    return [
+        {"source": doc.metadata.get("source", "Desconhecida"), "content_excerpt": doc.page_content[:300] + "..."}
+        for doc in docs
+    ]
+
+
 @app.post("/query", response_model=QueryResponse)
 async def query(request: QueryRequest):
+    ensure_ready()
     try:
-        response, docs = process_query(request.question)
-        sources = [
-            {"source": doc.metadata.get("source", "Desconhecida"), "content_excerpt": doc.page_content[:300] + "..."}
-            for doc in docs
-        ]
-        return {"answer": response, "sources": sources}
+        response, docs, usage = await asyncio.wait_for(
+            process_query_async(request.question, request.filters()), QUERY_TIMEOUT_SECONDS
+        )
+        usage = {**usage, "timings_ms": request_timings()}
+        logger.info(f"✅ Consulta respondida: {usage['timings_ms']}")
+        return {"answer": response, "sources": format_sources(docs), "usage": usage}
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Tempo limite excedido ao processar a consulta.")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ======CONSULTAS EM LOTE======
+def _elapsed_ms(started):
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def _search_batch_group(questions, query_embeddings, filters, auto_scoped):
+    """Busca de um grupo com os mesmos filtros; perguntas com escopo detectado e sem resultado voltam à coleção inteira."""
+    results = search_documents_many(query_embeddings, questions, k=RERANK_CANDIDATES, filters=filters)
+    for i, docs_with_score in enumerate(results):
+        if not docs_with_score and auto_scoped[i]:
+            results[i] = search_documents(query_embeddings[i], k=RERANK_CANDIDATES, query_text=questions[i])
+    return results
+
+
+def _answer_with_candidates(user_query, query_embedding, docs_with_score):
+    return answer_from_plan(user_query, plan_query(user_query, query_embedding, docs_with_score))
 
- 
\ No newline at end of file
+
+def _timed(func, *args):
+    started = time.perf_counter()
+    return func(*args), _elapsed_ms(started)
+
+
+async def _embed_batch_item(question):
+    started = time.perf_counter()
+    async with batch_semaphore:
+        vector = await run_blocking(embed_query, question)
+    return vector, _elapsed_ms(started)
+
+
+async def _search_batch(items):
+    """``items``: (posição, pergunta, embedding, filtros, só_detectados); uma busca por conjunto de filtros."""
+    groups = {}
+    for item in items:
+        groups.setdefault(tuple(item[3]), []).append(item)
+
+    async def search_group(group):
+        started = time.perf_counter()
+        results = await run_blocking(
+            _search_batch_group, [item[1] for item in group], [item[2] for item in group],
+            group[0][3], [item[4] for item in group]
+        )
+        return [(item[0], docs_with_score, _elapsed_ms(started)) for item, docs_with_score in zip(group, results)]
+
+    outcomes = await asyncio.gather(*(search_group(group) for group in groups.values()), return_exceptions=True)
+    found, errors = {}, {}
+    for group, outcome in zip(groups.values(), outcomes):
+        for item_index, item in enumerate(group):
+            if isinstance(outcome, Exception):
+                errors[item[0]] = outcome
+            else:
+                found[item[0]] = outcome[item_index][1:]
+    return found, errors
+
+
+async def _answer_batch_item(question, query_embedding, docs_with_score):
+    started = time.perf_counter()
+    # O timeout vale a partir da vaga: itens do fim do lote não expiram enquanto esperam na fila
+    async with batch_semaphore:
+        (answer, docs, usage), generate_ms = await run_blocking(
+            _timed, _answer_with_candidates, question, query_embedding, docs_with_score, timeout=QUERY_TIMEOUT_SECONDS
+        )
+    return answer, docs, usage, generate_ms, _elapsed_ms(started)
+
+
+def _batch_error(e):
+    if isinstance(e, asyncio.TimeoutError):
+        return "Tempo limite excedido ao processar a consulta."
+    return f"Erro ao processar a consulta: {str(e)}"
+
+
+@app.post("/query/batch", response_model=BatchQueryResponse)
+async def query_batch(request: BatchQueryRequest):
+    ensure_ready()
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Máximo de {BATCH_MAX_ITEMS} perguntas por lote.")
+    started = time.perf_counter()
+
+    # Perguntas iguais (após normalização) com os mesmos filtros são respondidas uma única vez
+    unique = {}
+    for index, item in enumerate(request.items):
+        key = (normalize_query(item.question), tuple(item.filters()))
+        unique.setdefault(key, (item.question, item.filters(), []))[2].append(index)
+    unique = list(unique.values())
+    outcomes = [{"timings": {}} for _ in unique]
+
+    # 1) Embeddings: o Titan recebe um texto por chamada, então as perguntas fora do cache vão em paralelo
+    stage = time.perf_counter()
+    vectors = await asyncio.gather(*(_embed_batch_item(question) for question, _, _ in unique), return_exceptions=True)
+    timings = {"embed_ms": _elapsed_ms(stage)}
+    to_search = []
+    for position, ((question, filters, _), vector) in enumerate(zip(unique, vectors)):
+        if isinstance(vector, Exception):
+            outcomes[position]["error"] = _batch_error(vector)
+            continue
+        outcomes[position]["timings"]["embed_ms"] = vector[1]
+        resolved, auto_scoped = resolve_filters(question, filters)
+        to_search.append((position, question, vector[0], resolved, auto_scoped))
+
+    # 2) Busca: uma consulta ao Chroma por conjunto de filtros, com todas as perguntas do conjunto
+    stage = time.perf_counter()
+    found, errors = await _search_batch(to_search)
+    timings["search_ms"] = _elapsed_ms(stage)
+    for position, e in errors.items():
+        outcomes[position]["error"] = _batch_error(e)
+
+    # 3) Reranking e geração, limitados por BATCH_MAX_CONCURRENCY
+    stage = time.perf_counter()
+    embedded = {item[0]: item[2] for item in to_search}
+    positions = list(found)
+    answers = await asyncio.gather(
+        *(_answer_batch_item(unique[p][0], embedded[p], found[p][0]) for p in positions), return_exceptions=True
+    )
+    timings["generate_ms"] = _elapsed_ms(stage)
+    for position, answer in zip(positions, answers):
+        outcome = outcomes[position]
+        outcome["timings"]["search_ms"] = found[position][1]
+        if isinstance(answer, Exception):
+            outcome["error"] = _batch_error(answer)
+            continue
+        text, docs, usage, generate_ms, wait_ms = answer
+        outcome.update({"answer": text, "sources": format_sources(docs), "usage": usage})
+        outcome["timings"].update({"generate_ms": generate_ms, "queue_ms": round(wait_ms - generate_ms, 1)})
+
+    results = [None] * len(request.items)
+    for (_, _, indices), outcome in zip(unique, outcomes):
+        for index in indices:
+            results[index] = {"index": index, "question": request.items[index].question, **outcome}
+    timings["total_ms"] = _elapsed_ms(started)
+    logger.info(f"📦 Lote com {len(request.items)} perguntas ({len(unique)} únicas) em {timings['total_ms']:.0f} ms: {timings}")
+    return {"results": results, "unique_questions": len(unique), "timings": timings}
+
+
+# ======RESPOSTA EM STREAMING (SERVER-SENT EVENTS)======
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _produce_stream(user_query, filters, loop, queue, cancelled):
+    """Roda numa thread do pool: prepara a consulta, lê o stream do Bedrock e repassa ao event loop."""
+    def emit(event, data):
+        loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+
+    try:
+        plan = prepare_query(user_query, filters)
+        if cancelled.is_set():
+            return
+        emit("sources", format_sources(plan.docs))
+        if plan.answer is not None:
+            emit("token", {"text": plan.answer})
+            emit("done", {"usage": {**plan.usage, "timings_ms": request_timings()}})
+            return
+
+        raw_text, sent, token_usage = "", "", {}
+        for kind, value in stream_answer(plan.input_text, cancelled):
+            if kind == "usage":
+                token_usage = value
+                continue
+            raw_text += value
+            formatted = format_answer(raw_text)
+            safe = formatted[:max(len(sent), len(formatted) - FORMAT_HOLDBACK)]
+            if len(safe) > len(sent):
+                emit("token", {"text": safe[len(sent):]})
+                sent = safe
+
+        if cancelled.is_set():
+            return
+        answer, usage = finish_answer(user_query, plan, raw_text, token_usage)
+        if len(answer) > len(sent):
+            emit("token", {"text": answer[len(sent):]})
+        emit("done", {"usage": {**usage, "timings_ms": request_timings()}})
+    except Exception as e:
+        logger.exception(f"🔴 ERRO DURANTE O STREAMING: {e}")
+        emit("error", {"detail": f"Erro ao processar a consulta: {str(e)}"})
+    finally:
+        emit(None, None)
+
+
+async def _stream_events(user_query, filters=None):
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    deadline = loop.time() + QUERY_TIMEOUT_SECONDS
+    cancelled = threading.Event()
+    try:
+        # O prazo vale desde a chegada: inclui a espera por uma vaga no semáforo
+        await asyncio.wait_for(submit_blocking(_produce_stream, user_query, filters, loop, queue, cancelled),
+                               max(0.0, deadline - loop.time()))
+        while True:
+            event, data = await asyncio.wait_for(queue.get(), max(0.0, deadline - loop.time()))
+            if event is None:
+                break
+            yield sse_event(event, data)
+    except asyncio.TimeoutError:
+        yield sse_event("error", {"detail": "Tempo limite excedido ao processar a consulta."})
+    finally:
+        # Tempo esgotado ou cliente desconectado: a thread para de ler o stream do Bedrock
+        cancelled.set()
+
+
+@app.post("/query/stream")
+async def query_stream(request: QueryRequest):
+    ensure_ready()
+    return StreamingResponse(
+        _stream_events(request.question, request.filters()),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {**query_cache.stats(), "answers": answer_cache.stats()}
+
+
+startup_state["timings"]["app_import_ms"] = round((time.perf_counter() - _import_started) * 1000, 1)
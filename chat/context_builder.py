@@ -0,0 +1,99 @@
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional
+from langchain_core.documents import Document
+
+
+# Estimativa grosseira para português; suficiente para orçar o contexto sem tokenizador
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class BuiltContext(NamedTuple):
+    text: str
+    chunks: int
+    sections: int
+    estimated_tokens: int
+    truncated: bool
+
+
+def _chunk_position(doc: Document) -> Optional[int]:
+    """Posição do chunk no PDF: sufixo do ``chunk_id`` da ingestão ou ``start_index`` do splitter."""
+    chunk_id = doc.metadata.get("chunk_id")
+    if chunk_id and "-" in chunk_id:
+        suffix = chunk_id.rsplit("-", 1)[1]
+        if suffix.isdigit():
+            return int(suffix)
+    return doc.metadata.get("start_index")
+
+
+def _merge_overlap(first: str, second: str, max_overlap: int = 400) -> Optional[str]:
+    """Une dois trechos quando um contém o outro ou o início do segundo repete o fim do primeiro."""
+    if second in first:
+        return first
+    if first in second:
+        return second
+    probe = second[:40]
+    start = first.find(probe, max(0, len(first) - max_overlap - len(probe)))
+    while start != -1:
+        if second.startswith(first[start:]):
+            return first + second[len(first) - start:]
+        start = first.find(probe, start + 1)
+    return None
+
+
+# ======MONTAGEM DO CONTEXTO COM ORÇAMENTO DE TOKENS======
+def build_context(docs: List[Document], token_budget: Optional[int] = None, separator: str = "\n\n") -> BuiltContext:
+    """Junta os chunks recuperados num contexto compacto.
+
+    Chunks vizinhos do mesmo PDF (que se sobrepõem por CHUNK_OVERLAP) são fundidos, trechos
+    repetidos são descartados e o resultado é cortado em ``token_budget`` tokens, priorizando
+    as seções que contêm os chunks mais relevantes.
+    """
+    groups: "OrderedDict[str, list]" = OrderedDict()
+    for rank, doc in enumerate(docs):
+        if doc.page_content and doc.page_content.strip():
+            groups.setdefault(doc.metadata.get("source"), []).append((rank, doc))
+
+    def reading_order(item):
+        position = _chunk_position(item[1])
+        return (0, position) if position is not None else (1, item[0])
+
+    sections = []  # (melhor posição no ranking, texto)
+    for items in groups.values():
+        items.sort(key=reading_order)
+        merged = []
+        for rank, doc in items:
+            text = doc.page_content.strip()
+            joined = _merge_overlap(merged[-1][1], text) if merged else None
+            if joined is not None:
+                merged[-1] = (min(merged[-1][0], rank), joined)
+            else:
+                merged.append((rank, text))
+        sections.extend(merged)
+    sections.sort(key=lambda section: section[0])
+
+    budget_chars = token_budget * CHARS_PER_TOKEN if token_budget else None
+    parts, seen, used, truncated = [], set(), 0, False
+    for _, text in sections:
+        key = " ".join(text.split())
+        if key in seen:
+            continue
+        seen.add(key)
+        if budget_chars is not None:
+            remaining = budget_chars - used - (len(separator) if parts else 0)
+            if remaining <= 0:
+                truncated = True
+                break
+            if len(text) > remaining:
+                cut = text.rfind(" ", 0, remaining)
+                parts.append(text[:cut if cut > remaining // 2 else remaining].rstrip())
+                truncated = True
+                break
+        parts.append(text)
+        used += len(text) + (len(separator) if len(parts) > 1 else 0)
+
+    context = separator.join(parts)
+    return BuiltContext(context, len(docs), len(parts), estimate_tokens(context), truncated)
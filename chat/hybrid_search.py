@@ -0,0 +1,112 @@
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from rag_juridico.bm25_index import BM25Index, tokenize
+from rag_juridico.index_files import ReloadingIndex
+
+logger = logging.getLogger("chat")
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Combina rankings pela posição de cada ID: score = Σ 1 / (k + posição)."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for position, item_id in enumerate(ranking, 1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + position)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+# ======ÍNDICE BM25 CARREGADO SOB DEMANDA======
+class LexicalIndex(ReloadingIndex[BM25Index]):
+    """Abre o índice BM25 da ingestão no primeiro uso e o recarrega quando a ingestão o substitui.
+
+    Sem índice (ainda), ``get()`` devolve None e a busca segue só vetorial.
+    """
+
+    def __init__(self, index_dir: str, check_interval: float = 30.0):
+        super().__init__(index_dir, BM25Index, "Índice BM25", logger, check_interval)
+
+    def idf(self, text: str) -> Optional[Dict[str, float]]:
+        """IDF dos termos de ``text`` no corpus (termos ausentes da base valem 0); None sem índice."""
+        index = self.get()
+        if index is None:
+            return None
+        return {term: index.vocab[term][2] if term in index.vocab else 0.0 for term in tokenize(text)}
+
+
+def _distances(collection, query_embedding: List[float], embeddings) -> List[float]:
+    """Distância na mesma métrica da coleção, para manter comparável o limiar de relevância."""
+    query = np.asarray(query_embedding, dtype=np.float32)
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    space = (collection.metadata or {}).get("hnsw:space", "l2")
+    if space == "cosine":
+        norms = np.linalg.norm(vectors, axis=1) * (np.linalg.norm(query) or 1.0)
+        return (1.0 - vectors @ query / np.where(norms == 0, 1.0, norms)).tolist()
+    if space == "ip":
+        return (1.0 - vectors @ query).tolist()
+    return ((vectors - query) ** 2).sum(axis=1).tolist()
+
+
+# ======BUSCA HÍBRIDA: VETORIAL + BM25======
+def vector_candidates(collection, query_embeddings: List[List[float]], n_results: int,
+                      where: Optional[dict] = None) -> List[Dict[str, Tuple[Document, float]]]:
+    """Busca vetorial de várias perguntas numa única chamada ao Chroma: ``{chunk_id: (documento, distância)}``."""
+    found = collection.query(
+        query_embeddings=query_embeddings, n_results=n_results, where=where,
+        include=["documents", "metadatas", "distances"]
+    )
+    return [
+        {
+            chunk_id: (Document(page_content=text or "", metadata=metadata or {}), distance)
+            for chunk_id, text, metadata, distance in zip(ids, texts, metadatas, distances)
+        }
+        for ids, texts, metadatas, distances in zip(
+            found["ids"], found["documents"], found["metadatas"], found["distances"]
+        )
+    ]
+
+
+def fuse_candidates(collection, lexical_index: LexicalIndex, query_text: str, query_embedding: List[float],
+                    hits: Dict[str, Tuple[Document, float]], k: int = 3, candidates: int = 10, rrf_k: int = 60,
+                    where: Optional[dict] = None) -> List[Tuple[Document, float]]:
+    """Funde os candidatos vetoriais (``hits``) com os do BM25 por RRF e devolve ``(documento, distância)``."""
+    n_results = max(k, candidates)
+    vector_ranking = list(hits)
+
+    index = lexical_index.get()
+    lexical_ranking = []
+    if index is not None:
+        # O BM25 não conhece os metadados: busca mais candidatos e descarta os que o filtro exclui
+        lexical_ranking = [chunk_id for chunk_id, _ in index.search(query_text, n_results * (5 if where else 1))]
+        if where and lexical_ranking:
+            allowed = set(collection.get(ids=lexical_ranking, where=where, include=[])["ids"])
+            lexical_ranking = [chunk_id for chunk_id in lexical_ranking if chunk_id in allowed][:n_results]
+    if not lexical_ranking:
+        return [hits[chunk_id] for chunk_id in vector_ranking[:k]]
+
+    fused = [chunk_id for chunk_id, _ in reciprocal_rank_fusion([vector_ranking, lexical_ranking], rrf_k)[:k]]
+
+    # Chunks que só o BM25 encontrou: busca texto e vetor na coleção para calcular a distância
+    hits = dict(hits)
+    missing = [chunk_id for chunk_id in fused if chunk_id not in hits]
+    if missing:
+        extra = collection.get(ids=missing, include=["documents", "metadatas", "embeddings"])
+        if extra["ids"]:
+            distances = _distances(collection, query_embedding, extra["embeddings"])
+            for chunk_id, text, metadata, distance in zip(extra["ids"], extra["documents"], extra["metadatas"], distances):
+                hits[chunk_id] = (Document(page_content=text or "", metadata=metadata or {}), distance)
+    return [hits[chunk_id] for chunk_id in fused if chunk_id in hits]
+
+
+def hybrid_search(collection, lexical_index: LexicalIndex, query_text: str, query_embedding: List[float],
+                  k: int = 3, candidates: int = 10, rrf_k: int = 60,
+                  where: Optional[dict] = None) -> List[Tuple[Document, float]]:
+    """Funde os candidatos da busca vetorial e do BM25 por RRF e devolve ``(documento, distância)``.
+
+    Números de processo, artigos e classes (ARE, RE) que o embedding não distingue entram
+    pelo lado lexical; a distância vetorial de cada resultado é preservada para o limiar.
+    Com ``where``, os dois lados ficam restritos aos chunks que passam no filtro de metadados.
+    """
+    hits = vector_candidates(collection, [query_embedding], max(k, candidates), where)[0]
+    return fuse_candidates(collection, lexical_index, query_text, query_embedding, hits, k, candidates, rrf_k, where)
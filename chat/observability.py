@@ -0,0 +1,202 @@
+import time
+import uuid
+import bisect
+import logging
+import threading
+import contextlib
+import contextvars
+from typing import Dict, Iterable, Optional, Tuple
+
+
+# ======CONTEXTO DA REQUISIÇÃO======
+# Propagado para as threads do pool via contextvars.copy_context() (ver run_blocking)
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+timings_var: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("timings", default=None)
+
+
+def new_request_id(incoming: Optional[str] = None) -> str:
+    """Reaproveita o ID enviado pelo cliente (ex.: bot do Telegram) ou gera um novo."""
+    if incoming and len(incoming) <= 128 and incoming.isprintable():
+        return incoming
+    return uuid.uuid4().hex
+
+
+def start_request(request_id: str) -> Dict[str, float]:
+    request_id_var.set(request_id)
+    timings: Dict[str, float] = {}
+    timings_var.set(timings)
+    return timings
+
+
+def request_timings() -> Dict[str, float]:
+    return dict(timings_var.get() or {})
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+def setup_logging(level: str = "INFO") -> logging.Logger:
+    """Logger da API; em DEBUG aparecem scores, tamanhos dos chunks e do contexto."""
+    logger = logging.getLogger("chat")
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(request_id)s] %(message)s"))
+        handler.addFilter(RequestIdFilter())
+        logger.addHandler(handler)
+        logger.propagate = False
+    logger.setLevel(getattr(logging, level.upper(), logging.INFO))
+    return logger
+
+
+# ======MÉTRICAS NO FORMATO PROMETHEUS======
+def _label_text(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, **labels):
+        """Copia um total que já é acumulado em outro lugar (ex.: acertos dos caches, lidos na coleta)."""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_label_text(self.labelnames, key)} {value}" for key, value in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], list] = {}  # contagens por faixa + [soma, total]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {state[-2]}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {state[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "rag_stage_seconds", "Duração de cada etapa da consulta (embed, search, rerank, context, generate, postprocess)",
+    ["stage"]
+))
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "rag_http_request_seconds", "Tempo até o início da resposta HTTP", ["path", "method", "status"]
+))
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "rag_http_requests_total", "Requisições HTTP atendidas", ["path", "method", "status"]
+))
+REJECTIONS = REGISTRY.register(Counter(
+    "rag_rejections_total", "Perguntas sem nenhum chunk acima do corte de relevância"
+))
+TOKENS = REGISTRY.register(Counter(
+    "rag_llm_tokens_total", "Tokens consumidos no Nova Pro", ["direction"]
+))
+PROMPT_CHARS = REGISTRY.register(Histogram(
+    "rag_prompt_chars", "Tamanho do prompt enviado ao LLM (caracteres)", buckets=(500, 1000, 2000, 4000, 6000, 8000, 12000, 16000)
+))
+ANSWER_CHARS = REGISTRY.register(Histogram(
+    "rag_answer_chars", "Tamanho da resposta gerada (caracteres)", buckets=(250, 500, 1000, 2000, 4000, 8000)
+))
+CONTEXT_CHUNKS = REGISTRY.register(Histogram(
+    "rag_context_chunks", "Chunks selecionados para o contexto", buckets=(0, 1, 2, 3, 4, 5, 8, 12)
+))
+CACHE_EVENTS = REGISTRY.register(Counter(
+    "rag_cache_events_total", "Acertos e faltas dos caches (lidos no momento da coleta)", ["cache", "result"]
+))
+
+
+@contextlib.contextmanager
+def stage_timer(stage: str):
+    """Mede uma etapa: alimenta o histograma e os tempos da requisição corrente (em ms)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        timings = timings_var.get()
+        if timings is not None:
+            timings[stage] = round(timings.get(stage, 0.0) + elapsed * 1000, 2)
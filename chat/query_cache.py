@@ -0,0 +1,162 @@
+import os
+import re
+import time
+import hashlib
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Optional
+
+
+def normalize_query(text: str) -> str:
+    """Normaliza caixa, acentos, espaços e pontuação final: "O que é  agravo?" -> "o que e agravo"."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.strip(" ?!.;:")
+
+
+def vector_key(vector: List[float]) -> str:
+    return hashlib.sha1(array("f", vector).tobytes()).hexdigest()
+
+
+# ======CACHE LRU COM EXPIRAÇÃO======
+class TTLCache:
+    """LRU em memória, thread-safe, com tempo de vida por entrada e contadores de acerto."""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: Hashable, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+# ======CACHE DE EMBEDDING DA PERGUNTA E DE RESULTADOS DA BUSCA======
+class QueryCache:
+    """Pergunta normalizada -> embedding e embedding -> top-k (doc, score).
+
+    Os resultados são descartados quando a coleção muda (contagem de vetores, manifesto da
+    ingestão ou versão publicada dos índices em disco, via ``index_versions_fn``); os embeddings
+    continuam válidos enquanto o modelo for o mesmo.
+    """
+
+    def __init__(self, model_id: str, count_fn: Callable[[], int], max_size: int = 2048,
+                 ttl: float = 3600.0, manifest_path: Optional[str] = None,
+                 disk_path: Optional[str] = None, check_interval: float = 30.0,
+                 index_versions_fn: Optional[Callable[[], Hashable]] = None):
+        self.model_id = model_id
+        self.embeddings = TTLCache(max_size, ttl)
+        self.results = TTLCache(max_size, ttl)
+        self.count_fn = count_fn
+        self.manifest_path = manifest_path
+        self.index_versions_fn = index_versions_fn
+        self.check_interval = check_interval
+        self.disk = None
+        if disk_path:
+            from rag_juridico.embedding_cache import EmbeddingStore
+            self.disk = EmbeddingStore(disk_path)
+        self.invalidations = 0
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _current_version(self):
+        mtime = None
+        if self.manifest_path and os.path.exists(self.manifest_path):
+            mtime = os.path.getmtime(self.manifest_path)
+        index_versions = self.index_versions_fn() if self.index_versions_fn else None
+        return self.count_fn(), mtime, index_versions
+
+    def check_version(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            version = self._current_version()
+            if self._version is not None and version != self._version:
+                self.results.clear()
+                self.invalidations += 1
+            self._version = version
+
+    def get_embedding(self, query: str, embed_fn: Callable[[str], List[float]]) -> List[float]:
+        key = normalize_query(query)
+        vector = self.embeddings.get(key)
+        if vector is not None:
+            return vector
+        text_key = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        if self.disk is not None:
+            vector = self.disk.get_many(self.model_id, [text_key]).get(text_key)
+        if vector is None:
+            vector = embed_fn(query)
+            if self.disk is not None:
+                self.disk.put_many(self.model_id, {text_key: vector})
+        self.embeddings.put(key, vector)
+        return vector
+
+    def get_results(self, vector: List[float], k: int, search_fn: Callable[[], list], scope: Hashable = None) -> list:
+        self.check_version()
+        key = (vector_key(vector), k, scope)
+        results = self.results.get(key)
+        if results is None:
+            results = search_fn()
+            self.results.put(key, results)
+        return results
+
+    def get_results_many(self, vectors: List[List[float]], k: int,
+                         search_many_fn: Callable[[List[int]], list], scope: Hashable = None) -> list:
+        """Como ``get_results`` para várias perguntas: ``search_many_fn`` recebe só as posições fora do cache."""
+        self.check_version()
+        keys = [(vector_key(vector), k, scope) for vector in vectors]
+        results = [self.results.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            for i, result in zip(missing, search_many_fn(missing)):
+                results[i] = result
+                self.results.put(keys[i], result)
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "embeddings": self.embeddings.stats(),
+            "results": self.results.stats(),
+            "invalidations": self.invalidations
+        }
@@ -0,0 +1,57 @@
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from langchain_core.documents import Document
+from rag_juridico.bm25_index import tokenize
+
+
+class RankedDocument(NamedTuple):
+    doc: Document
+    distance: float  # distância vetorial original (menor = mais próximo)
+    score: float  # relevância combinada, de 0 a 1
+    lexical: float
+
+
+def vector_similarity(distance: float) -> float:
+    """Distância L2² entre vetores normalizados (Titan v2) convertida em similaridade de 0 a 1."""
+    return min(1.0, max(0.0, 1.0 - distance / 2.0))
+
+
+def lexical_overlap(query_tokens: List[str], doc_tokens: List[str], weights: Optional[Dict[str, float]] = None) -> float:
+    """Fração (ponderada por IDF) dos termos da pergunta presentes no chunk, com bônus para bigramas."""
+    if not query_tokens:
+        return 0.0
+    terms = set(query_tokens)
+    doc_terms = set(doc_tokens)
+    weight = (lambda term: weights.get(term, 0.0)) if weights is not None else (lambda term: 1.0)
+    total = sum(weight(term) for term in terms)
+    if total <= 0:
+        return 0.0
+    coverage = sum(weight(term) for term in terms if term in doc_terms) / total
+
+    query_bigrams = set(zip(query_tokens, query_tokens[1:]))
+    if not query_bigrams:
+        return coverage
+    doc_bigrams = set(zip(doc_tokens, doc_tokens[1:]))
+    phrase = len(query_bigrams & doc_bigrams) / len(query_bigrams)
+    return 0.7 * coverage + 0.3 * phrase
+
+
+# ======SEGUNDO ESTÁGIO: RERANKING LOCAL (CPU, SEM REDE)======
+def rerank(query: str, docs_with_score: List[Tuple[Document, float]], weights: Optional[Dict[str, float]] = None,
+           vector_weight: float = 0.5) -> List[RankedDocument]:
+    """Reordena os candidatos pela combinação da similaridade vetorial com a sobreposição lexical."""
+    query_tokens = tokenize(query)
+    ranked = []
+    for doc, distance in docs_with_score:
+        lexical = lexical_overlap(query_tokens, tokenize(doc.page_content or ""), weights)
+        score = vector_weight * vector_similarity(distance) + (1 - vector_weight) * lexical
+        ranked.append(RankedDocument(doc, distance, score, lexical))
+    ranked.sort(key=lambda item: item.score, reverse=True)
+    return ranked
+
+
+def select_relevant(ranked: List[RankedDocument], min_score: float, relative: float, max_k: int) -> List[RankedDocument]:
+    """Menor conjunto que passa no corte: acima de ``min_score`` e perto (``relative``) do melhor."""
+    if not ranked or ranked[0].score < min_score:
+        return []
+    cutoff = max(min_score, ranked[0].score * relative)
+    return [item for item in ranked[:max_k] if item.score >= cutoff]
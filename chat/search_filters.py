@@ -0,0 +1,39 @@
+import re
+from typing import Dict, NamedTuple, Optional
+
+
+# "ARE 1.467.492", "RE1461810", "are nº 1467492" -> ARE1467492 (mesmo formato das pastas do dataset)
+CASE_ID_PATTERN = re.compile(r"\b(ARE|RE)\s*(?:n[ºo°.]?\s*)?(\d{1,3}(?:\.?\d{3})+)\b", re.IGNORECASE)
+# Número de processo com 12 dígitos, como o extraído na ingestão
+PROCESSO_PATTERN = re.compile(r"(?<!\d)(\d{12})(?!\d)")
+
+
+class SearchFilters(NamedTuple):
+    processo: Optional[str] = None
+    case_id: Optional[str] = None
+    doc_type: Optional[str] = None
+    file_name: Optional[str] = None
+
+    def where(self) -> Optional[Dict]:
+        """Cláusula ``where`` do Chroma com os filtros preenchidos (None = coleção inteira)."""
+        clauses = [{field: value} for field, value in self._asdict().items() if value]
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    def merge(self, other: "SearchFilters") -> "SearchFilters":
+        """Completa os campos vazios com os de ``other`` (filtros explícitos têm prioridade)."""
+        return SearchFilters(*(mine or theirs for mine, theirs in zip(self, other)))
+
+    def __bool__(self):
+        return any(self)
+
+
+def detect_filters(question: str) -> SearchFilters:
+    """Identifica o caso (ARE/RE) ou o número do processo citado na pergunta."""
+    case_id = None
+    match = CASE_ID_PATTERN.search(question)
+    if match:
+        case_id = match.group(1).upper() + match.group(2).replace(".", "")
+    match = PROCESSO_PATTERN.search(question)
+    return SearchFilters(processo=match.group(1) if match else None, case_id=case_id)
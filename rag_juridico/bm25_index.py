@@ -0,0 +1,129 @@
+import re
+import json
+import math
+import unicodedata
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, List, Tuple
+import numpy as np
+try:  # Pacote rag_juridico (chat) ou módulo solto (ingestão rodando nesta pasta)
+    from rag_juridico.index_files import new_version_dir, publish_version
+except ImportError:
+    from index_files import new_version_dir, publish_version
+
+
+INDEX_VERSION = 1
+
+STOPWORDS = frozenset("""
+a ao aos as até com como da das de dela dele deles do dos e é em entre era essa esse esta este eu foi
+for há isso isto já la lhe mais mas me mesmo muito na nas nem no nos o os ou para pela pelas pelo pelos
+por qual quando que se sem ser seu seus sua suas são também te tem um uma umas uns à às
+""".split())
+
+TOKEN_PATTERN = re.compile(r"\w+(?:[./-]\w+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens em minúsculas e sem acentos, preservando números de artigos e de processos.
+
+    "Art. 104" -> ["art", "104"]; "ARE 1.467.492" -> ["are", "1467492", "1", "467", "492"];
+    o número colado sem pontuação é o que permite casar o processo escrito de formas diferentes.
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text):
+        token = match.group()
+        parts = re.split(r"[./-]", token)
+        if len(parts) > 1:
+            tokens.append("".join(parts))
+            tokens.extend(part for part in parts if part and part not in STOPWORDS)
+        elif token not in STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+# ======CONSTRUÇÃO DO ÍNDICE (INGESTÃO)======
+def build_bm25_index(chunks: Iterable[Tuple[str, str]], out_dir: str, k1: float = 1.2, b: float = 0.75) -> dict:
+    """Gera o índice invertido de ``(chunk_id, texto)`` em ``out_dir``.
+
+    Listas de postings ficam em arrays contíguos (.npy) abertos com mmap na consulta;
+    o vocabulário guarda, por termo, o intervalo nessas listas e o IDF.
+    """
+    ids: List[str] = []
+    doc_len = array("I")
+    postings_docs = {}
+    postings_tf = {}
+    for doc_idx, (chunk_id, text) in enumerate(chunks):
+        counts = Counter(tokenize(text or ""))
+        ids.append(chunk_id)
+        doc_len.append(sum(counts.values()))
+        for term, tf in counts.items():
+            if term not in postings_docs:
+                postings_docs[term], postings_tf[term] = array("I"), array("H")
+            postings_docs[term].append(doc_idx)
+            postings_tf[term].append(min(tf, 65535))
+
+    n_docs = len(ids)
+    vocab, start = {}, 0
+    all_docs, all_tf = array("I"), array("H")
+    for term in sorted(postings_docs):
+        docs = postings_docs[term]
+        df = len(docs)
+        idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+        vocab[term] = [start, start + df, round(idf, 6)]
+        all_docs.extend(docs)
+        all_tf.extend(postings_tf[term])
+        start += df
+
+    # Grava numa versão nova e troca o link de uma vez: leitores nunca veem um índice pela metade
+    tmp_path = new_version_dir(out_dir)
+    np.save(tmp_path / "postings_docs.npy", np.frombuffer(all_docs, dtype=np.uint32))
+    np.save(tmp_path / "postings_tf.npy", np.frombuffer(all_tf, dtype=np.uint16))
+    np.save(tmp_path / "doc_len.npy", np.frombuffer(doc_len, dtype=np.uint32))
+    avgdl = (sum(doc_len) / n_docs) if n_docs else 0.0
+    meta = {"version": INDEX_VERSION, "k1": k1, "b": b, "n_docs": n_docs, "avgdl": avgdl, "ids": ids, "vocab": vocab}
+    with open(tmp_path / "meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, separators=(",", ":"))
+
+    publish_version(tmp_path, out_dir)
+    return {"documents": n_docs, "terms": len(vocab), "postings": len(all_docs)}
+
+
+# ======CONSULTA AO ÍNDICE======
+class BM25Index:
+    def __init__(self, index_dir: str):
+        path = Path(index_dir)
+        with open(path / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Versão do índice BM25 incompatível: {meta.get('version')}")
+        self.k1, self.b = meta["k1"], meta["b"]
+        self.avgdl = meta["avgdl"] or 1.0
+        self.ids: List[str] = meta["ids"]
+        self.vocab = meta["vocab"]
+        # mmap: os arrays ficam no page cache e são compartilhados entre processos
+        self.postings_docs = np.load(path / "postings_docs.npy", mmap_mode="r")
+        self.postings_tf = np.load(path / "postings_tf.npy", mmap_mode="r")
+        self.doc_len = np.load(path / "doc_len.npy", mmap_mode="r")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        terms = [term for term in set(tokenize(query)) if term in self.vocab]
+        if not terms or not self.ids:
+            return []
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in terms:
+            start, end, idf = self.vocab[term]
+            docs = self.postings_docs[start:end]
+            tf = self.postings_tf[start:end].astype(np.float32)
+            norm = self.k1 * (1 - self.b + self.b * self.doc_len[docs] / self.avgdl)
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[i], float(scores[i])) for i in top if scores[i] > 0]
@@ -0,0 +1,128 @@
+import time
+import random
+import sqlite3
+import hashlib
+import logging
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+from langchain_core.embeddings import Embeddings
+
+
+THROTTLING_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException"}
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _is_throttling(error: Exception) -> bool:
+    # BedrockEmbeddings embrulha o ClientError em ValueError; o código fica só na mensagem
+    code = (getattr(error, "response", None) or {}).get("Error", {}).get("Code", "")
+    return code in THROTTLING_CODES or any(c in str(error) for c in THROTTLING_CODES)
+
+
+# ======CACHE EM DISCO (SQLITE) DE TEXTO -> VETOR======
+class EmbeddingStore:
+    """Guarda vetores float32 por (modelo, sha256 do texto) num SQLite local."""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model_id TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (model_id, text_hash))"
+            )
+
+    def get_many(self, model_id: str, hashes: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            # Consulta em lotes para não estourar o limite de parâmetros do SQLite
+            for i in range(0, len(hashes), 500):
+                batch = hashes[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model_id = ? AND text_hash IN ({placeholders})",
+                    [model_id, *batch]
+                )
+                for h, blob in rows:
+                    found[h] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, model_id: str, vectors: Dict[str, List[float]]):
+        rows = [(model_id, h, array("f", vector).tobytes()) for h, vector in vectors.items()]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+
+    def close(self):
+        self._conn.close()
+
+
+# ======EMBEDDINGS EM LOTE COM CACHE, DEDUPLICAÇÃO E BACKOFF======
+class CachedEmbeddings(Embeddings):
+    """Envolve um modelo de embeddings: deduplica textos, usa o cache em disco e envia
+    as faltas em lotes concorrentes, com backoff exponencial quando o Bedrock limita."""
+
+    def __init__(self, base: Embeddings, model_id: str, cache_path: Optional[str] = None,
+                 batch_size: int = 32, max_concurrency: int = 4, max_retries: int = 6,
+                 base_delay: float = 0.5, logger: Optional[logging.Logger] = None):
+        self.base = base
+        self.model_id = model_id
+        self.store = EmbeddingStore(cache_path) if cache_path else None
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.logger = logger or logging.getLogger(__name__)
+        self.stats = {"texts": 0, "unique": 0, "cache_hits": 0, "embedded": 0, "retries": 0}
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.base.embed_documents(texts)
+            except Exception as e:
+                if attempt == self.max_retries or not _is_throttling(e):
+                    raise
+                self.stats["retries"] += 1
+                delay = self.base_delay * (2 ** attempt) * (0.5 + random.random())
+                self.logger.warning(f"⏳ Limite de requisições no embedding, nova tentativa em {delay:.1f}s")
+                time.sleep(delay)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [text_hash(text) for text in texts]
+        unique = dict(zip(hashes, texts))
+        vectors = self.store.get_many(self.model_id, list(unique)) if self.store else {}
+        misses = [h for h in unique if h not in vectors]
+
+        batches = [misses[i:i + self.batch_size] for i in range(0, len(misses), self.batch_size)]
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as executor:
+                batch_results = executor.map(lambda batch: self._embed_batch([unique[h] for h in batch]), batches)
+                for batch, embedded in zip(batches, batch_results):
+                    new_vectors = dict(zip(batch, embedded))
+                    if self.store:
+                        # Grava a cada lote: um run interrompido mantém o que já foi pago
+                        self.store.put_many(self.model_id, new_vectors)
+                    vectors.update(new_vectors)
+
+        self.stats["texts"] += len(texts)
+        self.stats["unique"] += len(unique)
+        self.stats["cache_hits"] += len(unique) - len(misses)
+        self.stats["embedded"] += len(misses)
+        return [vectors[h] for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.base.embed_query(text)
+
+    def log_stats(self):
+        s = self.stats
+        self.logger.info(
+            f"🧮 Embeddings: {s['texts']} textos, {s['unique']} únicos, {s['cache_hits']} do cache, "
+            f"{s['embedded']} calculados, {s['retries']} novas tentativas"
+        )
@@ -0,0 +1,98 @@
+import os
+import re
+import time
+import shutil
+import threading
+from pathlib import Path
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+# ======PUBLICAÇÃO ATÔMICA DE UM ÍNDICE EM DISCO======
+def new_version_dir(out_dir: str) -> Path:
+    """Diretório vazio, ao lado de ``out_dir``, onde a nova versão do índice é gravada."""
+    out_path = Path(out_dir)
+    version_path = out_path.with_name(f"{out_path.name}.v{time.time_ns()}")
+    version_path.mkdir(parents=True)
+    return version_path
+
+
+def publish_version(version_path: Path, out_dir: str):
+    """Faz ``out_dir`` (um symlink) apontar para ``version_path`` numa única operação.
+
+    A troca é um ``os.replace`` do link: quem abre ``out_dir`` sempre encontra um índice inteiro,
+    nunca um diretório ausente ou pela metade. A versão anterior fica em disco, porque um leitor
+    pode ter acabado de resolver o link para ela; as demais (inclusive sobras de builds
+    interrompidos) são apagadas.
+    """
+    out_path = Path(out_dir)
+    previous = os.readlink(out_path) if out_path.is_symlink() else None
+    link_tmp = out_path.with_name(out_path.name + ".link")
+    if os.path.lexists(link_tmp):
+        os.unlink(link_tmp)
+    os.symlink(version_path.name, link_tmp)
+    if out_path.is_dir() and not out_path.is_symlink():
+        # Layout antigo (diretório de verdade no lugar do link): migra uma única vez
+        shutil.rmtree(out_path)
+    os.replace(link_tmp, out_path)
+    pattern = re.compile(re.escape(out_path.name) + r"\.v\d+$")
+    for path in out_path.parent.iterdir():
+        if pattern.match(path.name) and path.name not in (version_path.name, previous):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+# ======LEITURA COM RECARGA QUANDO A INGESTÃO PUBLICA OUTRA VERSÃO======
+class ReloadingIndex(Generic[T]):
+    """Abre o índice de ``index_dir`` com ``opener`` no primeiro uso e o reabre a cada nova versão.
+
+    A versão é o destino do link (mais o mtime do meta.json, para o layout antigo), conferida no
+    máximo a cada ``check_interval`` segundos. Índice ausente ou que falha ao abrir não derruba a
+    consulta: segue valendo a versão já carregada (ou None, se nenhuma carregou ainda).
+    """
+
+    def __init__(self, index_dir: str, opener: Callable[[Path], T], label: str,
+                 logger=None, check_interval: float = 30.0):
+        self.index_dir = index_dir
+        self.opener = opener
+        self.label = label
+        self.logger = logger
+        self.check_interval = check_interval
+        self.error: Optional[Exception] = None
+        self._index: Optional[T] = None
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _read_version(self):
+        path = Path(os.path.realpath(self.index_dir))
+        return str(path), os.stat(path / "meta.json").st_mtime
+
+    def version(self):
+        """Versão publicada em disco neste momento (None se não há índice), sem abri-la."""
+        try:
+            return self._read_version()
+        except OSError:
+            return None
+
+    def get(self) -> Optional[T]:
+        now = time.monotonic()
+        if self._index is not None and now - self._checked_at < self.check_interval:
+            return self._index
+        with self._lock:
+            self._checked_at = now
+            try:
+                version = self._read_version()
+            except OSError as e:
+                self.error = e
+                return self._index
+            if version != self._version:
+                try:
+                    self._index, self._version, self.error = self.opener(Path(version[0])), version, None
+                    if self.logger:
+                        self.logger.info(f"📂 {self.label} carregado: {len(self._index)} chunks")
+                except Exception as e:
+                    self.error = e
+                    if self.logger:
+                        self.logger.warning(f"⚠️ {self.label} não carregado: {e}")
+            return self._index
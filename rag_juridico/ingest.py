@@ -1,12 +1,23 @@
 import os
+import re
+import time
 import logging
-import boto3
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from langchain_core.documents import Document
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import Chroma
+from manifest import IngestManifest, chunk_id, file_sha256
+from s3_sync import S3Sync
+from embedding_cache import CachedEmbeddings
+from bm25_index import build_bm25_index
+from vector_index import build_vector_index
+from legal_text import PageFurnitureStripper, split_pages
+from near_duplicates import NearDuplicateIndex
 
 
 # ======CONFIGURAÇÕES======
@@ -20,21 +31,146 @@ class Config:
         self.CHUNK_SIZE = 1000
         self.CHUNK_OVERLAP = 200
         self.MAX_FILES_LOG = 2
+        # Downloads simultâneos na sincronização com o S3
+        self.S3_SYNC_WORKERS = 16
         self.EMBEDDING_MODE = "BEDROCK"
+        self.EMBEDDING_MODEL_ID = "amazon.titan-embed-text-v2:0"
+        # Cache em disco de vetores já calculados e envio em lotes concorrentes
+        self.EMBEDDING_CACHE_PATH = "/mnt/data/embedding_cache.sqlite3"
+        self.EMBEDDING_BATCH_SIZE = 32
+        self.EMBEDDING_CONCURRENCY = 4
+        # Processos usados na leitura paralela dos PDFs (1 = leitura serial)
+        self.LOAD_WORKERS = os.cpu_count() or 1
+        # PDFs em leitura simultânea por processo (limita a memória quando o consumo é mais lento)
+        self.LOAD_PREFETCH = 2
+        # Chunks embedados e gravados por lote no pipeline em streaming
+        self.WRITE_BATCH_SIZE = 128
+        # Ingestão incremental: só reprocessa PDFs novos, alterados ou removidos
+        # (False = apaga a coleção e reconstrói tudo pelo mesmo pipeline em streaming)
+        self.INCREMENTAL = True
+        self.MANIFEST_PATH = "/mnt/data/ingest_manifest.json"
+        # Índice lexical (BM25) sobre os mesmos chunks, usado na busca híbrida do chat
+        self.BM25_DIR = "/mnt/data/bm25_index"
+        # Índice vetorial compacto (matriz .npy em mmap) exportado da coleção para o chat com VECTOR_BACKEND=numpy
+        self.VECTOR_INDEX_ENABLED = True
+        self.VECTOR_INDEX_DIR = "/mnt/data/vector_index"
+        self.VECTOR_INDEX_DTYPE = "int8"  # float32 | float16 | int8
+        self.VECTOR_INDEX_NLIST = None  # None = IVF automático a partir de 20 mil chunks; 0 = só busca exata
+        # Limpeza antes do embedding: tira cabeçalhos/rodapés repetidos, divide por seção (ementa,
+        # relatório, voto, dispositivo) e descarta chunks quase duplicados de outro chunk do mesmo PDF
+        self.STRIP_PAGE_FURNITURE = True
+        self.STRUCTURE_SPLIT = True
+        self.DEDUP_CHUNKS = True
+        self.DEDUP_MAX_DISTANCE = 3  # bits de diferença entre SimHashes de 64 bits (máximo 3)
+
+
+# ======EXTRAÇÃO DO NÚMERO DO PROCESSO======
+PROCESSO_PATTERN = re.compile(r'(?:n[ºo.]?\s*|processo[^\d]*)(\d{12})', re.IGNORECASE)
+
+
+def extract_processo_number(text: str) -> str:
+    match = PROCESSO_PATTERN.search(text)
+    return match.group(1) if match else "desconhecido"
+
+
+# ======LEITURA DE UM PDF (EXECUTADA NOS PROCESSOS FILHOS)======
+def _load_pdf(pdf_path: str, dataset_dir: str) -> Tuple[str, Optional[List[Document]], Optional[str]]:
+    """Lê um PDF e devolve (caminho, páginas, erro); falhas não interrompem o lote."""
+    try:
+        path = Path(pdf_path)
+        pages = PyPDFLoader(pdf_path).load()
+        folder = path.parent.relative_to(dataset_dir)
+        # Pastas no formato <caso>/<tipo>, ex.: ARE1467492/agravo → filtros da consulta
+        case_id = folder.parts[0] if folder.parts else ""
+        doc_type = folder.parts[1] if len(folder.parts) > 1 else ""
+        numbers = [extract_processo_number(page.page_content) for page in pages]
+        # Páginas sem o número herdam o primeiro encontrado no PDF, para o filtro pegar o documento inteiro
+        file_processo = next((n for n in numbers if n != "desconhecido"), "desconhecido")
+        for page, processo in zip(pages, numbers):
+            page.metadata.update({
+                "source": pdf_path,
+                "file_name": path.name,
+                "folder": str(folder),
+                "case_id": case_id,
+                "doc_type": doc_type,
+                "processo": processo if processo != "desconhecido" else file_processo
+            })
+        return pdf_path, pages, None
+    except Exception as e:
+        return pdf_path, None, str(e)
+
+
+# ======ESTATÍSTICAS DO PIPELINE======
+class PipelineStats:
+    UNITS = {"load": "páginas", "split": "chunks", "embed": "vetores", "write": "vetores"}
+
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = {stage: [0, 0.0] for stage in self.UNITS}
+        self.duplicates = 0
+        self.furniture_lines = 0
+        self.start = time.perf_counter()
+
+    def add(self, stage: str, items: int, seconds: float):
+        self.stages[stage][0] += items
+        self.stages[stage][1] += seconds
+
+    def report(self, logger: logging.Logger):
+        wall = time.perf_counter() - self.start
+        for stage, (items, seconds) in self.stages.items():
+            rate = items / seconds if seconds else 0.0
+            logger.info(f"⏱ {stage:<6} {int(items):>7} {self.UNITS[stage]:<8} em {seconds:7.2f}s ({rate:,.1f} {self.UNITS[stage]}/s)")
+        total = self.stages["split"][0] + self.duplicates
+        if total:
+            logger.info(
+                f"♻ {self.duplicates} chunks quase duplicados ligados ao canônico, sem embedding "
+                f"({self.duplicates / total:.1%}) | 🧹 {self.furniture_lines} linhas de cabeçalho/rodapé removidas"
+            )
+        logger.info(f"⏱ Tempo total do pipeline: {wall:.2f}s")
+
+
+# ======CHUNKS DE UM PDF======
+class FileChunker:
+    """Limpeza, divisão por seção e deduplicação de um PDF, usando só as páginas dele.
+
+    O mesmo arquivo gera sempre os mesmos chunks e IDs, independentemente da ordem dos arquivos
+    ou de a ingestão ser completa ou incremental. Quase duplicados só são ligados dentro do
+    arquivo e com os mesmos metadados filtráveis (ver near_duplicates.SCOPE_KEYS).
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.splitter = RecursiveCharacterTextSplitter(chunk_size=config.CHUNK_SIZE, chunk_overlap=config.CHUNK_OVERLAP)
+        self.stripper = PageFurnitureStripper()
+
+    def split(self, pages: List[Document], rel_path: str, file_hash: str,
+              stats: Optional[PipelineStats] = None) -> List[Document]:
+        """Chunks com IDs estáveis, sem os quase duplicados de outros chunks do mesmo arquivo."""
+        if self.config.STRIP_PAGE_FURNITURE:
+            removed = self.stripper.strip(pages)
+            if stats is not None:
+                stats.furniture_lines += removed
+        chunks = split_pages(pages, self.splitter, structure=self.config.STRUCTURE_SPLIT)
+        for i, chunk in enumerate(chunks):
+            chunk.metadata["chunk_id"] = chunk_id(rel_path, file_hash, i)
+        if self.config.DEDUP_CHUNKS:
+            chunks, duplicates = NearDuplicateIndex(self.config.DEDUP_MAX_DISTANCE).filter(chunks)
+            if stats is not None:
+                stats.duplicates += len(duplicates)
+        return chunks
 
 
 # ======PROCESSADOR DE DOCUMENTOS======
 class DocumentProcessor:
     def extract_processo_number(self, text: str) -> str:
-        import re
-        match = re.search(r'(?:n[ºo.]?\s*|processo[^\d]*)(\d{12})', text, re.IGNORECASE)
-        return match.group(1) if match else "desconhecido"
+        return extract_processo_number(text)
 
     def __init__(self, config: Config):
         self.config = config
         self._setup_logging()
         self.embedding_model = self._get_embedding_model()
         self.vectordb = None
+        self.failed_files = []
+        self.chunker = FileChunker(config)
 
     # ======CONFIGURAÇÃO DE LOGS======
     def _setup_logging(self):
@@ -45,57 +181,102 @@ class DocumentProcessor:
     def _get_embedding_model(self):
         if self.config.EMBEDDING_MODE == "BEDROCK":
             from langchain_aws import BedrockEmbeddings
-            return BedrockEmbeddings(model_id="amazon.titan-embed-text-v2:0", region_name="us-east-1")
-        from langchain_core.embeddings import FakeEmbeddings
-        return FakeEmbeddings(size=384)
+            base = BedrockEmbeddings(model_id=self.config.EMBEDDING_MODEL_ID, region_name="us-east-1")
+            model_id = self.config.EMBEDDING_MODEL_ID
+        else:
+            from langchain_core.embeddings import FakeEmbeddings
+            base = FakeEmbeddings(size=384)
+            model_id = "fake-384"
+        return CachedEmbeddings(
+            base,
+            model_id=model_id,
+            cache_path=self.config.EMBEDDING_CACHE_PATH,
+            batch_size=self.config.EMBEDDING_BATCH_SIZE,
+            max_concurrency=self.config.EMBEDDING_CONCURRENCY,
+            logger=self.logger
+        )
 
     # ======DOWNLOAD DOS ARQUIVOS PDF DO S3======
-    def download_pdfs_from_s3(self):
-        self.logger.info("⬇ Baixando PDFs do S3...")
-        s3 = boto3.client('s3')
-        paginator = s3.get_paginator('list_objects_v2')
-        pages = paginator.paginate(Bucket=self.config.S3_BUCKET, Prefix=self.config.S3_PREFIX)
-        for page in pages:
-            for obj in page.get("Contents", []):
-                key = obj["Key"]
-                if key.endswith(".pdf"):
-                    relative_path = Path(key).relative_to(self.config.S3_PREFIX)
-                    dest_path = Path(self.config.LOCAL_DATASET_DIR) / relative_path
-                    dest_path.parent.mkdir(parents=True, exist_ok=True)
-                    s3.download_file(self.config.S3_BUCKET, key, str(dest_path))
-                    self.logger.info(f"📥 Baixado: {key} → {dest_path}")
+    def download_pdfs_from_s3(self, client=None):
+        self.logger.info("⬇ Sincronizando PDFs do S3...")
+        sync = S3Sync(
+            bucket=self.config.S3_BUCKET,
+            prefix=self.config.S3_PREFIX,
+            local_dir=self.config.LOCAL_DATASET_DIR,
+            max_workers=self.config.S3_SYNC_WORKERS,
+            client=client,
+            logger=self.logger
+        )
+        return sync.sync()
 
     # ======CARREGAMENTO DOS DOCUMENTOS======
+    def list_pdf_files(self) -> List[Path]:
+        return sorted(Path(self.config.LOCAL_DATASET_DIR).rglob("*.pdf"))
+
+    def _iter_loaded(self, paths: List[str], dataset_dir: str) -> Iterator[Tuple[str, Optional[List[Document]], Optional[str]]]:
+        workers = min(self.config.LOAD_WORKERS, len(paths))
+        if workers <= 1:
+            for path in paths:
+                yield _load_pdf(path, dataset_dir)
+            return
+        # "spawn": a essa altura o Chroma e o SQLite do cache de embeddings já estão abertos, e um
+        # fork copiaria esses handles (e locks) para os filhos
+        # Janela limitada de PDFs em voo: se o consumidor atrasa, os processos param de ler
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            pending_paths = iter(paths)
+            window = deque(
+                executor.submit(_load_pdf, path, dataset_dir)
+                for _, path in zip(range(workers * self.config.LOAD_PREFETCH), pending_paths)
+            )
+            try:
+                while window:
+                    result = window.popleft().result()
+                    next_path = next(pending_paths, None)
+                    if next_path is not None:
+                        window.append(executor.submit(_load_pdf, next_path, dataset_dir))
+                    yield result
+            finally:
+                for future in window:
+                    future.cancel()
+
+    def iter_documents(self, pdf_files: Optional[List[Path]] = None) -> Iterator[Tuple[Path, List[Document]]]:
+        """Gera (arquivo, páginas) na mesma ordem de ``pdf_files``, em paralelo quando configurado."""
+        if pdf_files is None:
+            pdf_files = self.list_pdf_files()
+        paths = [str(pdf_path) for pdf_path in pdf_files]
+        self.failed_files = []
+
+        for i, (pdf_path, pages, error) in enumerate(self._iter_loaded(paths, str(self.config.LOCAL_DATASET_DIR))):
+            if error is not None:
+                self.failed_files.append((pdf_path, error))
+                self.logger.error(f"❌ Erro em {Path(pdf_path).name}: {error}")
+                continue
+            if i < self.config.MAX_FILES_LOG:
+                self.logger.info(f"✅ Processado: {pdf_path}")
+            yield Path(pdf_path), pages
+
+        if self.failed_files:
+            self.logger.warning(f"⚠ {len(self.failed_files)} arquivo(s) com erro de leitura")
+
     def load_documents(self) -> List[Document]:
-        self.logger.info("📂 Carregando documentos...")
-        pdf_files = list(Path(self.config.LOCAL_DATASET_DIR).rglob("*.pdf"))
+        self.logger.info(f"📂 Carregando documentos ({self.config.LOAD_WORKERS} processo(s))...")
         documents = []
-        for i, pdf_path in enumerate(pdf_files):
-            try:
-                loader = PyPDFLoader(str(pdf_path))
-                pages = loader.load()
-                for page in pages:
-                    processo_num = self.extract_processo_number(page.page_content)
-                    page.metadata.update({
-                        "source": str(pdf_path),
-                        "file_name": pdf_path.name,
-                        "folder": str(pdf_path.parent.relative_to(self.config.LOCAL_DATASET_DIR)),
-                        "processo": processo_num
-                    })
-                documents.extend(pages)
-                if i < self.config.MAX_FILES_LOG:
-                    self.logger.info(f"✅ Processado: {pdf_path}")
-            except Exception as e:
-                self.logger.error(f"❌ Erro em {pdf_path.name}: {e}")
+        for _, pages in self.iter_documents():
+            documents.extend(pages)
         self.logger.info(f"📄 Total de páginas: {len(documents)}")
         return documents
 
     # ======DIVISÃO DOS DOCUMENTOS EM CHUNKS======
     def split_documents(self, documents: List[Document]) -> List[Document]:
         self.logger.info("✂ Dividindo textos...")
-        splitter = RecursiveCharacterTextSplitter(chunk_size=self.config.CHUNK_SIZE, chunk_overlap=self.config.CHUNK_OVERLAP)
-        chunks = splitter.split_documents(documents)
-        self.logger.info(f"🔖 Total de pedaços: {len(chunks)}")
+        by_source: Dict[str, List[Document]] = {}
+        for page in documents:
+            by_source.setdefault(page.metadata.get("source", ""), []).append(page)
+        chunks, stats = [], PipelineStats()
+        for source, pages in by_source.items():
+            rel_path = str(Path(pages[0].metadata["folder"]) / pages[0].metadata["file_name"])
+            chunks.extend(self.chunker.split(pages, rel_path, file_sha256(Path(source)), stats))
+        self.logger.info(f"🔖 Total de pedaços: {len(chunks)} ({stats.duplicates} quase duplicados descartados)")
         return chunks
 
     # ======CRIAÇÃO DO BANCO DE VETORES======
@@ -108,7 +289,179 @@ class DocumentProcessor:
             collection_name=self.config.COLLECTION_NAME
         )
         self.vectordb.persist()
+        # IDs aleatórios do from_documents: o manifesto deixa de valer para esta coleção
+        IngestManifest(self.config.MANIFEST_PATH).save()
+        self.embedding_model.log_stats()
         self.logger.info(f"📦 Base criada com {self.vectordb._collection.count()} vetores")
+        self.build_lexical_index(self.vectordb)
+        if self.config.VECTOR_INDEX_ENABLED:
+            self.build_compact_vector_index(self.vectordb)
+
+    # ======ÍNDICE LEXICAL (BM25)======
+    def _iter_collection(self, vectordb, include: List[str], page_size: int = 1000) -> Iterator[tuple]:
+        """Percorre a coleção em páginas: gera (id, *campos de ``include``) na ordem pedida."""
+        offset = 0
+        while True:
+            page = vectordb._collection.get(include=include, limit=page_size, offset=offset)
+            if not page["ids"]:
+                return
+            yield from zip(page["ids"], *(page[key] for key in include))
+            offset += len(page["ids"])
+
+    def build_lexical_index(self, vectordb):
+        """Reconstrói o índice BM25 a partir dos chunks gravados na coleção (mesmos IDs)."""
+        started = time.perf_counter()
+        info = build_bm25_index(self._iter_collection(vectordb, ["documents"]), self.config.BM25_DIR)
+        self.logger.info(
+            f"🔤 Índice BM25: {info['documents']} chunks, {info['terms']} termos "
+            f"em {time.perf_counter() - started:.1f}s → {self.config.BM25_DIR}"
+        )
+
+    # ======ÍNDICE VETORIAL COMPACTO======
+    def build_compact_vector_index(self, vectordb):
+        """Exporta vetores, textos e metadados da coleção para o índice em mmap lido pelo chat."""
+        started = time.perf_counter()
+        info = build_vector_index(
+            self._iter_collection(vectordb, ["documents", "metadatas", "embeddings"]),
+            self.config.VECTOR_INDEX_DIR,
+            dtype=self.config.VECTOR_INDEX_DTYPE,
+            nlist=self.config.VECTOR_INDEX_NLIST
+        )
+        self.logger.info(
+            f"🧮 Índice vetorial: {info['vectors']} vetores {info['dtype']} ({info['dimensions']} dim, "
+            f"{info['nlist']} listas IVF) em {time.perf_counter() - started:.1f}s → {self.config.VECTOR_INDEX_DIR}"
+        )
+
+    # ======PIPELINE EM STREAMING: LER → DIVIDIR → EMBEDAR → GRAVAR======
+    def _iter_file_chunks(self, pdf_files: List[Path], hashes: Dict[str, str],
+                          stats: PipelineStats) -> Iterator[Tuple[str, List[Document]]]:
+        dataset_dir = Path(self.config.LOCAL_DATASET_DIR)
+        documents = self.iter_documents(pdf_files)
+        while True:
+            started = time.perf_counter()
+            item = next(documents, None)
+            if item is None:
+                return
+            pdf_path, pages = item
+            stats.add("load", len(pages), time.perf_counter() - started)
+
+            started = time.perf_counter()
+            rel_path = str(pdf_path.relative_to(dataset_dir))
+            chunks = self.chunker.split(pages, rel_path, hashes[rel_path], stats)
+            stats.add("split", len(chunks), time.perf_counter() - started)
+            yield rel_path, chunks
+
+    def _write_batch(self, vectordb, batch: List[Document], stats: PipelineStats):
+        texts = [chunk.page_content for chunk in batch]
+        started = time.perf_counter()
+        vectors = self.embedding_model.embed_documents(texts)
+        stats.add("embed", len(vectors), time.perf_counter() - started)
+
+        started = time.perf_counter()
+        # upsert com IDs estáveis: reexecutar após uma falha não duplica vetores
+        vectordb._collection.upsert(
+            ids=[chunk.metadata["chunk_id"] for chunk in batch],
+            embeddings=vectors,
+            metadatas=[chunk.metadata for chunk in batch],
+            documents=texts
+        )
+        stats.add("write", len(batch), time.perf_counter() - started)
+
+    def run_pipeline(self, vectordb, pdf_files: List[Path], hashes: Dict[str, str],
+                     on_files_written: Callable[[List[Tuple[str, List[str]]]], None]) -> PipelineStats:
+        """Processa os PDFs em lotes de WRITE_BATCH_SIZE chunks, com memória constante.
+
+        ``on_files_written`` recebe [(arquivo, ids dos chunks)] assim que todos os chunks de cada arquivo estiverem gravados na coleção.
+        """
+        stats = PipelineStats()
+        batch: List[Document] = []
+        pending_files = deque()  # (arquivo, ids, sequência do último chunk)
+        queued = written = 0
+
+        def flush():
+            nonlocal batch, written
+            if batch:
+                self._write_batch(vectordb, batch, stats)
+                written += len(batch)
+                batch = []
+            done = []
+            while pending_files and pending_files[0][2] <= written:
+                rel_path, ids, _ = pending_files.popleft()
+                done.append((rel_path, ids))
+            if done:
+                on_files_written(done)
+
+        for rel_path, chunks in self._iter_file_chunks(pdf_files, hashes, stats):
+            queued += len(chunks)
+            pending_files.append((rel_path, [chunk.metadata["chunk_id"] for chunk in chunks], queued))
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) >= self.config.WRITE_BATCH_SIZE:
+                    flush()
+        flush()
+
+        stats.report(self.logger)
+        return stats
+
+    # ======INGESTÃO INCREMENTAL======
+    def _open_vector_store(self):
+        self.vectordb = Chroma(
+            collection_name=self.config.COLLECTION_NAME,
+            embedding_function=self.embedding_model,
+            persist_directory=self.config.PERSIST_DIR
+        )
+        return self.vectordb
+
+    def ingest_incremental(self, rebuild: bool = False):
+        self.logger.info("🔁 Ingestão incremental..." if not rebuild else "🧱 Reconstruindo a base...")
+        manifest = IngestManifest.load(self.config.MANIFEST_PATH)
+        vectordb = self._open_vector_store()
+        if rebuild or (not manifest.files and vectordb._collection.count() > 0):
+            if not rebuild:
+                self.logger.warning("⚠ Coleção existente sem manifesto: recriando para evitar vetores duplicados")
+            vectordb.delete_collection()
+            vectordb = self._open_vector_store()
+            manifest.clear()
+
+        dataset_dir = Path(self.config.LOCAL_DATASET_DIR)
+        pdf_files = {str(path.relative_to(dataset_dir)): path for path in self.list_pdf_files()}
+        hashes = {rel_path: file_sha256(path) for rel_path, path in pdf_files.items()}
+        diff = manifest.diff(hashes)
+        self.logger.info(
+            f"🧾 Novos: {len(diff.added)} | Alterados: {len(diff.changed)} | "
+            f"Removidos: {len(diff.removed)} | Inalterados: {len(diff.unchanged)}"
+        )
+
+        # Remove da coleção os chunks de PDFs apagados ou modificados
+        for rel_path in diff.removed + diff.changed:
+            stale_ids = manifest.chunk_ids(rel_path)
+            if stale_ids:
+                vectordb.delete(ids=stale_ids)
+            manifest.remove(rel_path)
+        manifest.save()
+
+        def on_files_written(files: List[Tuple[str, List[str]]]):
+            # O manifesto só registra arquivos com todos os chunks já gravados
+            for rel_path, ids in files:
+                manifest.update(rel_path, hashes[rel_path], pdf_files[rel_path].stat().st_size, ids)
+            manifest.save()
+
+        to_load = [pdf_files[rel_path] for rel_path in diff.added + diff.changed]
+        stats = self.run_pipeline(vectordb, to_load, hashes, on_files_written)
+
+        self.embedding_model.log_stats()
+        self.logger.info(f"📦 {int(stats.stages['write'][0])} chunks adicionados | Base com {vectordb._collection.count()} vetores")
+
+        # Índices derivados acompanham a coleção: reconstruídos quando foram gerados para outra versão
+        # do manifesto, o que cobre também um run anterior que caiu entre a gravação e a reconstrução
+        derived = [("bm25", self.config.BM25_DIR, self.build_lexical_index)]
+        if self.config.VECTOR_INDEX_ENABLED:
+            derived.append(("vector_index", self.config.VECTOR_INDEX_DIR, self.build_compact_vector_index))
+        for name, index_dir, build in derived:
+            if not manifest.index_current(name) or not (Path(index_dir) / "meta.json").exists():
+                build(vectordb)
+                manifest.mark_index(name)
+                manifest.save()
 
     # ======CONSULTA À BASE VETORIAL======
     def show_results(self, query: str = "lei", k: int = 2):
@@ -130,9 +483,7 @@ if __name__ == "__main__":
     processor = DocumentProcessor(config)
     try:
         processor.download_pdfs_from_s3()
-        docs = processor.load_documents()
-        chunks = processor.split_documents(docs)
-        processor.create_vector_store(chunks)
+        processor.ingest_incremental(rebuild=not config.INCREMENTAL)
         processor.show_results()
     except Exception as e:
         processor.logger.error(f"🚨 Erro no processamento: {e}")
@@ -0,0 +1,85 @@
+import re
+from collections import Counter
+from typing import List, Optional
+from langchain_core.documents import Document
+
+
+# ======CABEÇALHOS E RODAPÉS REPETIDOS======
+def normalize_line(line: str) -> str:
+    """Forma comparável de uma linha: números viram "#" ("(e-STJ Fl.1673)" == "(e-STJ Fl.458)")."""
+    return re.sub(r"\d+", "#", re.sub(r"\s+", " ", line.strip().lower()))
+
+
+class PageFurnitureStripper:
+    """Remove linhas que se repetem nas bordas das páginas (cabeçalho, rodapé, carimbos, paginação).
+
+    Uma linha é mobília quando aparece nas ``zone_lines`` primeiras/últimas linhas de pelo menos
+    ``min_fraction`` das páginas do PDF. A decisão usa só as páginas do próprio arquivo: o mesmo
+    PDF gera sempre os mesmos chunks (e IDs), seja numa ingestão completa ou incremental.
+    """
+
+    def __init__(self, zone_lines: int = 5, min_fraction: float = 0.5):
+        self.zone_lines = zone_lines
+        self.min_fraction = min_fraction
+
+    def _zone(self, lines: List[str]) -> List[int]:
+        if len(lines) <= 2 * self.zone_lines:
+            return list(range(len(lines)))
+        return list(range(self.zone_lines)) + list(range(len(lines) - self.zone_lines, len(lines)))
+
+    def strip(self, pages: List[Document]) -> int:
+        """Limpa ``pages`` no lugar e devolve o número de linhas removidas."""
+        page_lines = [page.page_content.splitlines() for page in pages]
+        counts = Counter()
+        for lines in page_lines:
+            counts.update({normalize_line(lines[i]) for i in self._zone(lines)})
+        min_pages = max(2, self.min_fraction * len(pages))
+        furniture = {line for line, count in counts.items() if line and count >= min_pages}
+
+        removed = 0
+        for page, lines in zip(pages, page_lines):
+            drop = {i for i in self._zone(lines) if normalize_line(lines[i]) in furniture}
+            if drop:
+                page.page_content = "\n".join(line for i, line in enumerate(lines) if i not in drop)
+                removed += len(drop)
+        return removed
+
+
+# ======DIVISÃO POR ESTRUTURA JURÍDICA======
+# Títulos no início da linha: "EMENTA", "E M E N T A", "Ementa:", "RELATÓRIO", "VOTO - VENCEDOR",
+# "DISPOSITIVO" e as fórmulas que abrem a parte dispositiva ("Ante o exposto", "Pelo exposto"...)
+SECTION_PATTERN = re.compile(
+    r"^[ \t]*(?:"
+    r"(?P<ementa>E ?M ?E ?N ?T ?A|Ementa)[ \t]*(?::|-|–|$)"
+    r"|(?P<relatorio>RELAT[ÓO]RIO)[ \t]*:?[ \t]*$"
+    r"|(?P<voto>V ?O ?T ?O)(?:[ \t]*[-–]?[ \t]*(?:VENCEDOR|VENCIDO|VOGAL))?[ \t]*:?[ \t]*$"
+    r"|(?P<dispositivo>DISPOSITIVO[ \t]*:?[ \t]*$|(?:Ante|Diante|Pelo)[ \t]+o[ \t]+exposto\b)"
+    r")",
+    re.MULTILINE
+)
+
+
+def split_sections(pages: List[Document], section: Optional[str] = None) -> List[Document]:
+    """Quebra as páginas nos títulos de seção; cada trecho leva ``section`` nos metadados.
+
+    A seção corrente continua nas páginas seguintes até o próximo título, então o relatório
+    que começa na página 2 e termina na 4 fica inteiro marcado como "relatorio".
+    """
+    segments = []
+    for page in pages:
+        text = page.page_content
+        bounds = [(match.start(), match.lastgroup) for match in SECTION_PATTERN.finditer(text)]
+        starts = [0] + [start for start, _ in bounds]
+        names = [section] + [name for _, name in bounds]
+        ends = starts[1:] + [len(text)]
+        for start, end, name in zip(starts, ends, names):
+            section = name
+            piece = text[start:end]
+            if piece.strip():
+                segments.append(Document(page_content=piece, metadata={**page.metadata, "section": name or ""}))
+    return segments
+
+
+def split_pages(pages: List[Document], splitter, structure: bool = True) -> List[Document]:
+    """Chunks de um PDF: com ``structure``, nenhum chunk atravessa a fronteira entre seções."""
+    return splitter.split_documents(split_sections(pages) if structure else pages)
@@ -0,0 +1,111 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+
+# ======HASH DE CONTEÚDO DOS ARQUIVOS======
+def file_sha256(path: Path, block_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(rel_path: str, file_hash: str, index: int) -> str:
+    """ID estável do chunk: muda quando o PDF muda de conteúdo ou de lugar.
+
+    O caminho entra no ID para que o mesmo PDF em duas pastas (dois casos) não compartilhe
+    vetores: senão um upsert sobrescreve os metadados do outro e apagar uma cópia apaga as duas.
+    """
+    digest = hashlib.sha256(f"{Path(rel_path).as_posix()}\0{file_hash}".encode("utf-8")).hexdigest()
+    return f"{digest[:24]}-{index:05d}"
+
+
+class ManifestDiff(NamedTuple):
+    added: List[str]
+    changed: List[str]
+    removed: List[str]
+    unchanged: List[str]
+
+
+# ======MANIFESTO DA INGESTÃO INCREMENTAL======
+class IngestManifest:
+    """Mapeia caminho relativo do PDF -> {hash, tamanho, IDs dos chunks} já indexados.
+
+    Guarda também, por índice derivado (BM25, índice vetorial), a versão do conteúdo para a
+    qual ele foi gerado: ``index_current`` diz se ainda corresponde à coleção.
+    """
+
+    # 2: chunks com case_id/doc_type; manifestos antigos forçam a recriação da coleção
+    # 3: chunks com section, sem cabeçalhos de página nem quase duplicados do mesmo PDF
+    # 4: IDs dos chunks incluem o caminho do PDF (cópias em pastas diferentes não colidem)
+    VERSION = 4
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.files: Dict[str, dict] = {}
+        self.indexes: Dict[str, str] = {}
+
+    @classmethod
+    def load(cls, path: str) -> "IngestManifest":
+        manifest = cls(path)
+        if manifest.path.exists():
+            with open(manifest.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == cls.VERSION:
+                manifest.files = data.get("files", {})
+                manifest.indexes = data.get("indexes", {})
+        return manifest
+
+    def save(self):
+        # Escrita atômica: um run interrompido nunca deixa o manifesto truncado
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.VERSION, "files": self.files, "indexes": self.indexes},
+                      f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def diff(self, current_hashes: Dict[str, str]) -> ManifestDiff:
+        added, changed, unchanged = [], [], []
+        for rel_path, file_hash in sorted(current_hashes.items()):
+            entry = self.files.get(rel_path)
+            if entry is None:
+                added.append(rel_path)
+            elif entry["sha256"] != file_hash:
+                changed.append(rel_path)
+            else:
+                unchanged.append(rel_path)
+        removed = sorted(set(self.files) - set(current_hashes))
+        return ManifestDiff(added, changed, removed, unchanged)
+
+    def chunk_ids(self, rel_path: str) -> List[str]:
+        return list(self.files.get(rel_path, {}).get("chunk_ids", []))
+
+    def update(self, rel_path: str, file_hash: str, size: int, ids: List[str]):
+        self.files[rel_path] = {"sha256": file_hash, "size": size, "chunk_ids": ids}
+
+    def remove(self, rel_path: str):
+        self.files.pop(rel_path, None)
+
+    def clear(self):
+        self.files = {}
+        self.indexes = {}
+
+    # ======VERSÃO DOS ÍNDICES DERIVADOS======
+    def content_version(self) -> str:
+        """Impressão dos arquivos/chunks registrados: muda a cada arquivo gravado ou removido."""
+        digest = hashlib.sha256()
+        for rel_path in sorted(self.files):
+            entry = self.files[rel_path]
+            digest.update(f"{rel_path}\0{entry['sha256']}\0{len(entry['chunk_ids'])}\n".encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    def index_current(self, name: str) -> bool:
+        return self.indexes.get(name) == self.content_version()
+
+    def mark_index(self, name: str):
+        self.indexes[name] = self.content_version()
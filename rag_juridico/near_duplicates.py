@@ -0,0 +1,93 @@
+import hashlib
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from bm25_index import tokenize
+
+
+FINGERPRINT_BITS = 64
+BANDS = 4  # 4 faixas de 16 bits: distância ≤ 3 garante ao menos uma faixa idêntica
+BAND_BITS = FINGERPRINT_BITS // BANDS
+# Abaixo disso o SimHash não é confiável: só textos iguais contam como duplicados
+MIN_TOKENS = 8
+# Campos filtráveis na busca (SearchFilters do chat) mais a pasta: um chunk só é ligado a um
+# canônico que todo filtro encontra do mesmo jeito e que é citado com a mesma fonte
+SCOPE_KEYS = ("case_id", "doc_type", "processo", "folder", "file_name")
+
+
+def _hash64(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def simhash(tokens: List[str], ngram: int = 3) -> int:
+    """SimHash de 64 bits sobre shingles de ``ngram`` termos (textos parecidos → poucos bits diferentes)."""
+    shingles = [" ".join(tokens[i:i + ngram]) for i in range(max(1, len(tokens) - ngram + 1))]
+    values = np.fromiter((_hash64(shingle) for shingle in shingles), dtype="<u8", count=len(shingles))
+    # Cada bit do resultado é a votação daquele bit entre os hashes dos shingles
+    bits = np.unpackbits(values.view(np.uint8)).reshape(len(values), FINGERPRINT_BITS)
+    votes = bits.sum(axis=0) * 2 > len(values)
+    return int(np.packbits(votes).view("<u8")[0])
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def dedup_scope(metadata: dict, keys: Sequence[str] = SCOPE_KEYS) -> str:
+    return "\x1f".join(str(metadata.get(key, "")) for key in keys)
+
+
+# ======ÍNDICE DE QUASE DUPLICADOS======
+class NearDuplicateIndex:
+    """Impressões SimHash dos chunks canônicos, com busca por faixas (sem comparar contra todos).
+
+    Cada ``scope`` tem seu próprio espaço (na ingestão, os valores de SCOPE_KEYS): um chunk só é
+    ligado a um canônico com os mesmos metadados filtráveis, então nenhum filtro da busca perde
+    o conteúdo descartado.
+    """
+
+    def __init__(self, max_distance: int = 3):
+        if not 0 <= max_distance < BANDS:
+            raise ValueError(f"max_distance deve ficar entre 0 e {BANDS - 1}")
+        self.max_distance = max_distance
+        self.bands: List[Dict[Tuple[str, int], List[Tuple[int, str]]]] = [{} for _ in range(BANDS)]
+        self.size = 0
+
+    @staticmethod
+    def _band_keys(fingerprint: int) -> List[int]:
+        mask = (1 << BAND_BITS) - 1
+        return [fingerprint >> (band * BAND_BITS) & mask for band in range(BANDS)]
+
+    def add(self, fingerprint: int, chunk_id: str, scope: str = ""):
+        for band, key in zip(self.bands, self._band_keys(fingerprint)):
+            band.setdefault((scope, key), []).append((fingerprint, chunk_id))
+        self.size += 1
+
+    def find(self, fingerprint: int, max_distance: Optional[int] = None, scope: str = "") -> Optional[str]:
+        """ID do chunk canônico de ``scope`` a no máximo ``max_distance`` bits, ou None."""
+        limit = self.max_distance if max_distance is None else max_distance
+        for band, key in zip(self.bands, self._band_keys(fingerprint)):
+            for candidate, chunk_id in band.get((scope, key), ()):
+                if hamming(candidate, fingerprint) <= limit:
+                    return chunk_id
+        return None
+
+    def filter(self, chunks: List[Document],
+               scope_keys: Sequence[str] = SCOPE_KEYS) -> Tuple[List[Document], Dict[str, str]]:
+        """Separa os chunks novos dos quase duplicados: (canônicos, {id duplicado: id canônico}).
+
+        Os canônicos entram no índice na hora, então repetições dentro da própria lista também
+        são ligadas à primeira ocorrência.
+        """
+        kept, links = [], {}
+        for chunk in chunks:
+            tokens = tokenize(chunk.page_content or "")
+            fingerprint = simhash(tokens)
+            scope = dedup_scope(chunk.metadata, scope_keys)
+            canonical = self.find(fingerprint, None if len(tokens) >= MIN_TOKENS else 0, scope)
+            if canonical is not None:
+                links[chunk.metadata["chunk_id"]] = canonical
+                continue
+            self.add(fingerprint, chunk.metadata["chunk_id"], scope)
+            kept.append(chunk)
+        return kept, links
@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import logging
+import boto3
+from botocore.config import Config as BotoConfig
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+class SyncReport(NamedTuple):
+    downloaded: int
+    skipped: int
+    deleted: int
+    failed: List[Tuple[str, str]]
+    bytes_transferred: int
+    seconds: float
+
+    @property
+    def throughput_mb_s(self) -> float:
+        return self.bytes_transferred / (1024 * 1024) / self.seconds if self.seconds else 0.0
+
+
+# ======SINCRONIZAÇÃO S3 -> DIRETÓRIO LOCAL======
+class S3Sync:
+    """Espelha um prefixo do S3 em disco, baixando em paralelo apenas o que mudou."""
+
+    METADATA_FILE = ".s3_sync.json"
+
+    def __init__(self, bucket: str, prefix: str, local_dir: str, max_workers: int = 16,
+                 suffix: str = ".pdf", client=None, logger: Optional[logging.Logger] = None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.local_dir = Path(local_dir)
+        self.max_workers = max_workers
+        self.suffix = suffix
+        # Um único client (thread-safe) com pool de conexões do tamanho do pool de threads
+        self.s3 = client or boto3.client("s3", config=BotoConfig(max_pool_connections=max_workers))
+        self.logger = logger or logging.getLogger(__name__)
+
+    # ======METADADOS LOCAIS (ETAG E TAMANHO DE CADA ARQUIVO)======
+    def _metadata_path(self) -> Path:
+        return self.local_dir / self.METADATA_FILE
+
+    def _load_metadata(self) -> Dict[str, dict]:
+        path = self._metadata_path()
+        if not path.exists():
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_metadata(self, metadata: Dict[str, dict]):
+        path = self._metadata_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=1)
+        os.replace(tmp_path, path)
+
+    def list_remote(self) -> Dict[str, dict]:
+        remote = {}
+        paginator = self.s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get("Contents", []):
+                key = obj["Key"]
+                if key.endswith(self.suffix):
+                    remote[key] = {"etag": obj["ETag"].strip('"'), "size": obj["Size"]}
+        return remote
+
+    def _local_path(self, key: str) -> Path:
+        return self.local_dir / Path(key).relative_to(self.prefix)
+
+    def _is_current(self, key: str, remote: dict, metadata: Dict[str, dict]) -> bool:
+        local = metadata.get(key)
+        path = self._local_path(key)
+        return (
+            local is not None
+            and local["etag"] == remote["etag"]
+            and local["size"] == remote["size"]
+            and path.exists()
+            and path.stat().st_size == remote["size"]
+        )
+
+    def _download(self, key: str, remote: dict) -> Tuple[str, Optional[str]]:
+        dest_path = self._local_path(key)
+        tmp_path = dest_path.with_name(dest_path.name + ".part")
+        try:
+            dest_path.parent.mkdir(parents=True, exist_ok=True)
+            self.s3.download_file(self.bucket, key, str(tmp_path))
+            os.replace(tmp_path, dest_path)
+            return key, None
+        except Exception as e:
+            tmp_path.unlink(missing_ok=True)
+            return key, str(e)
+
+    # ======EXECUÇÃO DA SINCRONIZAÇÃO======
+    def sync(self, prune: bool = True) -> SyncReport:
+        start = time.perf_counter()
+        metadata = self._load_metadata()
+        remote = self.list_remote()
+
+        pending = {key: obj for key, obj in remote.items() if not self._is_current(key, obj, metadata)}
+        skipped = len(remote) - len(pending)
+
+        downloaded, transferred, failed = 0, 0, []
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for key, error in executor.map(lambda item: self._download(*item), pending.items()):
+                    if error is not None:
+                        failed.append((key, error))
+                        self.logger.error(f"❌ Falha ao baixar {key}: {error}")
+                        continue
+                    metadata[key] = pending[key]
+                    downloaded += 1
+                    transferred += pending[key]["size"]
+        finally:
+            self._save_metadata(metadata)
+
+        deleted = self._prune(remote, metadata) if prune else 0
+        report = SyncReport(downloaded, skipped, deleted, failed, transferred, time.perf_counter() - start)
+        self.logger.info(
+            f"⬇ Sync S3: {report.downloaded} baixados, {report.skipped} inalterados, "
+            f"{report.deleted} removidos, {len(report.failed)} falhas | "
+            f"{report.bytes_transferred / (1024 * 1024):.1f} MB em {report.seconds:.1f}s "
+            f"({report.throughput_mb_s:.1f} MB/s)"
+        )
+        return report
+
+    def _prune(self, remote: Dict[str, dict], metadata: Dict[str, dict]) -> int:
+        """Apaga arquivos locais que não existem mais no bucket."""
+        remote_paths = {self._local_path(key) for key in remote}
+        deleted = 0
+        for path in self.local_dir.rglob(f"*{self.suffix}"):
+            if path not in remote_paths:
+                path.unlink()
+                deleted += 1
+                self.logger.info(f"🗑 Removido localmente: {path}")
+        for key in set(metadata) - set(remote):
+            del metadata[key]
+        self._save_metadata(metadata)
+        return deleted
@@ -0,0 +1,345 @@
+import os
+import json
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+try:  # Pacote rag_juridico (chat) ou módulo solto (ingestão rodando nesta pasta)
+    from rag_juridico.index_files import ReloadingIndex, new_version_dir, publish_version
+except ImportError:
+    from index_files import ReloadingIndex, new_version_dir, publish_version
+
+
+INDEX_VERSION = 1
+DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+# Abaixo disso a busca exata já é rápida; acima, particiona em listas (IVF)
+IVF_MIN_VECTORS = 20000
+BLOCK_ROWS = 32768
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def _quantize(block: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """int8 usa uma escala por linha (simétrica); float16/float32 só convertem o tipo."""
+    if dtype != "int8":
+        return block.astype(DTYPES[dtype]), None
+    scales = np.abs(block).max(axis=1) / 127.0
+    scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+    return np.round(block / scales[:, None]).astype(np.int8), scales
+
+
+def _spherical_kmeans(sample: np.ndarray, nlist: int, iterations: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        empty = np.bincount(assign, minlength=nlist) == 0
+        # Lista vazia recebe um vetor qualquer da amostra, para não desperdiçar partições
+        sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids.astype(np.float32)
+
+
+# ======CONSTRUÇÃO DO ÍNDICE (INGESTÃO)======
+def build_vector_index(records: Iterable[Tuple[str, str, Dict[str, Any], Sequence[float]]], out_dir: str,
+                       dtype: str = "int8", nlist: Optional[int] = None, kmeans_iterations: int = 10,
+                       seed: int = 0) -> dict:
+    """Gera o índice vetorial compacto de ``(chunk_id, texto, metadados, embedding)`` em ``out_dir``.
+
+    Os vetores (normalizados e quantizados em ``dtype``) ficam numa matriz contígua .npy aberta
+    com mmap na consulta; textos num único blob UTF-8 com offsets; cada chave de metadado numa
+    coluna de códigos (dicionário de valores no meta.json). ``nlist`` liga o particionamento IVF
+    (None = automático a partir de IVF_MIN_VECTORS, 0 = só busca exata).
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"Tipo de vetor não suportado: {dtype}")
+    tmp_path = new_version_dir(out_dir)
+
+    # 1) Passada em streaming: vetores brutos em disco, textos no blob, metadados em colunas
+    ids: List[str] = []
+    text_offsets = array("Q", [0])
+    columns: Dict[str, Tuple[Dict[Any, int], List[Any], array]] = {}
+    dim = None
+    with open(tmp_path / "raw.f32", "wb") as raw, open(tmp_path / "texts.bin", "wb") as texts:
+        for row, (chunk_id, text, metadata, embedding) in enumerate(records):
+            vector = np.asarray(embedding, dtype=np.float32)
+            if dim is None:
+                dim = len(vector)
+            elif len(vector) != dim:
+                raise ValueError(f"Dimensão inconsistente em {chunk_id}: {len(vector)} != {dim}")
+            raw.write(vector.tobytes())
+            encoded = (text or "").encode("utf-8")
+            texts.write(encoded)
+            text_offsets.append(text_offsets[-1] + len(encoded))
+            ids.append(chunk_id)
+            for name, value in (metadata or {}).items():
+                if name not in columns:
+                    columns[name] = ({}, [], array("i", [-1]) * row)
+                codes, values, _ = columns[name]
+                if value not in codes:
+                    codes[value] = len(values)
+                    values.append(value)
+            for name, (codes, _, column) in columns.items():
+                value = (metadata or {}).get(name)
+                column.append(codes[value] if name in (metadata or {}) else -1)
+
+    n_vectors, dim = len(ids), dim or 0
+    raw_vectors = np.memmap(tmp_path / "raw.f32", dtype=np.float32, mode="r", shape=(n_vectors, dim)) \
+        if n_vectors else np.zeros((0, dim), dtype=np.float32)
+
+    # 2) Normaliza e quantiza em blocos: a memória não cresce com o corpus
+    vectors = np.lib.format.open_memmap(tmp_path / "vectors.npy", mode="w+", dtype=DTYPES[dtype], shape=(n_vectors, dim))
+    scales = np.ones(n_vectors, dtype=np.float32)
+    for start in range(0, n_vectors, BLOCK_ROWS):
+        block, block_scales = _quantize(_normalize(np.asarray(raw_vectors[start:start + BLOCK_ROWS])), dtype)
+        vectors[start:start + len(block)] = block
+        if block_scales is not None:
+            scales[start:start + len(block)] = block_scales
+    vectors.flush()
+    del vectors, raw_vectors
+    os.remove(tmp_path / "raw.f32")
+    if dtype == "int8":
+        np.save(tmp_path / "scales.npy", scales)
+    np.save(tmp_path / "text_offsets.npy", np.frombuffer(text_offsets, dtype=np.uint64))
+    column_meta = []
+    for i, (name, (_, values, column)) in enumerate(columns.items()):
+        np.save(tmp_path / f"column_{i}.npy", np.frombuffer(column, dtype=np.int32))
+        column_meta.append({"name": name, "values": values})
+
+    # 3) IVF opcional: k-means esférico numa amostra, linhas agrupadas por lista
+    if nlist is None:
+        nlist = int(np.sqrt(n_vectors)) if n_vectors >= IVF_MIN_VECTORS else 0
+    nlist = min(nlist, n_vectors)
+    if nlist > 0:
+        stored = VectorSnapshot(tmp_path, {"dtype": dtype, "ids": ids, "columns": column_meta, "nlist": 0})
+        rng = np.random.default_rng(seed)
+        sample_rows = np.sort(rng.choice(n_vectors, size=min(n_vectors, nlist * 64), replace=False))
+        centroids = _spherical_kmeans(stored.dequantize(sample_rows), nlist, kmeans_iterations, seed)
+        assign = np.empty(n_vectors, dtype=np.int32)
+        for start in range(0, n_vectors, BLOCK_ROWS):
+            rows = np.arange(start, min(start + BLOCK_ROWS, n_vectors))
+            assign[rows] = np.argmax(stored.dequantize(rows) @ centroids.T, axis=1)
+        del stored
+        np.save(tmp_path / "centroids.npy", centroids)
+        np.save(tmp_path / "ivf_rows.npy", np.argsort(assign, kind="stable").astype(np.int32))
+        np.save(tmp_path / "ivf_offsets.npy", np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))]).astype(np.int64))
+
+    meta = {
+        "version": INDEX_VERSION, "dtype": dtype, "dim": dim, "metric": "l2", "nlist": nlist,
+        "ids": ids, "columns": column_meta
+    }
+    with open(tmp_path / "meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, separators=(",", ":"))
+
+    publish_version(tmp_path, out_dir)
+    return {"vectors": n_vectors, "dimensions": dim, "dtype": dtype, "nlist": nlist, "columns": len(column_meta)}
+
+
+# ======CONSULTA AO ÍNDICE======
+class VectorSnapshot:
+    """Uma versão do índice aberta com mmap (os arrays ficam no page cache, compartilhados entre workers)."""
+
+    def __init__(self, path: Path, meta: dict):
+        self.dtype = meta["dtype"]
+        self.ids: List[str] = meta["ids"]
+        self.row_of = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+        self.vectors = np.load(path / "vectors.npy", mmap_mode="r")
+        self.scales = np.load(path / "scales.npy", mmap_mode="r") if self.dtype == "int8" else None
+        self.text_offsets = np.load(path / "text_offsets.npy", mmap_mode="r")
+        self.texts = np.memmap(path / "texts.bin", dtype=np.uint8, mode="r") if self.text_offsets[-1] else None
+        self.columns = [
+            (column["name"], column["values"], np.load(path / f"column_{i}.npy", mmap_mode="r"))
+            for i, column in enumerate(meta["columns"])
+        ]
+        self.codes = {name: {value: code for code, value in enumerate(values)} for name, values, _ in self.columns}
+        self.nlist = meta["nlist"]
+        if self.nlist:
+            self.centroids = np.load(path / "centroids.npy")
+            self.ivf_rows = np.load(path / "ivf_rows.npy", mmap_mode="r")
+            self.ivf_offsets = np.load(path / "ivf_offsets.npy")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def dequantize(self, rows: np.ndarray) -> np.ndarray:
+        block = np.asarray(self.vectors[rows], dtype=np.float32)
+        if self.scales is not None:
+            block *= np.asarray(self.scales[rows])[:, None]
+        return block
+
+    def text(self, row: int) -> str:
+        start, end = int(self.text_offsets[row]), int(self.text_offsets[row + 1])
+        return bytes(self.texts[start:end]).decode("utf-8") if end > start else ""
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        return {name: values[codes[row]] for name, values, codes in self.columns if codes[row] >= 0}
+
+    # ======FILTROS (SUBCONJUNTO DO "where" DO CHROMA)======
+    def match(self, where: dict) -> np.ndarray:
+        if "$and" in where:
+            return np.logical_and.reduce([self.match(clause) for clause in where["$and"]])
+        if "$or" in where:
+            return np.logical_or.reduce([self.match(clause) for clause in where["$or"]])
+        mask = np.ones(len(self), dtype=bool)
+        for name, condition in where.items():
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for operator, value in condition.items():
+                mask &= self._match_field(name, operator, value)
+        return mask
+
+    def _match_field(self, name: str, operator: str, value: Any) -> np.ndarray:
+        column = next((codes for column_name, _, codes in self.columns if column_name == name), None)
+        if column is None:
+            return np.full(len(self), operator in ("$ne", "$nin"), dtype=bool)
+        if operator in ("$eq", "$ne"):
+            wanted = [value]
+        elif operator in ("$in", "$nin"):
+            wanted = list(value)
+        else:
+            raise ValueError(f"Operador de filtro não suportado: {operator}")
+        codes = [self.codes[name][v] for v in wanted if v in self.codes[name]]
+        hit = np.isin(column, codes) if codes else np.zeros(len(self), dtype=bool)
+        return ~hit if operator in ("$ne", "$nin") else hit
+
+    # ======TOP-K POR SIMILARIDADE DE COSSENO======
+    def _top_k(self, rows: Optional[np.ndarray], queries: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-``n`` de cada pergunta entre ``rows`` (None = todas), processando a matriz em blocos."""
+        total = len(self) if rows is None else len(rows)
+        best_rows, best_scores = [], []
+        for start in range(0, total, BLOCK_ROWS):
+            block_rows = np.arange(start, min(start + BLOCK_ROWS, total)) if rows is None else rows[start:start + BLOCK_ROWS]
+            if rows is None:
+                block = np.asarray(self.vectors[start:start + BLOCK_ROWS], dtype=np.float32)
+                scales = None if self.scales is None else np.asarray(self.scales[start:start + BLOCK_ROWS])
+            else:
+                block = np.asarray(self.vectors[block_rows], dtype=np.float32)
+                scales = None if self.scales is None else np.asarray(self.scales[block_rows])
+            scores = block @ queries.T  # (linhas do bloco × perguntas)
+            if scales is not None:
+                scores *= scales[:, None]
+            if len(block_rows) > n:
+                top = np.argpartition(-scores, n - 1, axis=0)[:n]
+                scores = np.take_along_axis(scores, top, axis=0)
+                block_rows = block_rows[top]
+            else:
+                block_rows = np.repeat(block_rows[:, None], queries.shape[0], axis=1)
+            best_rows.append(block_rows)
+            best_scores.append(scores)
+        rows_all, scores_all = np.concatenate(best_rows), np.concatenate(best_scores)
+        order = np.argsort(-scores_all, axis=0, kind="stable")[:n]
+        return np.take_along_axis(rows_all, order, axis=0).T, np.take_along_axis(scores_all, order, axis=0).T
+
+    def _probe(self, query: np.ndarray, nprobe: int, mask: Optional[np.ndarray]) -> np.ndarray:
+        lists = np.argsort(-(self.centroids @ query))[:nprobe]
+        rows = np.sort(np.concatenate([self.ivf_rows[self.ivf_offsets[c]:self.ivf_offsets[c + 1]] for c in lists]))
+        return rows if mask is None else rows[mask[rows]]
+
+    def search(self, queries: np.ndarray, n: int, where: Optional[dict] = None,
+               nprobe: int = 16) -> List[List[Tuple[int, float]]]:
+        """[(linha, distância L2² entre vetores normalizados = 2 − 2·cos)] por pergunta, do mais próximo."""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if not len(self):
+            return [[] for _ in queries]
+        queries = _normalize(queries.reshape(-1, self.vectors.shape[1]))
+        mask = self.match(where) if where else None
+        allowed = None if mask is None else np.flatnonzero(mask)
+        n = min(n, len(self) if allowed is None else len(allowed))
+        if n <= 0:
+            return [[] for _ in queries]
+
+        # Sem IVF, ou filtro mais seletivo que as listas sondadas: busca exata só nas linhas permitidas
+        exact = not self.nlist or (allowed is not None and len(allowed) <= nprobe * len(self) / self.nlist)
+        if exact:
+            found = [self._top_k(allowed, queries, n)]
+        else:
+            found = []
+            for query in queries:
+                rows = self._probe(query, nprobe, mask)
+                found.append(self._top_k(rows if len(rows) >= n else allowed, query[None, :], n))
+        results = []
+        for rows, scores in found:
+            for query_rows, query_scores in zip(rows, scores):
+                results.append([(int(row), float(max(0.0, 2.0 - 2.0 * score))) for row, score in zip(query_rows, query_scores)])
+        return results
+
+
+class VectorIndex:
+    """Coleção local no formato da API do Chroma usada pelo chat (``query``, ``get``, ``count``).
+
+    Reabre o índice quando a ingestão publica outra versão, como o índice BM25.
+    """
+
+    def __init__(self, index_dir: str, nprobe: int = 16, check_interval: float = 30.0):
+        self.index_dir = Path(index_dir)
+        self.nprobe = nprobe
+        self.metadata = {"hnsw:space": "l2"}
+        self._versions = ReloadingIndex(index_dir, self._open, "Índice vetorial", check_interval=check_interval)
+        self.snapshot()
+
+    @staticmethod
+    def _open(path: Path) -> VectorSnapshot:
+        with open(path / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Versão do índice vetorial incompatível: {meta.get('version')}")
+        return VectorSnapshot(path, meta)
+
+    def version(self):
+        return self._versions.version()
+
+    def snapshot(self) -> VectorSnapshot:
+        # Índice ausente ou quebrado na recarga: segue a versão já aberta; sem nenhuma, a consulta falha
+        snap = self._versions.get()
+        if snap is None:
+            raise RuntimeError(f"Índice vetorial indisponível em {self.index_dir}: {self._versions.error}")
+        return snap
+
+    def count(self) -> int:
+        return len(self.snapshot())
+
+    def _rows_payload(self, snap: VectorSnapshot, rows: Sequence[int], include: Sequence[str]) -> dict:
+        payload = {"ids": [snap.ids[row] for row in rows]}
+        if "documents" in include:
+            payload["documents"] = [snap.text(row) for row in rows]
+        if "metadatas" in include:
+            payload["metadatas"] = [snap.metadata(row) for row in rows]
+        if "embeddings" in include:
+            payload["embeddings"] = snap.dequantize(np.asarray(rows, dtype=np.int64)) if len(rows) else []
+        return payload
+
+    def query(self, query_embeddings, n_results: int = 10, where: Optional[dict] = None,
+              include: Sequence[str] = ("documents", "metadatas", "distances")) -> dict:
+        snap = self.snapshot()
+        found = snap.search(np.asarray(query_embeddings, dtype=np.float32), n_results, where, self.nprobe)
+        result: Dict[str, list] = {"ids": []}
+        for key in ("documents", "metadatas", "distances", "embeddings"):
+            if key in include:
+                result[key] = []
+        for hits in found:
+            rows = [row for row, _ in hits]
+            payload = self._rows_payload(snap, rows, include)
+            result["ids"].append(payload["ids"])
+            for key in ("documents", "metadatas", "embeddings"):
+                if key in include:
+                    result[key].append(payload[key])
+            if "distances" in include:
+                result["distances"].append([distance for _, distance in hits])
+        return result
+
+    def get(self, ids: Optional[Sequence[str]] = None, where: Optional[dict] = None,
+            include: Sequence[str] = ("documents", "metadatas"), limit: Optional[int] = None, offset: int = 0) -> dict:
+        snap = self.snapshot()
+        if ids is not None:
+            rows = np.asarray([snap.row_of[chunk_id] for chunk_id in ids if chunk_id in snap.row_of], dtype=np.int64)
+        else:
+            rows = np.arange(len(snap), dtype=np.int64)
+        if where:
+            rows = rows[snap.match(where)[rows]]
+        rows = rows[offset:offset + limit if limit is not None else None]
+        return self._rows_payload(snap, rows.tolist(), include)
@@ -1,49 +1,303 @@
-import boto3
-import os
-import argparse
-from zipfile import ZipFile
-# Esse script faz o upload de arquivos para um bucket s3 da AWS.
-# Ele descompacta arquivos zip 
-# === Argumentos CLI ===
-parser = argparse.ArgumentParser(description="Upload de arquivos para o S3")
-parser.add_argument('--profile', type=str, help="Nome do perfil AWS para usar", required=False)
-args = parser.parse_args()
-
-# === Configuração da sessão AWS ===
-if args.profile:
-    session = boto3.Session(profile_name=args.profile)
-else:
-    session = boto3.Session()  # Usa padrão
-
-s3 = session.client('s3')
-
-# === CONFIGURAÇÕES ===
-BUCKET_NAME = "amanda-rag-bucket" # colocar o nome do seu bucket aqui
-LOCAL_FOLDER = "../dataset"
-PREFIX = "dataset/"
-
-# === Descompactar arquivos zip ===
-zip_path = os.path.join(LOCAL_FOLDER, "juridicos.zip")
-if os.path.exists(zip_path):
-    with ZipFile(zip_path, 'r') as zip_ref:
-        zip_ref.extractall(LOCAL_FOLDER)
-    print("✔️ Arquivos descompactados com sucesso!")
-
-# === Upload dos arquivos ===
-upload_count = 0
-for root, _, files in os.walk(LOCAL_FOLDER):
-    for file in files:
-        if file.endswith(".zip") or file.startswith('.'):
-            continue
-        local_path = os.path.join(root, file)
-        relative_path = os.path.relpath(local_path, LOCAL_FOLDER)
-        s3_key = os.path.join(PREFIX, relative_path).replace("\\", "/")
-        print(f"Tentando enviar: {local_path} -> s3://{BUCKET_NAME}/{s3_key}")
-        try:
-            s3.upload_file(local_path, BUCKET_NAME, s3_key)
-            print(f"📤 Enviado: {file} -> s3://{BUCKET_NAME}/{s3_key}")
-            upload_count += 1
-        except Exception as e:
-            print(f"❌ Erro ao enviar {file}: {e}")
-
-print(f"✅ Upload finalizado. Total de arquivos enviados: {upload_count}")
+import os
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+from zipfile import ZipFile
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config as BotoConfig
+from s3transfer.utils import ChunksizeAdjuster
+# Esse script faz o upload de arquivos para um bucket s3 da AWS.
+# Os PDFs do juridicos.zip são enviados direto do zip (sem descompactar em disco), junto com os
+# arquivos soltos da pasta. Só sobe o que mudou (MD5/tamanho comparados ao ETag do S3), em paralelo,
+# e um arquivo de estado local permite retomar uma execução interrompida.
+
+# === CONFIGURAÇÕES ===
+BUCKET_NAME = "amanda-rag-bucket" # colocar o nome do seu bucket aqui
+LOCAL_FOLDER = "../dataset"
+PREFIX = "dataset/"
+ZIP_NAME = "juridicos.zip"
+STATE_FILE = ".s3_upload_state.json"
+# Arquivos enviados em paralelo e partes simultâneas de cada arquivo grande (multipart)
+UPLOAD_WORKERS = 16
+MULTIPART_THRESHOLD = 8 * 1024 * 1024
+MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+MULTIPART_CONCURRENCY = 4
+READ_BLOCK = 1024 * 1024
+
+
+class UploadItem(NamedTuple):
+    key: str
+    size: int
+    signature: str  # muda quando o conteúdo local muda (mtime/tamanho ou CRC do membro do zip)
+    path: str  # caminho do arquivo ou do zip
+    member: Optional[str] = None  # nome dentro do zip
+
+
+class UploadReport(NamedTuple):
+    uploaded: int
+    skipped: int
+    failed: List[Tuple[str, str]]
+    bytes_transferred: int
+    seconds: float
+
+    @property
+    def throughput_mb_s(self) -> float:
+        return self.bytes_transferred / (1024 * 1024) / self.seconds if self.seconds else 0.0
+
+
+# ======ETAG NO FORMATO DO S3======
+class EtagHasher:
+    """Calcula o ETag que o S3 vai gerar: MD5 simples ou, no multipart, MD5 dos MD5 das partes + "-N"."""
+
+    def __init__(self, config: TransferConfig):
+        self.threshold = config.multipart_threshold
+        self.part_size = ChunksizeAdjuster().adjust_chunksize(config.multipart_chunksize)
+        self.whole = hashlib.md5()
+        self.part = hashlib.md5()
+        self.part_digests = []
+        self.part_filled = 0
+        self.size = 0
+
+    def update(self, data: bytes):
+        self.whole.update(data)
+        self.size += len(data)
+        view = memoryview(data)
+        while view:
+            take = min(len(view), self.part_size - self.part_filled)
+            self.part.update(view[:take])
+            self.part_filled += take
+            view = view[take:]
+            if self.part_filled == self.part_size:
+                self.part_digests.append(self.part.digest())
+                self.part, self.part_filled = hashlib.md5(), 0
+
+    def hexdigest(self) -> str:
+        if self.size < self.threshold:
+            return self.whole.hexdigest()
+        digests = self.part_digests + ([self.part.digest()] if self.part_filled else [])
+        return f"{hashlib.md5(b''.join(digests)).hexdigest()}-{len(digests)}"
+
+
+class HashingReader:
+    """Leitura sequencial (sem seek) que alimenta o ETag enquanto o boto3 envia os bytes."""
+
+    def __init__(self, stream, hasher: EtagHasher):
+        self.stream = stream
+        self.hasher = hasher
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        self.hasher.update(data)
+        return data
+
+
+# ======ARQUIVOS A ENVIAR======
+def iter_items(local_folder: str, prefix: str, zip_name: str = ZIP_NAME) -> Iterator[UploadItem]:
+    """Arquivos soltos da pasta e membros do zip; se os dois existem, vale o arquivo em disco."""
+    seen = set()
+    for root, _, files in os.walk(local_folder):
+        for file in files:
+            if file.endswith(".zip") or file.startswith('.'):
+                continue
+            local_path = os.path.join(root, file)
+            relative_path = os.path.relpath(local_path, local_folder)
+            s3_key = os.path.join(prefix, relative_path).replace("\\", "/")
+            stat = os.stat(local_path)
+            seen.add(s3_key)
+            yield UploadItem(s3_key, stat.st_size, f"file:{stat.st_size}:{stat.st_mtime_ns}", local_path)
+
+    zip_path = os.path.join(local_folder, zip_name)
+    if not os.path.exists(zip_path):
+        return
+    with ZipFile(zip_path) as zip_ref:
+        for info in zip_ref.infolist():
+            name = os.path.basename(info.filename.rstrip("/"))
+            if info.is_dir() or name.startswith('.') or info.filename.startswith("__MACOSX/"):
+                continue
+            s3_key = prefix + info.filename.lstrip("/")
+            if s3_key in seen:
+                continue
+            seen.add(s3_key)
+            yield UploadItem(s3_key, info.file_size, f"zip:{info.file_size}:{info.CRC:08x}", zip_path, info.filename)
+
+
+# ======SINCRONIZAÇÃO DIRETÓRIO/ZIP -> S3======
+class S3Uploader:
+    def __init__(self, client, bucket: str, prefix: str, state_path: str, workers: int = UPLOAD_WORKERS,
+                 transfer_config: Optional[TransferConfig] = None, save_every: int = 50):
+        self.s3 = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.state_path = state_path
+        self.workers = workers
+        self.transfer_config = transfer_config or TransferConfig(
+            multipart_threshold=MULTIPART_THRESHOLD,
+            multipart_chunksize=MULTIPART_CHUNKSIZE,
+            max_concurrency=MULTIPART_CONCURRENCY,
+            use_threads=True
+        )
+        self.save_every = save_every
+        self._lock = threading.Lock()
+        self._zips: Dict[str, ZipFile] = {}
+        self.state: Dict[str, dict] = {}
+
+    # ======ESTADO LOCAL (RETOMADA)======
+    def _load_state(self) -> Dict[str, dict]:
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, encoding="utf-8") as f:
+            state = json.load(f)
+        # Estado de outro bucket não vale para este
+        return state.get("files", {}) if state.get("bucket") == self.bucket else {}
+
+    def _save_state(self):
+        tmp_path = self.state_path + ".tmp"
+        with self._lock:
+            payload = {"bucket": self.bucket, "files": dict(self.state)}
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=1)
+        os.replace(tmp_path, self.state_path)
+
+    def list_remote(self) -> Dict[str, dict]:
+        remote = {}
+        paginator = self.s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get("Contents", []):
+                remote[obj["Key"]] = {"etag": obj["ETag"].strip('"'), "size": obj["Size"]}
+        return remote
+
+    def _open(self, item: UploadItem):
+        if item.member is None:
+            return open(item.path, "rb")
+        with self._lock:
+            zip_ref = self._zips.get(item.path)
+            if zip_ref is None:
+                zip_ref = self._zips[item.path] = ZipFile(item.path)
+        # ZipFile permite ler membros diferentes em threads diferentes
+        return zip_ref.open(item.member)
+
+    def local_etag(self, item: UploadItem) -> str:
+        hasher = EtagHasher(self.transfer_config)
+        with self._open(item) as stream:
+            for block in iter(lambda: stream.read(READ_BLOCK), b""):
+                hasher.update(block)
+        return hasher.hexdigest()
+
+    def _is_current(self, item: UploadItem, remote: Optional[dict]) -> bool:
+        if remote is None or remote["size"] != item.size:
+            return False
+        saved = self.state.get(item.key)
+        if saved is not None and saved["signature"] == item.signature and saved["etag"] == remote["etag"]:
+            return True  # Já enviado e nada mudou: nem precisa recalcular o MD5
+        etag = self.local_etag(item)
+        if etag != remote["etag"]:
+            return False
+        with self._lock:
+            self.state[item.key] = {"signature": item.signature, "etag": etag, "size": item.size}
+        return True
+
+    def _upload(self, item: UploadItem) -> str:
+        hasher = EtagHasher(self.transfer_config)
+        with self._open(item) as stream:
+            self.s3.upload_fileobj(HashingReader(stream, hasher), self.bucket, item.key, Config=self.transfer_config)
+        return hasher.hexdigest()
+
+    def _process(self, item: UploadItem, remote: Optional[dict]) -> Tuple[UploadItem, str, Optional[str]]:
+        try:
+            if self._is_current(item, remote):
+                return item, "skipped", None
+            etag = self._upload(item)
+            with self._lock:
+                self.state[item.key] = {"signature": item.signature, "etag": etag, "size": item.size}
+            return item, "uploaded", None
+        except Exception as e:
+            return item, "failed", str(e)
+
+    def sync(self, items: List[UploadItem], dry_run: bool = False) -> UploadReport:
+        start = time.perf_counter()
+        self.state = self._load_state()
+        remote = self.list_remote()
+
+        uploaded, skipped, transferred, failed = 0, 0, 0, []
+        if dry_run:
+            for item in items:
+                if self._is_current(item, remote.get(item.key)):
+                    skipped += 1
+                else:
+                    print(f"📝 Seria enviado: {item.key} ({item.size} bytes)")
+            return UploadReport(len(items) - skipped, skipped, [], 0, time.perf_counter() - start)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                results = executor.map(lambda item: self._process(item, remote.get(item.key)), items)
+                for done, (item, status, error) in enumerate(results, 1):
+                    if status == "failed":
+                        failed.append((item.key, error))
+                        print(f"❌ Erro ao enviar {item.key}: {error}")
+                    elif status == "uploaded":
+                        uploaded += 1
+                        transferred += item.size
+                        print(f"📤 Enviado: {item.key}")
+                    else:
+                        skipped += 1
+                    # Estado salvo ao longo do caminho: uma interrupção perde no máximo save_every envios
+                    if done % self.save_every == 0:
+                        self._save_state()
+        finally:
+            self._save_state()
+            for zip_ref in self._zips.values():
+                zip_ref.close()
+            self._zips.clear()
+
+        return UploadReport(uploaded, skipped, failed, transferred, time.perf_counter() - start)
+
+
+def print_report(report: UploadReport):
+    print(
+        f"✅ Upload finalizado: {report.uploaded} enviados, {report.skipped} inalterados, "
+        f"{len(report.failed)} falhas | {report.bytes_transferred / (1024 * 1024):.1f} MB em "
+        f"{report.seconds:.1f}s ({report.throughput_mb_s:.1f} MB/s, "
+        f"{report.uploaded / report.seconds if report.seconds else 0.0:.1f} arquivos/s)"
+    )
+
+
+def main(argv=None):
+    # === Argumentos CLI ===
+    parser = argparse.ArgumentParser(description="Upload de arquivos para o S3")
+    parser.add_argument('--profile', type=str, help="Nome do perfil AWS para usar", required=False)
+    parser.add_argument('--bucket', default=BUCKET_NAME, help="Bucket de destino")
+    parser.add_argument('--prefix', default=PREFIX, help="Prefixo das chaves no bucket")
+    parser.add_argument('--local-folder', default=LOCAL_FOLDER, help="Pasta com os arquivos e o juridicos.zip")
+    parser.add_argument('--workers', type=int, default=UPLOAD_WORKERS, help="Arquivos enviados em paralelo")
+    parser.add_argument('--state-file', help="Estado para retomar execuções (padrão: <pasta>/.s3_upload_state.json)")
+    parser.add_argument('--dry-run', action='store_true', help="Só lista o que seria enviado")
+    args = parser.parse_args(argv)
+
+    # === Configuração da sessão AWS ===
+    if args.profile:
+        session = boto3.Session(profile_name=args.profile)
+    else:
+        session = boto3.Session()  # Usa padrão
+
+    # Pool de conexões para todos os arquivos e partes simultâneos
+    s3 = session.client('s3', config=BotoConfig(max_pool_connections=args.workers * MULTIPART_CONCURRENCY))
+
+    uploader = S3Uploader(
+        s3, args.bucket, args.prefix,
+        state_path=args.state_file or os.path.join(args.local_folder, STATE_FILE),
+        workers=args.workers
+    )
+    items = list(iter_items(args.local_folder, args.prefix))
+    print(f"🔎 {len(items)} arquivos locais para sincronizar com s3://{args.bucket}/{args.prefix}")
+    report = uploader.sync(items, dry_run=args.dry_run)
+    print_report(report)
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
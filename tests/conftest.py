@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+# Os módulos do rag_juridico, dos scripts e do bot se importam pelo nome, sem pacote
+for path in (REPO_ROOT, REPO_ROOT / "rag_juridico", REPO_ROOT / "scripts", REPO_ROOT / "bot_telegram" / "src"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
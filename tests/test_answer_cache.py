@@ -0,0 +1,70 @@
+import pytest
+
+from chat import answer_cache as answer_cache_module
+from chat.answer_cache import AnswerCache, document_ids
+
+CHUNKS = ("a-00000", "a-00001")
+PROMPT, MODEL = "v1", "nova-pro"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_exact_mode_matches_normalized_question_and_same_context():
+    cache = AnswerCache(semantic=False)
+    cache.put("O que é agravo?", [1.0, 0.0], CHUNKS, PROMPT, MODEL, "resposta")
+
+    assert cache.get("o que e agravo", None, CHUNKS, PROMPT, MODEL) == "resposta"
+    # Outro contexto, outro prompt ou outro modelo não reaproveitam a resposta
+    assert cache.get("o que e agravo", None, CHUNKS[:1], PROMPT, MODEL) is None
+    assert cache.get("o que e agravo", None, CHUNKS, "v2", MODEL) is None
+    assert cache.get("o que e agravo", None, CHUNKS, PROMPT, "outro") is None
+    # Sem o modo semântico, pergunta parecida é miss mesmo com o mesmo vetor
+    assert cache.get("o que significa agravo", [1.0, 0.0], CHUNKS, PROMPT, MODEL) is None
+    assert (cache.hits, cache.semantic_hits, cache.misses) == (1, 0, 4)
+
+
+def test_semantic_mode_requires_same_context_and_close_vector():
+    cache = AnswerCache(semantic=True, threshold=0.97)
+    cache.put("O que é agravo?", [1.0, 0.0], CHUNKS, PROMPT, MODEL, "resposta")
+
+    assert cache.get("o que significa agravo", [0.99, 0.05], CHUNKS, PROMPT, MODEL) == "resposta"
+    assert cache.get("o que significa agravo", [0.5, 0.5], CHUNKS, PROMPT, MODEL) is None
+    assert cache.get("o que significa agravo", [0.99, 0.05], CHUNKS[:1], PROMPT, MODEL) is None
+    assert (cache.hits, cache.semantic_hits, cache.misses) == (0, 1, 2)
+
+
+def test_entries_expire_and_lru_evicts(clock):
+    cache = AnswerCache(semantic=True, max_size=2, ttl=60)
+    cache.put("primeira", [1.0, 0.0], CHUNKS, PROMPT, MODEL, "r1")
+    clock[0] += 61
+    assert cache.get("primeira", [1.0, 0.0], CHUNKS, PROMPT, MODEL) is None
+    assert cache.stats()["size"] == 0
+
+    cache.put("a", None, ("x",), PROMPT, MODEL, "ra")
+    cache.put("b", None, ("y",), PROMPT, MODEL, "rb")
+    assert cache.get("a", None, ("x",), PROMPT, MODEL) == "ra"
+    cache.put("c", None, ("z",), PROMPT, MODEL, "rc")
+    assert cache.get("b", None, ("y",), PROMPT, MODEL) is None
+    assert cache.get("a", None, ("x",), PROMPT, MODEL) == "ra"
+
+
+def test_disabled_cache_never_answers():
+    cache = AnswerCache(enabled=False)
+    cache.put("pergunta", None, CHUNKS, PROMPT, MODEL, "resposta")
+    assert cache.get("pergunta", None, CHUNKS, PROMPT, MODEL) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_document_ids_falls_back_to_content_hash():
+    class Doc:
+        def __init__(self, metadata, page_content="texto"):
+            self.metadata, self.page_content = metadata, page_content
+
+    ids = document_ids([Doc({"chunk_id": "a-00000"}), Doc({"source": "x.pdf", "page": 1})])
+    assert ids[0] == "a-00000" and len(ids[1]) == 40
+    assert document_ids([Doc({"source": "x.pdf", "page": 1})]) == ids[1:]
@@ -0,0 +1,29 @@
+import asyncio
+
+import httpx
+
+from chat import chatbot
+
+
+def test_stream_deadline_covers_wait_for_query_slot(monkeypatch):
+    monkeypatch.setattr(chatbot, "collection", object())
+    monkeypatch.setitem(chatbot.startup_state, "ready", True)
+    monkeypatch.setattr(chatbot, "QUERY_TIMEOUT_SECONDS", 0.2)
+
+    async def main():
+        # Todas as vagas ocupadas: a consulta nem chega ao pool e o prazo tem que valer mesmo assim
+        slots = chatbot.query_semaphore._value
+        for _ in range(slots):
+            await chatbot.query_semaphore.acquire()
+        try:
+            transport = httpx.ASGITransport(app=chatbot.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://teste") as client:
+                response = await asyncio.wait_for(client.post("/query/stream", json={"question": "agravo"}), 5)
+        finally:
+            for _ in range(slots):
+                chatbot.query_semaphore.release()
+        return response
+
+    response = asyncio.run(main())
+    assert response.status_code == 200
+    assert "event: error" in response.text and "Tempo limite" in response.text
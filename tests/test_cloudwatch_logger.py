@@ -0,0 +1,118 @@
+import logging
+
+import pytest
+
+from logger.cloudwatch_logger import CloudWatchHandler
+
+
+class AlreadyExists(Exception):
+    pass
+
+
+class StubLogsClient:
+    """Client do CloudWatch Logs que só guarda os lotes recebidos (ou falha, se ``fail``)."""
+
+    class exceptions:
+        ResourceAlreadyExistsException = AlreadyExists
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+        self.created = []
+
+    def create_log_group(self, **kwargs):
+        self.created.append(("group", kwargs))
+        raise AlreadyExists()
+
+    def create_log_stream(self, **kwargs):
+        self.created.append(("stream", kwargs))
+
+    def put_log_events(self, **kwargs):
+        if self.fail:
+            raise RuntimeError("CloudWatch indisponível")
+        self.batches.append(kwargs["logEvents"])
+
+
+def make_handler(client, tmp_path, **kwargs):
+    handler = CloudWatchHandler("grupo", "stream-teste", client=client, fallback_path=str(tmp_path / "fallback.log"),
+                                **kwargs)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    return handler
+
+
+def record(message, created):
+    entry = logging.makeLogRecord({"msg": message, "levelno": logging.INFO, "levelname": "INFO"})
+    entry.created = created
+    return entry
+
+
+@pytest.fixture
+def client():
+    return StubLogsClient()
+
+
+def test_batches_by_size_and_keeps_order(client, tmp_path):
+    handler = make_handler(client, tmp_path, batch_size=3, flush_interval=60)
+    try:
+        for i in range(7):
+            handler.emit(record(f"m{i}", 1000 + i))
+        handler.flush()
+    finally:
+        handler.close()
+
+    assert [len(batch) for batch in client.batches] == [3, 3, 1]
+    messages = [event["message"] for batch in client.batches for event in batch]
+    assert messages == [f"m{i}" for i in range(7)]
+    # Grupo já existente não impede a criação do stream, que acontece uma única vez
+    assert [kind for kind, _ in client.created] == ["group", "stream"]
+
+
+def test_batch_is_sorted_by_timestamp(client, tmp_path):
+    handler = make_handler(client, tmp_path, batch_size=10, flush_interval=60)
+    try:
+        for message, created in (("c", 1003), ("a", 1001), ("b", 1002)):
+            handler.emit(record(message, created))
+        handler.flush()
+    finally:
+        handler.close()
+
+    assert [[event["message"] for event in batch] for batch in client.batches] == [["a", "b", "c"]]
+    assert client.batches[0][0]["timestamp"] == 1001000
+
+
+def test_flushes_on_interval(client, tmp_path):
+    handler = make_handler(client, tmp_path, batch_size=100, flush_interval=0.1)
+    try:
+        handler.emit(record("sozinho", 1000))
+        for _ in range(100):
+            if client.batches:
+                break
+            handler._thread.join(0.05)
+    finally:
+        handler.close()
+    assert client.batches == [[{"timestamp": 1000000, "message": "sozinho"}]]
+
+
+def test_failed_put_goes_to_fallback_file(tmp_path):
+    handler = make_handler(StubLogsClient(fail=True), tmp_path, batch_size=10, flush_interval=60)
+    try:
+        handler.emit(record("primeiro", 1000))
+        handler.emit(record("segundo", 1001))
+        handler.flush()
+    finally:
+        handler.close()
+
+    lines = (tmp_path / "fallback.log").read_text(encoding="utf-8").splitlines()
+    assert [line.split(" ", 2)[-1] for line in lines] == ["primeiro", "segundo"]
+
+
+def test_full_queue_goes_to_fallback_file(client, tmp_path):
+    handler = make_handler(client, tmp_path, batch_size=10, flush_interval=60, max_queue=1)
+    handler._stop.set()  # Thread de envio parada: a fila não esvazia
+    handler._thread.join()
+    handler.emit(record("na fila", 1000))
+    handler.emit(record("excedente", 1001))
+    handler._fallback.close()
+
+    assert (tmp_path / "fallback.log").read_text(encoding="utf-8").rstrip().endswith("excedente")
+    assert handler._queue.qsize() == 1
@@ -0,0 +1,109 @@
+import math
+
+import pytest
+from langchain_core.documents import Document
+
+from bm25_index import BM25Index, build_bm25_index, tokenize
+from chat.hybrid_search import LexicalIndex, fuse_candidates, reciprocal_rank_fusion
+
+CORPUS = [
+    ("c1", "O agravo interno foi desprovido."),
+    ("c2", "Recurso extraordinário no ARE 1.467.492: agravo provido."),
+    ("c3", "Embargos de declaração rejeitados."),
+]
+
+
+def test_tokenize_keeps_processo_numbers_joined_and_split():
+    assert tokenize("ARE 1.467.492") == ["are", "1467492", "1", "467", "492"]
+    assert tokenize("ARE 1467492") == ["are", "1467492"]
+    assert tokenize("Processo 0001234-56.2020.8.26.0000")[:3] == ["processo", "00012345620208260000", "0001234"]
+    # Caixa, acentos e stopwords
+    assert tokenize("Decisão DO Relator") == ["decisao", "relator"]
+
+
+def test_bm25_scores_match_formula(tmp_path):
+    build_bm25_index(CORPUS, str(tmp_path / "bm25"))
+    index = BM25Index(str(tmp_path / "bm25"))
+    assert len(index) == 3
+
+    docs = {chunk_id: tokenize(text) for chunk_id, text in CORPUS}
+    avgdl = sum(len(tokens) for tokens in docs.values()) / len(docs)
+
+    def expected(query, chunk_id, k1=1.2, b=0.75):
+        score = 0.0
+        for term in set(tokenize(query)):
+            df = sum(term in tokens for tokens in docs.values())
+            if not df:
+                continue
+            idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+            tf = docs[chunk_id].count(term)
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(docs[chunk_id]) / avgdl))
+        return score
+
+    results = index.search("agravo provido ARE 1467492", k=3)
+    assert [chunk_id for chunk_id, _ in results] == ["c2", "c1"]  # c3 não tem nenhum termo
+    for chunk_id, score in results:
+        assert score == pytest.approx(expected("agravo provido ARE 1467492", chunk_id), rel=1e-5)
+    assert index.search("termo inexistente") == []
+
+
+def test_reciprocal_rank_fusion_order():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a", "d"]], k=60)
+    assert [item for item, _ in fused] == ["a", "c", "b", "d"]
+    assert dict(fused)["a"] == pytest.approx(1 / 61 + 1 / 62)
+    assert dict(fused)["d"] == pytest.approx(1 / 63)
+
+
+class FakeCollection:
+    """Só o que fuse_candidates usa da API do Chroma: ``get`` e ``metadata``."""
+
+    metadata = {"hnsw:space": "l2"}
+
+    def __init__(self, records):
+        self.records = records  # id -> (texto, metadados, embedding)
+
+    def get(self, ids, where=None, include=()):
+        found = [i for i in ids if i in self.records
+                 and all(self.records[i][1].get(key) == value for key, value in (where or {}).items())]
+        return {
+            "ids": found,
+            "documents": [self.records[i][0] for i in found],
+            "metadatas": [self.records[i][1] for i in found],
+            "embeddings": [self.records[i][2] for i in found],
+        }
+
+
+@pytest.fixture
+def lexical(tmp_path):
+    build_bm25_index(CORPUS, str(tmp_path / "bm25"))
+    return LexicalIndex(str(tmp_path / "bm25"))
+
+
+def test_fuse_candidates_ranks_by_rrf_and_fetches_lexical_only_hits(lexical):
+    collection = FakeCollection({
+        "c1": ("O agravo interno foi desprovido.", {"doc_type": "agravo"}, [0.0, 1.0]),
+        "c2": ("Recurso extraordinário no ARE 1.467.492: agravo provido.", {"doc_type": "decisao"}, [1.0, 1.0]),
+        "c3": ("Embargos de declaração rejeitados.", {"doc_type": "embargos"}, [3.0, 0.0]),
+    })
+    hits = {
+        "c3": (Document(page_content="Embargos", metadata={}), 0.1),
+        "c1": (Document(page_content="O agravo", metadata={}), 0.2),
+    }
+    fused = fuse_candidates(collection, lexical, "ARE 1467492 agravo provido", [0.0, 0.0], hits, k=3)
+
+    # Vetorial: c3, c1; BM25: c2, c1 -> c1 aparece nos dois e lidera
+    assert [doc.page_content for doc, _ in fused][0] == "O agravo"
+    assert [doc.page_content[:7] for doc, _ in fused][1:] == ["Embargo", "Recurso"]
+    # c2 só veio do BM25: distância L2 calculada com o embedding da coleção
+    assert fused[2][1] == pytest.approx(2.0)
+
+    # Filtro de metadados descarta candidatos do BM25 que ele exclui
+    filtered = fuse_candidates(collection, lexical, "ARE 1467492 agravo provido", [0.0, 0.0], hits, k=3,
+                               where={"doc_type": "agravo"})
+    assert all(doc.page_content[:7] != "Recurso" for doc, _ in filtered)
+
+
+def test_fuse_candidates_without_lexical_index_keeps_vector_order(tmp_path):
+    hits = {"c3": (Document(page_content="x"), 0.1), "c1": (Document(page_content="y"), 0.2)}
+    missing = LexicalIndex(str(tmp_path / "sem_indice"))
+    assert fuse_candidates(FakeCollection({}), missing, "agravo", [0.0], hits, k=1) == [hits["c3"]]
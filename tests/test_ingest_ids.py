@@ -0,0 +1,85 @@
+import sys
+import shutil
+from pathlib import Path
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "rag_juridico"))
+
+from ingest import Config, DocumentProcessor
+from manifest import IngestManifest, chunk_id
+
+SAMPLE_PDF = REPO_ROOT / "dataset" / "ARE1467492" / "agravo" / "38-agravo.pdf"
+
+
+@pytest.fixture
+def config(tmp_path):
+    config = Config()
+    config.LOCAL_DATASET_DIR = str(tmp_path / "dataset")
+    config.PERSIST_DIR = str(tmp_path / "chroma")
+    config.COLLECTION_NAME = "juridico_teste"
+    config.MANIFEST_PATH = str(tmp_path / "manifest.json")
+    config.BM25_DIR = str(tmp_path / "bm25")
+    config.VECTOR_INDEX_DIR = str(tmp_path / "vector_index")
+    config.EMBEDDING_MODE = "FAKE"
+    config.EMBEDDING_CACHE_PATH = str(tmp_path / "embedding_cache.sqlite3")
+    config.LOAD_WORKERS = 1
+    return config
+
+
+def copy_pdf(config, rel_path):
+    target = Path(config.LOCAL_DATASET_DIR) / rel_path
+    target.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(SAMPLE_PDF, target)
+
+
+def ingest(config):
+    processor = DocumentProcessor(config)
+    processor.ingest_incremental()
+    return processor._open_vector_store()._collection, IngestManifest.load(config.MANIFEST_PATH)
+
+
+def test_chunk_id_depends_on_path():
+    assert chunk_id("A/agravo/x.pdf", "abc", 0) != chunk_id("B/agravo/x.pdf", "abc", 0)
+    assert chunk_id("A/agravo/x.pdf", "abc", 0) == chunk_id("A/agravo/x.pdf", "abc", 0)
+
+
+def test_same_pdf_in_two_folders_keeps_both_copies(config):
+    first, second = "ARE1467492/agravo/38-agravo.pdf", "RE1463299/agravo/38-agravo-copy.pdf"
+    copy_pdf(config, first)
+    copy_pdf(config, second)
+    collection, manifest = ingest(config)
+
+    first_ids, second_ids = manifest.chunk_ids(first), manifest.chunk_ids(second)
+    assert first_ids and second_ids and not set(first_ids) & set(second_ids)
+    for case_id, ids in (("ARE1467492", first_ids), ("RE1463299", second_ids)):
+        stored = collection.get(ids=ids, include=["metadatas"])
+        assert len(stored["ids"]) == len(ids)
+        assert {metadata["case_id"] for metadata in stored["metadatas"]} == {case_id}
+
+    # Apagar uma cópia não pode remover os vetores da outra
+    (Path(config.LOCAL_DATASET_DIR) / first).unlink()
+    collection, manifest = ingest(config)
+    assert manifest.chunk_ids(first) == []
+    assert len(collection.get(ids=manifest.chunk_ids(second))["ids"]) == len(second_ids)
+
+
+def test_derived_indexes_follow_manifest_version(config, monkeypatch):
+    copy_pdf(config, "ARE1467492/agravo/38-agravo.pdf")
+    ingest(config)
+    builds = []
+    monkeypatch.setattr(DocumentProcessor, "build_lexical_index", lambda self, db: builds.append("bm25"))
+    monkeypatch.setattr(DocumentProcessor, "build_compact_vector_index", lambda self, db: builds.append("vector"))
+
+    # Nada mudou: os índices continuam valendo
+    ingest(config)
+    assert builds == []
+
+    # Run anterior caiu depois de gravar os chunks e antes de reconstruir os índices
+    manifest = IngestManifest.load(config.MANIFEST_PATH)
+    manifest.indexes = {}
+    manifest.save()
+    ingest(config)
+    expected = ["bm25", "vector"] if config.VECTOR_INDEX_ENABLED else ["bm25"]
+    assert builds == expected
+    assert IngestManifest.load(config.MANIFEST_PATH).index_current("bm25")
@@ -0,0 +1,66 @@
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from legal_text import PageFurnitureStripper, normalize_line, split_pages, split_sections
+
+
+def page(text, number=1):
+    return Document(page_content=text, metadata={"source": "x.pdf", "page": number})
+
+
+def test_normalize_line_ignores_numbers_case_and_spaces():
+    assert normalize_line("  (e-STJ Fl.1673) ") == normalize_line("(E-STJ   Fl.458)") == "(e-stj fl.#)"
+
+
+def test_strips_lines_repeated_at_page_edges():
+    words = ["agravo", "recurso", "embargos"]
+    pages = [
+        page(f"SUPREMO TRIBUNAL FEDERAL\nDocumento assinado digitalmente\nabre {word}\n"
+             f"trecho repetido no meio\nmais texto\noutro trecho\nainda {word}\nfecha {word}\nPágina {n} de 3", n)
+        for n, word in enumerate(words, 1)
+    ]
+    removed = PageFurnitureStripper(zone_lines=3).strip(pages)
+
+    assert removed == 9  # cabeçalho (2 linhas) e paginação em cada uma das 3 páginas
+    for word, stripped in zip(words, pages):
+        # Linhas repetidas fora das bordas ficam: só o início e o fim de cada página são examinados
+        assert stripped.page_content.splitlines() == [
+            f"abre {word}", "trecho repetido no meio", "mais texto", "outro trecho", f"ainda {word}", f"fecha {word}"
+        ]
+
+
+def test_keeps_lines_below_min_fraction_and_single_page_files():
+    pages = [page("Cabeçalho raro\ncorpo a", 1), page("Outro topo\ncorpo b", 2), page("Outro topo 2\ncorpo c", 3),
+             page("Mais um\ncorpo d", 4)]
+    assert PageFurnitureStripper(min_fraction=0.75).strip(pages) == 0
+
+    single = [page("SUPREMO TRIBUNAL FEDERAL\ncorpo")]
+    assert PageFurnitureStripper().strip(single) == 0
+    assert single[0].page_content.startswith("SUPREMO")
+
+
+def test_split_sections_boundaries_and_carry_over():
+    pages = [
+        page("Cabeçalho do acórdão\nE M E N T A: agravo regimental\nRELATÓRIO\nO recorrente alega", 1),
+        page("continuação do relatório\nVOTO - VENCEDOR\nO agravo não merece prosperar.", 2),
+        page("Ante o exposto, nego provimento.", 3),
+    ]
+    sections = split_sections(pages)
+
+    assert [(segment.metadata["section"], segment.metadata["page"]) for segment in sections] == [
+        ("", 1), ("ementa", 1), ("relatorio", 1), ("relatorio", 2), ("voto", 2), ("dispositivo", 3)
+    ]
+    assert sections[1].page_content.startswith("E M E N T A")
+    assert sections[3].page_content.strip() == "continuação do relatório"
+    # Texto corrido que só menciona a palavra não abre seção
+    assert [s.metadata["section"] for s in split_sections([page("o voto do relator foi vencido")])] == [""]
+
+
+def test_split_pages_never_crosses_sections():
+    pages = [page("EMENTA\n" + "ementa " * 40 + "\nRELATÓRIO\n" + "relatorio " * 40)]
+    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=0)
+    chunks = split_pages(pages, splitter, structure=True)
+    assert {chunk.metadata["section"] for chunk in chunks} == {"ementa", "relatorio"}
+    assert all(not ("ementa" in chunk.page_content.lower() and "relatorio" in chunk.page_content.lower())
+               for chunk in chunks)
+    assert all("section" not in chunk.metadata for chunk in split_pages(pages, splitter, structure=False))
@@ -0,0 +1,80 @@
+from langchain_core.documents import Document
+
+from bm25_index import tokenize
+from ingest import Config, FileChunker, PipelineStats
+from near_duplicates import NearDuplicateIndex, hamming, simhash
+
+TEXT = ("O Supremo Tribunal Federal negou provimento ao agravo regimental interposto contra a decisão que "
+        "inadmitiu o recurso extraordinário, por ausência de prequestionamento da matéria constitucional.")
+
+
+def chunk(chunk_id, text, **metadata):
+    return Document(page_content=text, metadata={"chunk_id": chunk_id, "case_id": "ARE1", "doc_type": "agravo",
+                                                 **metadata})
+
+
+def test_simhash_distance_tracks_text_similarity():
+    base = simhash(tokenize(TEXT))
+    assert base == simhash(tokenize(TEXT.upper()))  # mesma tokenização, mesma impressão
+    close = simhash(tokenize(TEXT.replace("negou", "nega")))
+    other = simhash(tokenize("Embargos de declaração acolhidos para sanar omissão quanto aos honorários advocatícios "
+                             "fixados na instância de origem, sem efeitos modificativos."))
+    assert hamming(base, close) < hamming(base, other)
+    assert hamming(base, other) > 3
+
+
+def test_filter_links_near_duplicates_to_first_occurrence():
+    index = NearDuplicateIndex(max_distance=3)
+    chunks = [
+        chunk("a", TEXT),
+        chunk("b", "Conteúdo completamente diferente sobre embargos de declaração e honorários de sucumbência."),
+        chunk("c", TEXT + " "),  # mesmo texto com espaço a mais
+        chunk("d", TEXT.replace("Supremo Tribunal Federal", "STF")),
+    ]
+    kept, duplicates = index.filter(chunks)
+
+    assert [c.metadata["chunk_id"] for c in kept] == ["a", "b", "d"]
+    assert duplicates == {"c": "a"}
+    assert index.size == 3
+
+
+def test_filter_never_links_across_filterable_metadata():
+    index = NearDuplicateIndex()
+    kept, duplicates = index.filter([
+        chunk("a", TEXT),
+        chunk("b", TEXT, doc_type="decisao"),
+        chunk("c", TEXT, case_id="RE2"),
+        chunk("d", TEXT, doc_type="decisao"),
+    ])
+    assert [c.metadata["chunk_id"] for c in kept] == ["a", "b", "c"]
+    assert duplicates == {"d": "b"}
+
+
+def test_short_chunks_only_match_exactly():
+    index = NearDuplicateIndex()
+    kept, duplicates = index.filter([chunk("a", "Nego provimento."), chunk("b", "Dou provimento."),
+                                     chunk("c", "nego provimento")])
+    assert [c.metadata["chunk_id"] for c in kept] == ["a", "b"]
+    assert duplicates == {"c": "a"}
+
+
+def test_file_chunker_dedups_within_the_file_only():
+    config = Config()
+    config.CHUNK_SIZE, config.CHUNK_OVERLAP = len(TEXT) + 10, 0
+    config.STRIP_PAGE_FURNITURE = False  # o parágrafo repetido no topo das páginas seria removido antes
+    chunker = FileChunker(config)
+    meta = {"case_id": "ARE1", "doc_type": "agravo", "folder": "ARE1/agravo", "file_name": "x.pdf"}
+
+    def pages():
+        return [Document(page_content=f"{TEXT}\n\nParágrafo próprio da página {n} sobre o caso.",
+                         metadata={**meta, "page": n}) for n in range(1, 4)]
+
+    stats = PipelineStats()
+    first = chunker.split(pages(), "ARE1/agravo/x.pdf", "hash", stats)
+    assert stats.duplicates == 2  # o parágrafo repetido nas páginas 2 e 3
+    assert sum(TEXT in c.page_content for c in first) == 1
+
+    # Outro arquivo com o mesmo conteúdo mantém os próprios chunks: nada é ligado entre arquivos
+    second = chunker.split(pages(), "ARE1/agravo/y.pdf", "hash", PipelineStats())
+    assert [c.page_content for c in second] == [c.page_content for c in first]
+    assert not {c.metadata["chunk_id"] for c in first} & {c.metadata["chunk_id"] for c in second}
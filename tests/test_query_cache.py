@@ -0,0 +1,102 @@
+import os
+import json
+
+import pytest
+
+from chat import query_cache as query_cache_module
+from chat.query_cache import QueryCache, TTLCache, normalize_query
+from index_files import ReloadingIndex, new_version_dir, publish_version
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(query_cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def publish(index_dir):
+    version = new_version_dir(str(index_dir))
+    (version / "meta.json").write_text(json.dumps({"version": 1}))
+    publish_version(version, str(index_dir))
+
+
+def test_normalize_query():
+    assert normalize_query("O que é  Agravo?") == normalize_query("o que e agravo") == "o que e agravo"
+
+
+def test_ttl_expiry(clock):
+    cache = TTLCache(max_size=10, ttl=60)
+    cache.put("a", 1)
+    clock[0] += 59
+    assert cache.get("a") == 1
+    clock[0] += 2
+    assert cache.get("a") is None
+    assert len(cache) == 0 and cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" passa a ser o menos recente
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_embedding_cache_uses_normalized_query():
+    cache = QueryCache("modelo", count_fn=lambda: 1)
+    calls = []
+    embed = lambda text: calls.append(text) or [0.1, 0.2]
+    assert cache.get_embedding("O que é agravo?", embed) == [0.1, 0.2]
+    assert cache.get_embedding("o que e agravo", embed) == [0.1, 0.2]
+    assert calls == ["O que é agravo?"]
+
+
+def test_results_invalidated_when_collection_changes(tmp_path, clock):
+    count = [10]
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text("{}")
+    cache = QueryCache("modelo", count_fn=lambda: count[0], manifest_path=str(manifest), check_interval=30)
+    searches = []
+    search = lambda: searches.append(1) or ["doc"]
+
+    cache.get_results([0.1], 3, search)
+    cache.get_results([0.1], 3, search)
+    assert len(searches) == 1
+    cache.get_results([0.1], 3, search, scope="outro filtro")
+    assert len(searches) == 2
+
+    # Mudança só é percebida depois de check_interval
+    count[0] = 11
+    cache.get_results([0.1], 3, search)
+    assert len(searches) == 2
+    clock[0] += 31
+    cache.get_results([0.1], 3, search)
+    assert len(searches) == 3 and cache.invalidations == 1
+
+    # Manifesto regravado pela ingestão invalida também; os embeddings sobrevivem
+    cache.embeddings.put("agravo", [0.1])
+    os.utime(manifest, (0, 0))
+    cache.check_version(force=True)
+    assert cache.invalidations == 2 and cache.embeddings.get("agravo") == [0.1]
+    assert len(cache.results) == 0
+
+
+def test_results_invalidated_when_index_is_republished(tmp_path):
+    index_dir = tmp_path / "bm25"
+    publish(index_dir)
+    index = ReloadingIndex(str(index_dir), lambda path: path, "Índice de teste")
+    cache = QueryCache("modelo", count_fn=lambda: 10, check_interval=0, index_versions_fn=lambda: (index.version(),))
+    searches = []
+    search = lambda: searches.append(1) or ["doc"]
+
+    cache.get_results([0.1], 3, search)
+    cache.get_results([0.1], 3, search)
+    assert len(searches) == 1
+
+    # Nova versão do índice com a mesma contagem de vetores e o mesmo manifesto
+    publish(index_dir)
+    cache.get_results([0.1], 3, search)
+    assert len(searches) == 2 and cache.invalidations == 1
@@ -0,0 +1,70 @@
+import boto3
+import pytest
+from moto import mock_aws
+
+from s3_sync import S3Sync
+
+BUCKET = "dataset-juridico-teste"
+PREFIX = "dataset/"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def put(s3, rel_path, body):
+    s3.put_object(Bucket=BUCKET, Key=PREFIX + rel_path, Body=body)
+
+
+def test_sync_skips_unchanged_and_downloads_changed(s3, tmp_path):
+    put(s3, "ARE1/agravo/a.pdf", b"%PDF a")
+    put(s3, "ARE1/decisao/b.pdf", b"%PDF b")
+    put(s3, "ARE1/notas.txt", b"fora do sufixo")
+    sync = S3Sync(BUCKET, PREFIX, str(tmp_path), max_workers=4, client=s3)
+
+    report = sync.sync()
+    assert (report.downloaded, report.skipped, report.failed) == (2, 0, [])
+    assert (tmp_path / "ARE1" / "agravo" / "a.pdf").read_bytes() == b"%PDF a"
+    assert not (tmp_path / "ARE1" / "notas.txt").exists()
+
+    report = sync.sync()
+    assert (report.downloaded, report.skipped) == (0, 2)
+
+    put(s3, "ARE1/agravo/a.pdf", b"%PDF a, nova versao")
+    report = sync.sync()
+    assert (report.downloaded, report.skipped) == (1, 1)
+    assert (tmp_path / "ARE1" / "agravo" / "a.pdf").read_bytes() == b"%PDF a, nova versao"
+
+
+def test_sync_downloads_again_when_local_file_is_missing(s3, tmp_path):
+    put(s3, "ARE1/agravo/a.pdf", b"%PDF a")
+    sync = S3Sync(BUCKET, PREFIX, str(tmp_path), client=s3)
+    sync.sync()
+
+    (tmp_path / "ARE1" / "agravo" / "a.pdf").unlink()
+    report = sync.sync()
+    assert (report.downloaded, report.skipped) == (1, 0)
+    assert (tmp_path / "ARE1" / "agravo" / "a.pdf").exists()
+
+
+def test_prune_removes_files_deleted_from_bucket(s3, tmp_path):
+    put(s3, "ARE1/agravo/a.pdf", b"%PDF a")
+    put(s3, "ARE1/decisao/b.pdf", b"%PDF b")
+    sync = S3Sync(BUCKET, PREFIX, str(tmp_path), client=s3)
+    sync.sync()
+
+    s3.delete_object(Bucket=BUCKET, Key=PREFIX + "ARE1/decisao/b.pdf")
+    report = sync.sync(prune=False)
+    assert report.deleted == 0 and (tmp_path / "ARE1" / "decisao" / "b.pdf").exists()
+
+    report = sync.sync()
+    assert report.deleted == 1
+    assert not (tmp_path / "ARE1" / "decisao" / "b.pdf").exists()
+    assert set(sync._load_metadata()) == {PREFIX + "ARE1/agravo/a.pdf"}
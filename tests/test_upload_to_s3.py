@@ -0,0 +1,107 @@
+import os
+import hashlib
+from zipfile import ZipFile
+
+import boto3
+import pytest
+from boto3.s3.transfer import TransferConfig
+from moto import mock_aws
+
+from upload_to_s3 import EtagHasher, S3Uploader, iter_items
+
+BUCKET = "dataset-juridico-teste"
+PREFIX = "dataset/"
+MB = 1024 * 1024
+# Menor parte aceita pelo S3 no multipart
+TRANSFER = TransferConfig(multipart_threshold=5 * MB, multipart_chunksize=5 * MB, max_concurrency=2)
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    folder = tmp_path / "dataset"
+    (folder / "ARE1" / "agravo").mkdir(parents=True)
+    (folder / "ARE1" / "agravo" / "grande.pdf").write_bytes(os.urandom(11 * MB))
+    (folder / "ARE1" / "agravo" / "pequeno.pdf").write_bytes(b"%PDF pequeno")
+    with ZipFile(folder / "juridicos.zip", "w") as zip_ref:
+        zip_ref.writestr("RE2/decisao/zipado.pdf", b"%PDF de dentro do zip")
+        # Também existe solto na pasta: vale o arquivo em disco
+        zip_ref.writestr("ARE1/agravo/pequeno.pdf", b"%PDF velho")
+        zip_ref.writestr("__MACOSX/RE2/._zipado.pdf", b"lixo")
+    return folder
+
+
+def uploader(s3, tmp_path):
+    return S3Uploader(s3, BUCKET, PREFIX, str(tmp_path / "state.json"), workers=4, transfer_config=TRANSFER)
+
+
+def remote_etags(s3):
+    listing = s3.list_objects_v2(Bucket=BUCKET, Prefix=PREFIX)["Contents"]
+    return {obj["Key"]: obj["ETag"].strip('"') for obj in listing}
+
+
+def test_etag_hasher_matches_s3_multipart_format():
+    data = os.urandom(11 * MB)
+    hasher = EtagHasher(TRANSFER)
+    for start in range(0, len(data), 3 * MB):  # blocos que não coincidem com as partes
+        hasher.update(data[start:start + 3 * MB])
+    parts = [hashlib.md5(data[start:start + 5 * MB]).digest() for start in range(0, len(data), 5 * MB)]
+    assert hasher.hexdigest() == f"{hashlib.md5(b''.join(parts)).hexdigest()}-3"
+
+    small = EtagHasher(TRANSFER)
+    small.update(b"abc")
+    assert small.hexdigest() == hashlib.md5(b"abc").hexdigest()
+
+
+def test_iter_items_prefers_loose_files_over_zip_members(dataset):
+    items = {item.key: item for item in iter_items(str(dataset), PREFIX)}
+    assert set(items) == {PREFIX + "ARE1/agravo/grande.pdf", PREFIX + "ARE1/agravo/pequeno.pdf",
+                          PREFIX + "RE2/decisao/zipado.pdf"}
+    assert items[PREFIX + "ARE1/agravo/pequeno.pdf"].member is None
+    assert items[PREFIX + "RE2/decisao/zipado.pdf"].member == "RE2/decisao/zipado.pdf"
+
+
+def test_sync_streams_zip_members_and_records_s3_etags(s3, dataset, tmp_path):
+    items = list(iter_items(str(dataset), PREFIX))
+    report = uploader(s3, tmp_path).sync(items)
+    assert (report.uploaded, report.skipped, report.failed) == (3, 0, [])
+
+    body = s3.get_object(Bucket=BUCKET, Key=PREFIX + "RE2/decisao/zipado.pdf")["Body"].read()
+    assert body == b"%PDF de dentro do zip"
+    body = s3.get_object(Bucket=BUCKET, Key=PREFIX + "ARE1/agravo/pequeno.pdf")["Body"].read()
+    assert body == b"%PDF pequeno"
+
+    # O ETag calculado durante o envio é o mesmo que o S3 gerou (inclusive o multipart "-N")
+    etags = remote_etags(s3)
+    assert etags[PREFIX + "ARE1/agravo/grande.pdf"].endswith("-3")
+    saved = uploader(s3, tmp_path)._load_state()
+    assert {key: entry["etag"] for key, entry in saved.items()} == etags
+
+
+def test_sync_skips_unchanged_files_even_without_state(s3, dataset, tmp_path):
+    items = list(iter_items(str(dataset), PREFIX))
+    uploader(s3, tmp_path).sync(items)
+
+    report = uploader(s3, tmp_path).sync(items)
+    assert (report.uploaded, report.skipped) == (0, 3)
+
+    # Sem o estado local, o ETag (multipart inclusive) é recalculado e comparado ao do S3
+    os.remove(tmp_path / "state.json")
+    report = uploader(s3, tmp_path).sync(items)
+    assert (report.uploaded, report.skipped) == (0, 3)
+
+    (dataset / "ARE1" / "agravo" / "pequeno.pdf").write_bytes(b"%PDF alterado")
+    report = uploader(s3, tmp_path).sync(list(iter_items(str(dataset), PREFIX)))
+    assert (report.uploaded, report.skipped) == (1, 2)
+    body = s3.get_object(Bucket=BUCKET, Key=PREFIX + "ARE1/agravo/pequeno.pdf")["Body"].read()
+    assert body == b"%PDF alterado"
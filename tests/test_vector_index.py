@@ -0,0 +1,135 @@
+import os
+
+import numpy as np
+import pytest
+
+from vector_index import VectorIndex, build_vector_index
+
+DIM = 16
+
+
+def make_records(n, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, DIM)).astype(np.float32)
+    records = [
+        (f"c{i}", f"texto {i} ação", {"doc_type": ["agravo", "decisao", "embargos"][i % 3], "page": i % 5},
+         vectors[i].tolist())
+        for i in range(n)
+    ]
+    return records, vectors
+
+
+def brute_force(vectors, query, n, rows=None):
+    """Top-n exato em float32: distância L2² entre vetores normalizados."""
+    rows = np.arange(len(vectors)) if rows is None else np.asarray(rows)
+    normalized = vectors[rows] / np.linalg.norm(vectors[rows], axis=1, keepdims=True)
+    distances = 2.0 - 2.0 * normalized @ (query / np.linalg.norm(query))
+    order = np.argsort(distances, kind="stable")[:n]
+    return [int(row) for row in rows[order]], distances[order]
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    return str(tmp_path / "vector_index")
+
+
+def test_exact_search_matches_brute_force(index_dir):
+    records, vectors = make_records(200)
+    build_vector_index(records, index_dir, dtype="float32", nlist=0)
+    snap = VectorIndex(index_dir).snapshot()
+    queries = np.random.default_rng(1).normal(size=(4, DIM)).astype(np.float32)
+
+    for query, hits in zip(queries, snap.search(queries, 10)):
+        expected_rows, expected_distances = brute_force(vectors, query, 10)
+        assert [row for row, _ in hits] == expected_rows
+        assert [distance for _, distance in hits] == pytest.approx(expected_distances.tolist(), abs=1e-5)
+
+
+def test_int8_keeps_order_close_to_float32(index_dir):
+    records, vectors = make_records(200)
+    build_vector_index(records, index_dir, dtype="int8", nlist=0)
+    snap = VectorIndex(index_dir).snapshot()
+    query = np.random.default_rng(2).normal(size=DIM).astype(np.float32)
+
+    hits = snap.search(query, 10)[0]
+    expected_rows, expected_distances = brute_force(vectors, query, 10)
+    assert len(set(row for row, _ in hits) & set(expected_rows)) >= 8
+    assert hits[0][1] == pytest.approx(expected_distances[0], abs=0.02)
+
+
+def test_ivf_probe_covers_only_probed_lists(index_dir):
+    records, vectors = make_records(300)
+    build_vector_index(records, index_dir, dtype="float32", nlist=8)
+    snap = VectorIndex(index_dir).snapshot()
+    query = _unit(np.random.default_rng(3).normal(size=DIM))
+
+    # Todas as listas sondadas: mesmo resultado da busca exata
+    hits = snap.search(query, 10, nprobe=8)[0]
+    assert [row for row, _ in hits] == brute_force(vectors, query, 10)[0]
+
+    rows = snap._probe(query, 2, None)
+    nearest_lists = np.argsort(-(snap.centroids @ query))[:2]
+    expected = np.concatenate([snap.ivf_rows[snap.ivf_offsets[c]:snap.ivf_offsets[c + 1]] for c in nearest_lists])
+    assert rows.tolist() == sorted(expected.tolist())
+    mask = np.zeros(len(snap), dtype=bool)
+    mask[::2] = True
+    assert all(row % 2 == 0 for row in snap._probe(query, 2, mask))
+
+
+def test_where_filter(index_dir):
+    records, vectors = make_records(120)
+    build_vector_index(records, index_dir, dtype="float32", nlist=0)
+    index = VectorIndex(index_dir)
+    query = np.random.default_rng(4).normal(size=DIM).astype(np.float32)
+
+    agravos = [i for i in range(120) if i % 3 == 0]
+    found = index.query([query.tolist()], n_results=5, where={"doc_type": "agravo"})
+    assert found["ids"][0] == [f"c{row}" for row in brute_force(vectors, query, 5, agravos)[0]]
+    assert {metadata["doc_type"] for metadata in found["metadatas"][0]} == {"agravo"}
+
+    where = {"$and": [{"doc_type": {"$in": ["agravo", "embargos"]}}, {"page": {"$ne": 0}}]}
+    allowed = [i for i in range(120) if i % 3 != 1 and i % 5 != 0]
+    found = index.query([query.tolist()], n_results=7, where=where)
+    assert found["ids"][0] == [f"c{row}" for row in brute_force(vectors, query, 7, allowed)[0]]
+
+    # Valor inexistente: nenhum resultado; chave inexistente com $ne: todos passam
+    assert index.query([query.tolist()], n_results=5, where={"doc_type": "acordao"})["ids"] == [[]]
+    assert len(index.get(where={"processo": {"$ne": "x"}}, include=[])["ids"]) == 120
+
+    got = index.get(ids=["c3", "inexistente", "c0"], include=["documents", "metadatas"])
+    assert got["ids"] == ["c3", "c0"]
+    assert got["documents"] == ["texto 3 ação", "texto 0 ação"]
+    assert got["metadatas"][0] == {"doc_type": "agravo", "page": 3}
+
+
+def test_empty_index_returns_no_hits(index_dir):
+    build_vector_index([], index_dir, dtype="int8")
+    index = VectorIndex(index_dir)
+    assert index.count() == 0
+    assert index.query([[0.1] * DIM], n_results=3)["ids"] == [[]]
+    assert index.get(include=[])["ids"] == []
+
+
+def test_reloads_after_new_version_is_published(index_dir):
+    records, _ = make_records(50)
+    build_vector_index(records, index_dir, dtype="float32", nlist=0)
+    index = VectorIndex(index_dir, check_interval=0)
+    first_version = index.version()
+    old_snapshot = index.snapshot()
+    assert index.count() == 50
+
+    build_vector_index(records[:20], index_dir, dtype="float32", nlist=0)
+    assert index.version() != first_version
+    assert index.count() == 20
+    assert index.get(ids=["c30"], include=[])["ids"] == []
+    # Quem ainda usa a versão anterior continua lendo dela
+    assert len(old_snapshot) == 50 and os.path.exists(first_version[0])
+
+    # Uma terceira versão apaga a primeira, mantendo só a atual e a anterior
+    build_vector_index(records[:10], index_dir, dtype="float32", nlist=0)
+    assert index.count() == 10 and not os.path.exists(first_version[0])